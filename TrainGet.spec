@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('station_name.txt', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果表格性能测试，对比原来每个单元格一个控件的 QTableWidget 与模型/视图表格的显示和清空耗时
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 没有显示器时使用离屏渲染
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem, QTextEdit, QFrame
+from gui.result_table import ResultTableView, COLUMNS
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+def make_tickets(count):
+    """
+    生成测试用的车票信息
+    
+    Args:
+        count: 车次数量
+    
+    Returns:
+        list: 车票信息列表
+    """
+    return [{
+        "train_number": f"G{i}",
+        "start_time": "08:00",
+        "end_time": "12:30",
+        "duration": "04:30",
+        "start_station": "北京南",
+        "end_station": "上海虹桥",
+        "date": "2026-10-20",
+        "remaining_tickets": {"商务座": "无", "一等座": "5", "二等座": "有", "硬卧": "无",
+                              "硬座": "无", "软卧": "无", "站票": "无"},
+        "prices": {"商务座": "1748", "一等座": "933", "二等座": "553"}
+    } for i in range(count)]
+
+
+def widget_display(table, tickets):
+    """原来的显示方式：每个单元格一个 QTableWidgetItem，余票信息为 QTextEdit"""
+    table.setRowCount(len(tickets))
+    for row, ticket in enumerate(tickets):
+        for column, key in enumerate(("train_number", "start_time", "end_time", "duration",
+                                      "start_station", "end_station", "date")):
+            table.setItem(row, column, QTableWidgetItem(ticket[key]))
+        lines = [f"<span style='font-size: 20px;'>{k}: {v}</span>" for k, v in ticket["remaining_tickets"].items()]
+        text_edit = QTextEdit()
+        text_edit.setHtml("<br>".join(lines))
+        text_edit.setReadOnly(True)
+        text_edit.setFrameShape(QFrame.NoFrame)
+        text_edit.setMinimumHeight(100)
+        text_edit.setMaximumHeight(200)
+        table.setCellWidget(row, 7, text_edit)
+    table.resizeColumnsToContents()
+
+
+def widget_clear(table):
+    """原来的清空方式：逐个删除单元格控件"""
+    for row in range(table.rowCount()):
+        widget = table.cellWidget(row, 7)
+        if widget:
+            table.setCellWidget(row, 7, None)
+            widget.deleteLater()
+    table.setRowCount(0)
+
+
+def model_display(view, tickets):
+    """模型/视图的显示方式，与主窗口相同，只在第一次显示时调整列宽"""
+    first_display = view.result_model.rowCount() == 0
+    view.result_model.set_tickets(tickets)
+    if first_display:
+        view.resizeColumnsToContents()
+
+
+def timed(app, func, *args):
+    """
+    运行函数并处理完事件队列，返回耗时（秒）
+    """
+    start = time.perf_counter()
+    func(*args)
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def benchmark_result_table(counts=(100, 500, 2000)):
+    """对比两种表格在不同车次数量下的显示和清空耗时"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    
+    table = QTableWidget(0, len(COLUMNS))
+    table.setHorizontalHeaderLabels(COLUMNS)
+    table.resize(1200, 800)
+    table.show()
+    view = ResultTableView()
+    view.resize(1200, 800)
+    view.show()
+    
+    logger.info("开始查询结果表格性能测试")
+    for count in counts:
+        tickets = make_tickets(count)
+        widget_show = timed(app, widget_display, table, tickets)
+        widget_hide = timed(app, widget_clear, table)
+        model_show = timed(app, model_display, view, tickets)
+        # 定时查询的典型情况：只有一个车次的余票变化
+        refreshed = make_tickets(count)
+        refreshed[count // 2]["remaining_tickets"]["二等座"] = "3"
+        model_refresh = timed(app, model_display, view, refreshed)
+        model_hide = timed(app, view.result_model.clear)
+        logger.info(f"{count} 个车次: QTableWidget 显示 {widget_show * 1000:.1f} ms, 清空 {widget_hide * 1000:.1f} ms; "
+                    f"模型/视图 显示 {model_show * 1000:.1f} ms, 刷新 {model_refresh * 1000:.1f} ms, "
+                    f"清空 {model_hide * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_result_table()
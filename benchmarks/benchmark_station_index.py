@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+站点索引加载性能测试，对比原来的 JSON 缓存文件与 mmap 映射的二进制索引的加载耗时和内存占用
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import tempfile
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.station_index import StationIndex, Station
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+def load_bundled_stations():
+    """
+    读取随程序发布的站点数据
+    
+    Returns:
+        list: Station 列表
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "station_name.txt")
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    stations = []
+    for item in re.search(r'var station_names =\'(.*?)\';', content).group(1).split('@'):
+        fields = item.split('|')
+        if len(fields) >= 8:
+            stations.append(Station(fields[2], fields[1], fields[3], fields[4], fields[7] or fields[1]))
+    return stations
+
+
+def load_json(path):
+    """原来的加载方式：整体反序列化 JSON 文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['stations'], data['code_to_station'], data['station_city']
+
+
+def measure(func, *args, repeat=20):
+    """
+    多次运行取最短耗时，并统计一次运行后保留的内存
+    
+    Args:
+        func: 被测函数
+        args: 被测函数的参数
+        repeat: 运行次数
+    
+    Returns:
+        tuple: (最短耗时, 保留的内存字节数, 返回值)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    
+    tracemalloc.start()
+    result = func(*args)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, retained, result
+
+
+def benchmark_station_index():
+    """对比两种缓存格式的加载耗时、内存占用和查询结果"""
+    stations = load_bundled_stations()
+    temp_dir = tempfile.mkdtemp()
+    json_path = os.path.join(temp_dir, "stations.json")
+    index_path = os.path.join(temp_dir, "stations.idx")
+    
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'stations': {station.name: station.code for station in stations},
+            'code_to_station': {station.code: station.name for station in stations},
+            'station_city': {station.code: station.city for station in stations}
+        }, f, ensure_ascii=False, indent=2)
+    with open(index_path, 'wb') as f:
+        f.write(StationIndex.build(stations))
+    
+    logger.info(f"开始站点索引性能测试，站点数量: {len(stations)}")
+    logger.info(f"文件大小: JSON {os.path.getsize(json_path) / 1024:.0f} KB, 二进制索引 {os.path.getsize(index_path) / 1024:.0f} KB")
+    
+    json_time, json_memory, (name_to_code, code_to_name, _) = measure(load_json, json_path)
+    index_time, index_memory, index = measure(StationIndex.open, index_path)
+    
+    mismatches = [station.name for station in stations
+                  if index.code_of(station.name) != name_to_code[station.name]
+                  or index.name_of(station.code) != code_to_name[station.code]]
+    if mismatches:
+        logger.error(f"查询结果不一致: {mismatches[:10]}")
+        return
+    
+    logger.info(f"JSON: 加载 {json_time * 1000:.2f} ms, 内存 {json_memory / 1024:.0f} KB")
+    logger.info(f"二进制索引: 加载 {index_time * 1000:.3f} ms, 内存 {index_memory / 1024:.1f} KB（映射的文件页由各进程共享）")
+    
+    # 首次查询需要二分查找，之后命中缓存
+    lookup_index = StationIndex.open(index_path)
+    start = time.perf_counter()
+    for station in stations:
+        lookup_index.code_of(station.name)
+    cold_time = (time.perf_counter() - start) / len(stations)
+    start = time.perf_counter()
+    for station in stations:
+        lookup_index.code_of(station.name)
+    warm_time = (time.perf_counter() - start) / len(stations)
+    logger.info(f"名称查询: 首次 {cold_time * 1e6:.2f} us, 重复 {warm_time * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    benchmark_station_index()
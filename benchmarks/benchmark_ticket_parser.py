@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+车次解析性能测试，对比原来按字典解析车次字符串与 TicketRecord 解析的耗时和内存占用
+"""
+
+import sys
+import os
+import re
+import time
+import random
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser.ticket_parser import decode_ticket_row
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+def make_rows(count):
+    """
+    生成模拟的余票查询结果
+    
+    Args:
+        count: 车次数量
+    
+    Returns:
+        list: 车次字符串列表
+    """
+    rng = random.Random(12306)
+    seat_values = ["有", "无", "", "*", "候补"] + [str(n) for n in range(1, 21)]
+    rows = []
+    for i in range(count):
+        fields = [""] * 50
+        start = rng.randint(0, 23 * 60)
+        duration = rng.randint(30, 20 * 60)
+        end = (start + duration) % (24 * 60)
+        fields[3] = f"{rng.choice('GDKTZ')}{i}"
+        fields[6] = "BJP"
+        fields[7] = "SHH"
+        fields[8] = f"{start // 60:02d}:{start % 60:02d}"
+        fields[9] = f"{end // 60:02d}:{end % 60:02d}"
+        fields[10] = f"{duration // 60:02d}:{duration % 60:02d}"
+        for pos in (23, 26, 28, 29, 30, 31, 32):
+            fields[pos] = rng.choice(seat_values)
+        for pos in range(36, 48):
+            fields[pos] = rng.choice(["", "0", str(rng.randint(50, 2000))])
+        rows.append("|".join(fields))
+    return rows
+
+
+def legacy_decode(item):
+    """
+    原来的解析方式：每个车次构造余票和价格字典
+    
+    Args:
+        item: 车次字符串
+    
+    Returns:
+        dict: 车次信息
+    """
+    fields = item.split("|")
+    if len(fields) < 30:
+        return None
+    
+    remaining_tickets = {
+        "商务座": fields[32] if fields[32] != "" else "无",
+        "一等座": fields[31] if fields[31] != "" else "无",
+        "二等座": fields[30] if fields[30] != "" else "无",
+        "硬卧": fields[28] if fields[28] != "" else "无",
+        "硬座": fields[29] if fields[29] != "" else "无",
+        "软卧": fields[23] if fields[23] != "" else "无",
+        "站票": fields[26] if len(fields) > 26 and fields[26] != "" else "无"
+    }
+    
+    prices = {}
+    possible_price_positions = {
+        "硬座": [36, 42],
+        "硬卧": [37, 43],
+        "软卧": [38, 44],
+        "二等座": [39, 45],
+        "一等座": [40, 46],
+        "商务座": [41, 47]
+    }
+    for seat_type, positions in possible_price_positions.items():
+        for pos in positions:
+            if pos < len(fields):
+                price = fields[pos]
+                if price and price != "" and price != "0":
+                    try:
+                        clean_price = re.sub(r'[^0-9]', '', price)
+                        if clean_price:
+                            price_int = int(clean_price)
+                            if 10 <= price_int <= 10000:
+                                prices[seat_type] = str(price_int)
+                                break
+                    except:
+                        pass
+        if seat_type not in prices:
+            prices[seat_type] = "-"
+    
+    return {
+        "train_number": fields[3],
+        "start_station": fields[6],
+        "end_station": fields[7],
+        "start_time": fields[8],
+        "end_time": fields[9],
+        "duration": fields[10],
+        "remaining_tickets": remaining_tickets,
+        "prices": prices
+    }
+
+
+def measure(name, decode, rows, repeat=5):
+    """
+    测量解析耗时和解析结果的内存占用
+    
+    Args:
+        name: 解析方式名称
+        decode: 解析函数
+        rows: 车次字符串列表
+        repeat: 计时重复次数
+    
+    Returns:
+        dict: 测量结果
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            decode(row)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    
+    # 保留全部解析结果，统计新增的内存块数和字节数
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    results = [decode(row) for row in rows]
+    blocks_after = sys.getallocatedblocks()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    count = len(rows)
+    stats = {
+        "name": name,
+        "us_per_row": best / count * 1e6,
+        "blocks_per_row": (blocks_after - blocks_before) / count,
+        "bytes_per_row": retained / count,
+        "peak_bytes_per_row": peak / count
+    }
+    del results
+    return stats
+
+
+def benchmark_ticket_parser(count=2000):
+    """
+    对比两种解析方式
+    
+    Args:
+        count: 模拟车次数量
+    """
+    rows = make_rows(count)
+    logger.info(f"开始车次解析性能测试，模拟车次数量: {count}")
+    
+    for stats in (measure("legacy dict", legacy_decode, rows), measure("TicketRecord", decode_ticket_row, rows)):
+        logger.info(
+            f"{stats['name']:<14} 耗时 {stats['us_per_row']:.2f} us/行, "
+            f"内存块 {stats['blocks_per_row']:.1f} 个/行, "
+            f"内存 {stats['bytes_per_row']:.0f} B/行, "
+            f"峰值 {stats['peak_bytes_per_row']:.0f} B/行"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_ticket_parser()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间解析性能测试，对比原来用 strptime 和字符串切分解析时间、历时与解码时转换为整数分钟的耗时
+"""
+
+import sys
+import os
+import time
+import random
+import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser.ticket_parser import parse_clock
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+def make_times(count):
+    """
+    生成模拟的 (出发时间, 到达时间, 历时) 文本
+    
+    Args:
+        count: 车次数量
+    
+    Returns:
+        list: [(出发时间, 到达时间, 历时), ...]
+    """
+    rng = random.Random(12306)
+    times = []
+    for _ in range(count):
+        start = rng.randint(0, 24 * 60 - 1)
+        duration = rng.randint(30, 30 * 60)
+        end = (start + duration) % (24 * 60)
+        times.append((f"{start // 60:02d}:{start % 60:02d}",
+                      f"{end // 60:02d}:{end % 60:02d}",
+                      f"{duration // 60:02d}:{duration % 60:02d}"))
+    return times
+
+
+def legacy_parse(times):
+    """
+    原来的解析方式：时间用 strptime，历时用字符串切分
+    
+    Args:
+        times: [(出发时间, 到达时间, 历时), ...]
+    
+    Returns:
+        list: [(出发分钟, 到达分钟, 历时分钟), ...]
+    """
+    def parse_duration(duration_str):
+        if '天' in duration_str:
+            days, rest = duration_str.split('天')
+            hours, minutes = rest.split(':')
+            return int(days)*24*60 + int(hours)*60 + int(minutes)
+        else:
+            hours, minutes = duration_str.split(':')
+            return int(hours)*60 + int(minutes)
+    
+    result = []
+    for start, end, duration in times:
+        start_dt = datetime.datetime.strptime(start, "%H:%M")
+        end_dt = datetime.datetime.strptime(end, "%H:%M")
+        result.append((start_dt.hour * 60 + start_dt.minute,
+                       end_dt.hour * 60 + end_dt.minute,
+                       parse_duration(duration)))
+    return result
+
+
+def integer_parse(times):
+    """
+    新的解析方式：解码时查表转换为整数分钟
+    
+    Args:
+        times: [(出发时间, 到达时间, 历时), ...]
+    
+    Returns:
+        list: [(出发分钟, 到达分钟, 历时分钟), ...]
+    """
+    return [(parse_clock(start), parse_clock(end), parse_clock(duration)) for start, end, duration in times]
+
+
+def best_time(func, *args, repeat=5):
+    """
+    多次运行取最短耗时
+    
+    Args:
+        func: 被测函数
+        args: 被测函数的参数
+        repeat: 运行次数
+    
+    Returns:
+        tuple: (最短耗时, 最后一次的返回值)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_time_parse(count=20000):
+    """
+    对比两种解析方式，以及按文本和按整数排序的耗时
+    
+    Args:
+        count: 模拟车次数量
+    """
+    times = make_times(count)
+    logger.info(f"开始时间解析性能测试，车次数量: {count}")
+    
+    legacy_time, legacy_result = best_time(legacy_parse, times)
+    integer_time, integer_result = best_time(integer_parse, times)
+    
+    if legacy_result != integer_result:
+        logger.error("解析结果不一致")
+        return
+    
+    logger.info(f"strptime/切分: {legacy_time * 1000:.1f} ms ({legacy_time / count * 1e6:.2f} us/车次)")
+    logger.info(f"整数分钟: {integer_time * 1000:.1f} ms ({integer_time / count * 1e6:.2f} us/车次)，"
+                f"加速 {legacy_time / integer_time:.1f} 倍")
+    
+    # 按历时排序：文本需要先逐个解析，整数直接比较
+    text_sort_time, _ = best_time(lambda: sorted(times, key=lambda item: legacy_parse([item])[0][2]))
+    int_sort_time, _ = best_time(lambda: sorted(integer_result, key=lambda item: item[2]))
+    logger.info(f"按历时排序: 文本 {text_sort_time * 1000:.1f} ms, 整数 {int_sort_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_time_parse()
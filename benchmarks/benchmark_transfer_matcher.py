@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中转匹配性能测试，对比双重循环匹配与按出发时间二分查找的耗时
+"""
+
+import sys
+import os
+import time
+import random
+import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser.ticket_parser import parser
+from transfer.matcher import match_transfers
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+def make_leg_rows(count, from_code, to_code, seed):
+    """
+    生成模拟的单段车次
+    
+    Args:
+        count: 车次数量
+        from_code: 出发站编码
+        to_code: 到达站编码
+        seed: 随机种子
+    
+    Returns:
+        list: 车次字符串列表
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        fields = [""] * 50
+        start = rng.randint(0, 24 * 60 - 1)
+        duration = rng.randint(30, 10 * 60)
+        end = (start + duration) % (24 * 60)
+        fields[3] = f"G{seed}{i:03d}"
+        fields[6] = from_code
+        fields[7] = to_code
+        fields[8] = f"{start // 60:02d}:{start % 60:02d}"
+        fields[9] = f"{end // 60:02d}:{end % 60:02d}"
+        fields[10] = f"{duration // 60:02d}:{duration % 60:02d}"
+        fields[30] = "有"
+        rows.append("|".join(fields))
+    return rows
+
+
+def legacy_match(first_rows, second_rows):
+    """
+    原来的匹配方式：双重循环，每对车次都重新解析字段和时间
+    
+    Args:
+        first_rows: 第一段车次字符串列表
+        second_rows: 第二段车次字符串列表
+    
+    Returns:
+        set: 匹配到的 (第一段车次, 第二段车次, 等待时间)
+    """
+    pairs = set()
+    for first_train in first_rows:
+        first_fields = first_train.split("|")
+        for second_train in second_rows:
+            second_fields = second_train.split("|")
+            first_end_dt = datetime.datetime.strptime(first_fields[9], "%H:%M")
+            second_start_dt = datetime.datetime.strptime(second_fields[8], "%H:%M")
+            time_diff = (second_start_dt - first_end_dt).total_seconds() / 60
+            if time_diff < 0:
+                time_diff += 24 * 60
+            if 20 <= time_diff <= 720:
+                pairs.add((first_fields[3], second_fields[3], int(time_diff)))
+    return pairs
+
+
+def indexed_match(first_rows, second_rows):
+    """
+    新的匹配方式：两段车次各解析一次，第二段按出发时间二分查找
+    
+    Args:
+        first_rows: 第一段车次字符串列表
+        second_rows: 第二段车次字符串列表
+    
+    Returns:
+        set: 匹配到的 (第一段车次, 第二段车次, 等待时间)
+    """
+    first_records = parser.parse_left_ticket(first_rows)
+    second_records = parser.parse_left_ticket(second_rows)
+    return {(first.train_number, second.train_number, wait)
+            for first, second, wait in match_transfers(first_records, second_records)}
+
+
+def best_time(func, *args, repeat=5):
+    """
+    多次运行取最短耗时
+    
+    Args:
+        func: 被测函数
+        args: 被测函数的参数
+        repeat: 运行次数
+    
+    Returns:
+        tuple: (最短耗时, 最后一次的返回值)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_transfer_matcher(count=200):
+    """
+    对比两种匹配方式
+    
+    Args:
+        count: 每段的模拟车次数量
+    """
+    first_rows = make_leg_rows(count, "AAA", "HUB", 1)
+    second_rows = make_leg_rows(count, "HUB", "BBB", 2)
+    logger.info(f"开始中转匹配性能测试，车次数量: {count} x {count}")
+    
+    legacy_time, legacy_pairs = best_time(legacy_match, first_rows, second_rows, repeat=3)
+    indexed_time, indexed_pairs = best_time(indexed_match, first_rows, second_rows)
+    
+    if legacy_pairs != indexed_pairs:
+        logger.error(f"匹配结果不一致: 双重循环 {len(legacy_pairs)} 个, 二分查找 {len(indexed_pairs)} 个")
+        return
+    
+    logger.info(f"匹配到 {len(indexed_pairs)} 个中转组合")
+    logger.info(f"双重循环: {legacy_time * 1000:.1f} ms")
+    logger.info(f"二分查找: {indexed_time * 1000:.1f} ms（含解析），加速 {legacy_time / indexed_time:.1f} 倍")
+
+
+if __name__ == "__main__":
+    benchmark_transfer_matcher()
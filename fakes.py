@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共用的假对象和数据生成函数，不访问网络
+"""
+
+import os
+import json
+import threading
+from array import array
+from concurrent.futures import Future
+
+from network.client import NetworkClient, TicketCache
+from network.backoff import AdaptiveBackoff
+from network.rate_limiter import RateLimiter
+from parser.ticket_parser import TicketRecord, SEAT_PLENTY, parse_clock, INVALID_MINUTES
+from transfer.hub_index import HubIndex
+from transfer.matcher import DAY_MINUTES
+from utils.station_parser import station_parser
+
+# 余票查询成功但没有车次时接口返回的内容
+EMPTY_RESULT = '{"status": true, "data": {"result": []}}'
+
+
+class FakeResponse:
+    """requests 的响应，只包含用到的属性"""
+    
+    status_code = 200
+    
+    def __init__(self, text=EMPTY_RESULT):
+        self.text = text
+        self.encoding = None
+    
+    def raise_for_status(self):
+        pass
+    
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """按顺序返回预设的响应，元素为异常时抛出"""
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+    
+    def get(self, url, **kwargs):
+        response = self.responses.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
+def make_client(session, **backoff_options):
+    """
+    创建不访问网络的客户端，只设置发送请求和查询余票用到的属性
+    
+    Args:
+        session: 代替 requests.Session 的对象
+        **backoff_options: 创建 AdaptiveBackoff 的其他参数
+    
+    Returns:
+        NetworkClient: 网络客户端
+    """
+    client = NetworkClient.__new__(NetworkClient)
+    client.timeout = 1
+    client.session = session
+    client.rate_limiter = RateLimiter(rate=1000, burst=100)
+    client.backoff = AdaptiveBackoff(retry_base=0, retry_cap=0, **backoff_options)
+    client.ready = Future()
+    client.ready.set_result(True)
+    client._reinit_lock = threading.Lock()
+    client._reinit_finished_at = 0
+    client.ticket_cache = TicketCache()
+    client.leg_cache = TicketCache(ttl=300)
+    client._inflight = {}
+    client._inflight_lock = threading.Lock()
+    client.hub_index = HubIndex(index_file=os.devnull, city_of=station_parser.get_station_city)
+    client.transfer_workers = 4
+    client.cross_station_buffer = 0
+    return client
+
+
+def make_row(train_number="G1", from_code="BJP", to_code="SHH", start="08:00", end="12:30", duration="04:30",
+             seats=None, prices=None, origin=None, terminus=None, field_count=50):
+    """
+    生成余票查询接口格式的车次字符串
+    
+    Args:
+        train_number: 车次
+        from_code: 查询出发站编码
+        to_code: 查询到达站编码
+        start: 出发时间
+        end: 到达时间
+        duration: 历时
+        seats: {字段位置: 余票文本}
+        prices: {字段位置: 价格文本}
+        origin: 始发站编码，默认为出发站
+        terminus: 终到站编码，默认为到达站
+        field_count: 字段数
+    
+    Returns:
+        str: 以 "|" 分隔的车次字符串
+    """
+    fields = [""] * field_count
+    fields[3] = train_number
+    fields[4] = origin or from_code
+    fields[5] = terminus or to_code
+    fields[6] = from_code
+    fields[7] = to_code
+    fields[8] = start
+    fields[9] = end
+    fields[10] = duration
+    for pos, text in {**(seats or {}), **(prices or {})}.items():
+        if pos < field_count:
+            fields[pos] = text
+    return "|".join(fields)
+
+
+def make_record(train_number, from_code, to_code, start, duration):
+    """
+    创建车次记录
+    
+    Args:
+        train_number: 车次
+        from_code: 出发站编码
+        to_code: 到达站编码
+        start: 出发时间 "HH:MM"，无法解析时（如 "--:--"）出发和到达时间都未知
+        duration: 历时（分钟）
+    
+    Returns:
+        TicketRecord: 车次记录
+    """
+    start_minutes = parse_clock(start)
+    end_minutes = (start_minutes + duration) % DAY_MINUTES if start_minutes >= 0 else INVALID_MINUTES
+    return TicketRecord(train_number, from_code, to_code, start_minutes, end_minutes, duration,
+                        array("h", [SEAT_PLENTY] * 7), array("H", [100] * 6))
@@ -7,32 +7,32 @@
 import sys
 import threading
 import time
+from contextlib import closing
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, 
-    QLineEdit, QDateEdit, QComboBox, QPushButton, QTableWidget, 
-    QTableWidgetItem, QLabel, QGroupBox, QProgressBar, QStatusBar,
+    QLineEdit, QDateEdit, QComboBox, QPushButton, QTableView,
+    QLabel, QGroupBox, QProgressBar, QStatusBar,
     QMessageBox, QFileDialog, QTextEdit, QFrame, QDialog, QCheckBox, QSpinBox,
     QHeaderView, QApplication, QCompleter
 )
-from PyQt5.QtCore import QDate, Qt, pyqtSignal, QMetaObject, Q_ARG, QTimer, QEvent
+from PyQt5.QtCore import QDate, Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 from network.client import client
+from network.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED
+from transfer.ranker import TransferRanker
 from parser.ticket_parser import parser
 from scheduler.task_scheduler import scheduler
 from exporter.exporter import export_to_excel, export_to_csv
 from logger.logger import setup_logger
 from utils.station_parser import station_parser
+from gui.station_completer import StationCompleter
+from gui.result_table import ResultTableView, ChunkedPlanAppender
+from gui.train_picker import TrainListModel, TrainFilterProxyModel
+from gui.query_runner import QueryRunner, QueryCancelled
 
 # 设置日志
 logger = setup_logger()
 
-# 自定义事件类，用于更新车次表格
-class UpdateTrainTableEvent(QEvent):
-    def __init__(self, trains):
-        super().__init__(QEvent.User)
-        self.trains = trains
-
-
 class MainWindow(QMainWindow):
     """主窗口"""
     
@@ -41,6 +41,15 @@ class MainWindow(QMainWindow):
     update_status = pyqtSignal(str)
     update_progress = pyqtSignal(int)
     update_query_count_signal = pyqtSignal(int)
+    transfer_results_started = pyqtSignal()
+    transfer_plans_found = pyqtSignal(list)
+    update_transfer_result = pyqtSignal(list)
+    # 自动盯票线程发现余票、盯票结束时通知主线程
+    auto_track_ticket_found = pyqtSignal(str)
+    auto_track_stopped = pyqtSignal()
+    
+    # 最多显示的中转方案数量
+    max_transfer_plans = 100
     
     def __init__(self):
         """初始化主窗口"""
@@ -131,19 +140,19 @@ class MainWindow(QMainWindow):
             }
             
             /* 表格样式 */
-            QTableWidget {
+            QTableView {
                 border: 1px solid #DDDDDD;
                 border-radius: 4px;
                 background-color: white;
                 alternate-background-color: #F5F5F5;
             }
             
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 font-size: 13px;
             }
             
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #E3F2FD;
                 color: #1565C0;
             }
@@ -241,6 +250,10 @@ class MainWindow(QMainWindow):
         self.query_count = 0
         # 车次数据
         self.all_trains = []
+        # 查询线程池，查询结果表格和盯票车次列表各自只保留最新的一次查询
+        self.query_runner = QueryRunner(parent=self)
+        # 中转方案显示后是否需要调整列宽
+        self.fit_transfer_columns = True
         # 创建自动盯票状态标签
         self.auto_track_status_label = QLabel("自动盯票: 未启动")
         # 连接信号到槽函数
@@ -258,6 +271,11 @@ class MainWindow(QMainWindow):
         self.update_result.connect(self.display_results)
         self.update_status.connect(self.status_bar.showMessage)
         self.update_progress.connect(self.progress_bar.setValue)
+        self.transfer_results_started.connect(self.begin_transfer_results)
+        self.transfer_plans_found.connect(self.append_transfer_results)
+        self.update_transfer_result.connect(self.display_transfer_results)
+        self.auto_track_ticket_found.connect(self.on_auto_track_ticket_found)
+        self.auto_track_stopped.connect(self.update_auto_track_status)
         
         # 初始化时禁用所有按钮，只启用网络检测按钮
         self.disable_all_buttons()
@@ -322,9 +340,8 @@ class MainWindow(QMainWindow):
         cities = station_parser.get_cities()
         logger.info(f"在城市下拉框中添加了 {len(cities)} 个城市")
         
-        for city in cities:
-            self.start_city.addItem(city)
-            self.end_city.addItem(city)
+        self.start_city.addItems(cities)
+        self.end_city.addItems(cities)
         
         # 为城市下拉框添加自动补全
         start_city_completer = QCompleter(cities)
@@ -345,20 +362,12 @@ class MainWindow(QMainWindow):
             start_stations = station_parser.get_stations_by_city(first_city)
             end_stations = station_parser.get_stations_by_city(first_city)
             
-            for station in start_stations:
-                self.start_station.addItem(station)
-            
-            for station in end_stations:
-                self.end_station.addItem(station)
-            
-            # 为站点下拉框添加自动补全
-            start_station_completer = QCompleter(start_stations)
-            start_station_completer.setCaseSensitivity(Qt.CaseInsensitive)
-            self.start_station.setCompleter(start_station_completer)
-            
-            end_station_completer = QCompleter(end_stations)
-            end_station_completer.setCaseSensitivity(Qt.CaseInsensitive)
-            self.end_station.setCompleter(end_station_completer)
+            self.start_station.addItems(start_stations)
+            self.end_station.addItems(end_stations)
+        
+        # 站点下拉框的自动补全在所有站点中按中文名称、全拼或简拼查找，切换城市时不需要更新
+        self.start_station.setCompleter(StationCompleter(self.start_station))
+        self.end_station.setCompleter(StationCompleter(self.end_station))
         
         self.query_date = QDateEdit()
         self.query_date.setDate(QDate.currentDate())
@@ -409,24 +418,17 @@ class MainWindow(QMainWindow):
         result_layout.setContentsMargins(15, 15, 15, 15)
         result_layout.setSpacing(10)
         
-        # 创建表格
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(8)
-        self.result_table.setHorizontalHeaderLabels([
-            "车次", "出发时间", "到达时间", "历时", 
-            "出发站", "到达站", "日期", "余票信息"
-        ])
+        # 创建表格，余票信息由委托直接绘制
+        self.result_table = ResultTableView()
+        self.result_model = self.result_table.result_model
         # 设置最后一列自动拉伸
         self.result_table.horizontalHeader().setStretchLastSection(True)
-        # 设置表格自动调整行高
-        from PyQt5.QtWidgets import QHeaderView
-        self.result_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         # 设置表格水平滚动条策略
         self.result_table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         # 设置表格样式
         self.result_table.setAlternatingRowColors(True)
-        self.result_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.result_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.result_table.setSelectionBehavior(QTableView.SelectRows)
+        self.result_table.setSelectionMode(QTableView.SingleSelection)
         # 设置表头样式
         header = self.result_table.horizontalHeader()
         header.setStyleSheet("""
@@ -439,6 +441,12 @@ class MainWindow(QMainWindow):
             }
         """)
         
+        # 中转方案分片显示，每一帧只插入一部分，显示过程中给出已显示的数量
+        self.transfer_appender = ChunkedPlanAppender(self.result_model, parent=self)
+        self.transfer_appender.progressed.connect(self.on_transfer_rows_rendered)
+        self.render_status_label = QLabel()
+        self.render_status_label.setVisible(False)
+        
         # 创建进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setValue(0)
@@ -447,6 +455,7 @@ class MainWindow(QMainWindow):
         
         # 添加到布局
         result_layout.addWidget(self.result_table)
+        result_layout.addWidget(self.render_status_label)
         result_layout.addWidget(self.progress_bar)
         
         result_group.setLayout(result_layout)
@@ -486,6 +495,13 @@ class MainWindow(QMainWindow):
         self.transfer_button.clicked.connect(self.start_transfer_query)
         self.transfer_button.setMinimumWidth(120)
         
+        # 最多中转次数，大于1时按轮次搜索多次中转方案
+        self.max_transfers_spinbox = QSpinBox()
+        self.max_transfers_spinbox.setRange(1, 3)
+        self.max_transfers_spinbox.setValue(1)
+        self.max_transfers_spinbox.setPrefix("最多中转 ")
+        self.max_transfers_spinbox.setSuffix(" 次")
+        
         self.test_network_button = QPushButton("检测网络")
         self.test_network_button.clicked.connect(self.test_network)
         # 设置默认颜色为红色
@@ -539,6 +555,7 @@ class MainWindow(QMainWindow):
         button_layout1.addWidget(self.schedule_button)
         button_layout1.addSpacing(10)
         button_layout1.addWidget(self.transfer_button)
+        button_layout1.addWidget(self.max_transfers_spinbox)
         button_layout1.addSpacing(10)
         button_layout1.addWidget(self.auto_track_button)
         button_layout1.addSpacing(10)
@@ -585,13 +602,11 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(True)
         self.update_progress.emit(20)
         
-        # 在新线程中执行查询
-        thread = threading.Thread(
-            target=self.query_tickets,
-            args=(start_station, end_station, query_date, train_type)
-        )
-        thread.daemon = True
-        thread.start()
+        # 在查询线程池中执行，取代尚未完成的上一次查询
+        self.cancel_transfer_rendering()
+        # 尚未完成的定时查询结果不再显示，避免覆盖本次查询的结果
+        self.query_runner.cancel("scheduled")
+        self.query_runner.submit("result", self.query_tickets, start_station, end_station, query_date, train_type)
     
     def on_start_city_changed(self, city_name):
         """
@@ -605,13 +620,7 @@ class MainWindow(QMainWindow):
         
         # 添加该城市的所有站点
         stations = station_parser.get_stations_by_city(city_name)
-        for station in stations:
-            self.start_station.addItem(station)
-        
-        # 更新站点下拉框的自动补全
-        start_station_completer = QCompleter(stations)
-        start_station_completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.start_station.setCompleter(start_station_completer)
+        self.start_station.addItems(stations)
         
         logger.info(f"更新了出发城市 {city_name} 的站点列表，共 {len(stations)} 个站点")
     
@@ -627,13 +636,7 @@ class MainWindow(QMainWindow):
         
         # 添加该城市的所有站点
         stations = station_parser.get_stations_by_city(city_name)
-        for station in stations:
-            self.end_station.addItem(station)
-        
-        # 更新站点下拉框的自动补全
-        end_station_completer = QCompleter(stations)
-        end_station_completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.end_station.setCompleter(end_station_completer)
+        self.end_station.addItems(stations)
         
         logger.info(f"更新了目的城市 {city_name} 的站点列表，共 {len(stations)} 个站点")
     
@@ -655,30 +658,31 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(True)
         self.update_progress.emit(20)
         
-        # 在新线程中执行查询
-        thread = threading.Thread(
-            target=self.query_transfer_tickets,
-            args=(start_station, end_station, query_date)
-        )
-        thread.daemon = True
-        thread.start()
+        # 在查询线程池中执行，与直达查询共用结果表格，取代尚未完成的上一次查询
+        self.cancel_transfer_rendering()
+        # 尚未完成的定时查询结果不再显示，避免覆盖本次查询的结果
+        self.query_runner.cancel("scheduled")
+        self.query_runner.submit("result", self.query_transfer_tickets, start_station, end_station, query_date,
+                                 self.max_transfers_spinbox.value())
     
-    def query_tickets(self, start_station, end_station, query_date, train_type):
+    def query_tickets(self, token, start_station, end_station, query_date, train_type, priority=PRIORITY_INTERACTIVE):
         """
-        查询车票
+        查询车票，在查询线程池中执行，界面更新通过令牌交给主线程
         
         Args:
+            token: 查询令牌
             start_station: 出发地
             end_station: 目的地
             query_date: 查询日期
             train_type: 车次类型
+            priority: 请求优先级，定时查询使用较低优先级
         """
         try:
             # 记录查询开始时间
             query_start_time = time.time()
             
-            self.update_status.emit("正在查询...")
-            self.update_progress.emit(20)
+            token.post(self.update_status.emit, "正在查询...")
+            token.post(self.update_progress.emit, 20)
             
             # 获取站点编码（使用缓存，避免重复查询）
             from_station = client.get_station_code(start_station)
@@ -686,66 +690,29 @@ class MainWindow(QMainWindow):
             
             # 检查站点编码是否有效
             if from_station == start_station:
-                self.status_bar.showMessage(f"错误：出发站点 '{start_station}' 不存在")
+                token.post(self.status_bar.showMessage, f"错误：出发站点 '{start_station}' 不存在")
                 logger.error(f"出发站点 '{start_station}' 不存在")
-                self.update_status.emit("查询失败：站点不存在")
-                self.update_progress.emit(0)
+                token.post(self.update_status.emit, "查询失败：站点不存在")
+                token.post(self.update_progress.emit, 0)
                 return
             if to_station == end_station:
-                self.status_bar.showMessage(f"错误：到达站点 '{end_station}' 不存在")
+                token.post(self.status_bar.showMessage, f"错误：到达站点 '{end_station}' 不存在")
                 logger.error(f"到达站点 '{end_station}' 不存在")
-                self.update_status.emit("查询失败：站点不存在")
-                self.update_progress.emit(0)
+                token.post(self.update_status.emit, "查询失败：站点不存在")
+                token.post(self.update_progress.emit, 0)
                 return
             
-            # 构建查询URL（使用通用查询接口，支持所有类型车次）
-            url = "https://kyfw.12306.cn/otn/leftTicket/query"
-            params = {
-                "leftTicketDTO.train_date": query_date,
-                "leftTicketDTO.from_station": from_station,
-                "leftTicketDTO.to_station": to_station,
-                "purpose_codes": "ADULT"
-            }
-            
-            # 发送请求，使用最大重试次数
+            # 发送请求，使用最大重试次数（允许复用几秒内的缓存结果）
+            token.check()
             try:
-                response = client.get(url, params=params, max_retries=3)
-                
-                # 解析JSON结果
-                import json
-                try:
-                    result = response.json()
-                    logger.info("JSON解析成功")
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON解析失败: {e}")
-                    # 尝试从响应中提取有用信息
-                    if "网络可能存在问题" in response.text:
-                        logger.error("12306返回了反爬页面")
-                    elif "DOCTYPE html" in response.text:
-                        logger.error("12306返回了HTML页面，可能是反爬")
-                    # 记录响应内容的前200字符，避免编码错误
-                    try:
-                        # 尝试将响应内容转换为UTF-8编码，处理编码问题
-                        response_content = response.text[:200]
-                        # 使用repr()函数来显示原始字符串，避免编码错误
-                        # 进一步处理，确保字符串可以被正确编码
-                        safe_content = repr(response_content).encode('utf-8', 'ignore').decode('utf-8')
-                        logger.error(f"响应内容前200字符: {safe_content}")
-                    except Exception as encode_error:
-                        logger.error(f"记录响应内容时出现编码错误: {encode_error}")
-                        # 尝试使用响应的原始字节来记录
-                        try:
-                            raw_content = response.content[:200]
-                            safe_raw = repr(raw_content).encode('utf-8', 'ignore').decode('utf-8')
-                            logger.error(f"响应原始字节前200: {safe_raw}")
-                        except Exception as raw_error:
-                            logger.error(f"记录原始响应内容时出现错误: {raw_error}")
-                    raise
+                result = client.query_left_ticket(query_date, from_station, to_station,
+                                                  max_retries=3, priority=priority)
+                logger.info("JSON解析成功")
             except Exception as e:
                 logger.error(f"网络请求失败: {e}")
-                self.update_status.emit("查询失败：网络请求错误")
-                self.update_progress.emit(0)
-                self.status_bar.showMessage(f"查询失败：网络请求错误")
+                token.post(self.update_status.emit, "查询失败：网络请求错误")
+                token.post(self.update_progress.emit, 0)
+                token.post(self.status_bar.showMessage, f"查询失败：网络请求错误")
                 raise
             
             # 处理查询结果
@@ -753,114 +720,33 @@ class MainWindow(QMainWindow):
             try:
                 if not result:
                     logger.error("查询结果为空")
-                    self.update_status.emit("查询结果为空")
-                    self.update_result.emit([])
+                    token.post(self.update_status.emit, "查询结果为空")
+                    token.post(self.update_result.emit, [])
                     return
                 
                 if result.get("status"):
                     data = result.get("data", {})
                     if not data:
                         logger.error("查询结果中没有数据")
-                        self.update_status.emit("查询结果中没有数据")
-                        self.update_result.emit([])
+                        token.post(self.update_status.emit, "查询结果中没有数据")
+                        token.post(self.update_result.emit, [])
                         return
                     
                     result_list = data.get("result", [])
                     if not result_list:
                         logger.info("查询结果为空，可能没有直达车次")
-                        self.update_status.emit("查询结果为空，可能没有直达车次")
-                        self.update_result.emit([])
+                        token.post(self.update_status.emit, "查询结果为空，可能没有直达车次")
+                        token.post(self.update_result.emit, [])
                         return
                     
-                    for item in result_list:
-                        # 解析车次信息
-                        fields = item.split("|")
-                        if len(fields) < 30:
-                            continue
-                        
-                        train_number = fields[3]
-                        start_station_code = fields[6]
-                        end_station_code = fields[7]
+                    for record in parser.parse_left_ticket(result_list):
                         # 将站点编码转换为中文名称
-                        start_station_name = client.get_station_name(start_station_code)
-                        end_station_name = client.get_station_name(end_station_code)
-                        start_time = fields[8]
-                        end_time = fields[9]
-                        duration = fields[10]
-                        
-                        # 解析余票信息
-                        remaining_tickets = {
-                            "商务座": fields[32] if fields[32] != "" else "无",
-                            "一等座": fields[31] if fields[31] != "" else "无",
-                            "二等座": fields[30] if fields[30] != "" else "无",
-                            "硬卧": fields[28] if fields[28] != "" else "无",
-                            "硬座": fields[29] if fields[29] != "" else "无",
-                            "软卧": fields[23] if fields[23] != "" else "无",
-                            "站票": fields[26] if len(fields) > 26 and fields[26] != "" else "无"
-                        }
-                        
-                        # 解析价格信息
-                        prices = {}
-                        # 注意：12306 API的价格信息格式可能会变化，这里使用更可靠的解析方式
-                        # 尝试从不同位置获取价格信息
-                        
-                        # 调试：打印字段长度和部分字段值
-                        logger.debug(f"字段长度: {len(fields)}")
-                        if len(fields) > 45:
-                            logger.debug(f"字段36-45: {fields[36:46]}")
-                        
-                        # 常见的价格字段位置（根据实际API返回调整）
-                        # 注意：不同座位类型的价格字段位置可能不同
-                        # 尝试从多个可能的位置获取价格信息
-                        possible_price_positions = {
-                            "硬座": [36, 42],
-                            "硬卧": [37, 43],
-                            "软卧": [38, 44],
-                            "二等座": [39, 45],
-                            "一等座": [40, 46],
-                            "商务座": [41, 47]
-                        }
-                        
-                        # 解析价格信息
-                        for seat_type, positions in possible_price_positions.items():
-                            for pos in positions:
-                                if pos < len(fields):
-                                    price = fields[pos]
-                                    if price and price != "" and price != "0":
-                                        # 尝试解析价格为数字
-                                        try:
-                                            # 提取数字部分
-                                            import re
-                                            clean_price = re.sub(r'[^0-9]', '', price)
-                                            if clean_price:
-                                                price_int = int(clean_price)
-                                                # 检查价格是否合理（10-10000之间）
-                                                if 10 <= price_int <= 10000:
-                                                    prices[seat_type] = str(price_int)
-                                                    break
-                                        except:
-                                            pass
-                            if seat_type not in prices:
-                                prices[seat_type] = "-"
-                        
-                        ticket_info = {
-                            "train_number": train_number,
-                            "start_time": start_time,
-                            "end_time": end_time,
-                            "duration": duration,
-                            "start_station": start_station_name,
-                            "end_station": end_station_name,
-                            "date": query_date,
-                            "remaining_tickets": remaining_tickets,
-                            "prices": prices
-                        }
-                        
-                        tickets.append(ticket_info)
+                        tickets.append(record.to_ticket_info(query_date, client.get_station_name))
                 else:
                     error_message = result.get('messages', '未知错误')
                     logger.error(f"查询失败: {error_message}")
-                    self.update_status.emit(f"查询失败: {error_message}")
-                    self.update_result.emit([])
+                    token.post(self.update_status.emit, f"查询失败: {error_message}")
+                    token.post(self.update_result.emit, [])
                     return
                 
                 # 过滤车次类型
@@ -880,13 +766,13 @@ class MainWindow(QMainWindow):
                 end_time = time.time()
                 query_time = end_time - query_start_time
                 
-                self.update_progress.emit(80)
-                self.update_result.emit(tickets)
+                token.post(self.update_progress.emit, 80)
+                token.post(self.update_result.emit, tickets)
                 
                 # 显示查询用时
                 logger.info(f"查询用时: {query_time:.2f} 秒")
-                self.status_bar.showMessage(f"查询完成，用时: {query_time:.2f} 秒")
-                self.update_status.emit(f"查询完成，找到 {len(tickets)} 条记录，用时: {query_time:.2f} 秒")
+                token.post(self.status_bar.showMessage, f"查询完成，用时: {query_time:.2f} 秒")
+                token.post(self.update_status.emit, f"查询完成，找到 {len(tickets)} 条记录，用时: {query_time:.2f} 秒")
             except Exception as e:
                 # 计算查询用时
                 end_time = time.time()
@@ -894,9 +780,11 @@ class MainWindow(QMainWindow):
                 
                 logger.error(f"处理查询结果失败: {e}")
                 logger.info(f"查询用时: {query_time:.2f} 秒")
-                self.status_bar.showMessage(f"处理查询结果失败，用时: {query_time:.2f} 秒")
-                self.update_status.emit(f"处理查询结果失败，用时: {query_time:.2f} 秒")
-                self.update_result.emit([])
+                token.post(self.status_bar.showMessage, f"处理查询结果失败，用时: {query_time:.2f} 秒")
+                token.post(self.update_status.emit, f"处理查询结果失败，用时: {query_time:.2f} 秒")
+                token.post(self.update_result.emit, [])
+        except QueryCancelled:
+            raise
         except Exception as e:
             # 计算查询用时
             end_time = time.time()
@@ -904,44 +792,33 @@ class MainWindow(QMainWindow):
             
             logger.error(f"查询失败: {e}")
             logger.info(f"查询用时: {query_time:.2f} 秒")
-            self.status_bar.showMessage(f"查询失败，用时: {query_time:.2f} 秒")
-            self.update_status.emit(f"查询失败: {str(e)}，用时: {query_time:.2f} 秒")
+            token.post(self.status_bar.showMessage, f"查询失败，用时: {query_time:.2f} 秒")
+            token.post(self.update_status.emit, f"查询失败: {str(e)}，用时: {query_time:.2f} 秒")
         finally:
-            self.update_progress.emit(100)
+            token.post(self.update_progress.emit, 100)
             # 隐藏进度条
-            self.progress_bar.setVisible(False)
+            token.post(self.progress_bar.setVisible, False)
     
-    def query_transfer_tickets(self, start_station, end_station, query_date):
+    def query_transfer_tickets(self, token, start_station, end_station, query_date, max_transfers=1):
         """
-        查询中转车次
+        查询中转车次，在查询线程池中执行，界面更新通过令牌交给主线程
         
         Args:
+            token: 查询令牌
             start_station: 出发地
             end_station: 目的地
             query_date: 查询日期
+            max_transfers: 最多中转次数
         """
         try:
             # 记录查询开始时间
             query_start_time = time.time()
             
-            self.update_status.emit("正在查询中转车次...")
-            self.update_progress.emit(20)
-            
-            # 首先访问首页，获取cookie和会话信息
-            logger.info("1. 访问12306首页获取会话信息...")
-            index_url = "https://kyfw.12306.cn/"
-            index_response = client.get(index_url)
-            logger.info(f"首页访问成功，状态码: {index_response.status_code}")
-            
-            self.update_progress.emit(30)
+            token.post(self.update_status.emit, "正在查询中转车次...")
+            token.post(self.update_progress.emit, 20)
             
-            # 然后访问余票查询页面，获取更多会话信息
-            logger.info("2. 访问余票查询页面获取会话信息...")
-            left_ticket_url = "https://kyfw.12306.cn/otn/leftTicket/init"
-            left_ticket_response = client.get(left_ticket_url)
-            logger.info(f"余票查询页面访问成功，状态码: {left_ticket_response.status_code}")
-            
-            self.update_progress.emit(40)
+            # 会话Cookie由网络客户端统一维护（本地持久化，遇到反爬页面时自动刷新）
+            token.post(self.update_progress.emit, 40)
             
             # 获取站点编码
             from_station = client.get_station_code(start_station)
@@ -949,62 +826,62 @@ class MainWindow(QMainWindow):
             
             # 检查站点编码是否有效
             if from_station == start_station:
-                self.status_bar.showMessage(f"错误：出发站点 '{start_station}' 不存在")
+                token.post(self.status_bar.showMessage, f"错误：出发站点 '{start_station}' 不存在")
                 logger.error(f"出发站点 '{start_station}' 不存在")
-                self.update_status.emit("查询失败：站点不存在")
-                self.update_progress.emit(0)
+                token.post(self.update_status.emit, "查询失败：站点不存在")
+                token.post(self.update_progress.emit, 0)
                 return
             if to_station == end_station:
-                self.status_bar.showMessage(f"错误：到达站点 '{end_station}' 不存在")
+                token.post(self.status_bar.showMessage, f"错误：到达站点 '{end_station}' 不存在")
                 logger.error(f"到达站点 '{end_station}' 不存在")
-                self.update_status.emit("查询失败：站点不存在")
-                self.update_progress.emit(0)
+                token.post(self.update_status.emit, "查询失败：站点不存在")
+                token.post(self.update_progress.emit, 0)
                 return
             
-            self.update_progress.emit(60)
-            
-            # 查询中转车次
-            logger.info(f"3. 查询中转车次: {start_station} -> {end_station}")
-            transfer_plans = client.query_transfer_tickets(start_station, end_station, query_date)
-            
-            self.update_progress.emit(80)
-            
-            if not transfer_plans:
-                logger.warning("未找到符合条件的中转车次")
-                self.update_status.emit("未找到符合条件的中转车次")
-                self.update_progress.emit(100)
-                # 在主线程中显示结果
-                QTimer.singleShot(0, lambda: self.display_transfer_results([]))
-                return
-            
-            logger.info(f"准备在主线程中显示 {len(transfer_plans)} 个中转方案")
-            
-            # 保存中转方案到实例变量，以便在主线程中访问
-            self.transfer_plans_to_display = transfer_plans
+            token.post(self.update_progress.emit, 60)
+            
+            # 查询中转车次，每匹配完一个中转站就在主线程中追加显示
+            logger.info(f"查询中转车次: {start_station} -> {end_station}")
+            token.check()
+            token.post(self.transfer_results_started.emit)
+            ranker = TransferRanker()
+            plan_count = 0
+            # 被新查询取代时令牌的 cancelled 被设置，客户端不再发送线路查询并结束迭代，
+            # 尚未完成的中转站查询随之放弃
+            with closing(client.iter_transfer_plans(start_station, end_station, query_date,
+                                                    max_transfers=max_transfers, ranker=ranker,
+                                                    cancelled=token.cancelled)) as plan_batches:
+                for plans in plan_batches:
+                    token.check()
+                    plan_count += len(plans)
+                    token.post(self.transfer_plans_found.emit, plans)
+                    token.post(self.update_status.emit, f"正在查询中转车次，已找到 {plan_count} 个中转方案...")
+                    token.post(self.update_progress.emit, min(95, 60 + plan_count))
+            token.check()
+            
+            # 查询结束后按排序结果更新显示，去掉被更优方案挤出排名的方案
+            transfer_plans = ranker.ranked()
+            plan_count = len(transfer_plans)
+            token.post(self.update_transfer_result.emit, transfer_plans)
             
             # 计算查询用时
             end_time = time.time()
             query_time = end_time - query_start_time
             
-            # 在主线程中显示结果
-            from PyQt5.QtCore import QTimer
-            
-            logger.info("使用 QTimer.singleShot 在主线程中显示结果")
-            try:
-                # 使用 QTimer.singleShot 在主线程中执行
-                QTimer.singleShot(0, self.display_transfer_results_in_main_thread)
-                logger.info("QTimer.singleShot 调用完成")
-            except Exception as e:
-                logger.error(f"调用 QTimer.singleShot 失败: {e}")
-                import traceback
-                traceback.print_exc()
+            if not plan_count:
+                logger.warning("未找到符合条件的中转车次")
+                token.post(self.update_status.emit, f"未找到符合条件的中转车次，用时: {query_time:.2f} 秒")
+                token.post(self.update_progress.emit, 100)
+                return
             
             # 显示查询用时
             logger.info(f"查询用时: {query_time:.2f} 秒")
-            self.status_bar.showMessage(f"查询完成，用时: {query_time:.2f} 秒")
-            self.update_status.emit(f"查询完成，找到 {len(transfer_plans)} 个中转方案，用时: {query_time:.2f} 秒")
-            self.update_progress.emit(100)
-            
+            token.post(self.status_bar.showMessage, f"查询完成，用时: {query_time:.2f} 秒")
+            token.post(self.update_status.emit, f"查询完成，找到 {plan_count} 个中转方案，用时: {query_time:.2f} 秒")
+            token.post(self.update_progress.emit, 100)
+        
+        except QueryCancelled:
+            raise
         except Exception as e:
             # 计算查询用时
             end_time = time.time()
@@ -1012,13 +889,13 @@ class MainWindow(QMainWindow):
             
             logger.error(f"查询中转车次失败: {e}")
             logger.info(f"查询用时: {query_time:.2f} 秒")
-            self.status_bar.showMessage(f"查询失败，用时: {query_time:.2f} 秒")
-            self.update_status.emit(f"查询失败: {str(e)}，用时: {query_time:.2f} 秒")
+            token.post(self.status_bar.showMessage, f"查询失败，用时: {query_time:.2f} 秒")
+            token.post(self.update_status.emit, f"查询失败: {str(e)}，用时: {query_time:.2f} 秒")
             # 隐藏进度条
-            QTimer.singleShot(0, lambda: self.progress_bar.setVisible(False))
+            token.post(self.progress_bar.setVisible, False)
         else:
             # 查询成功，在主线程中隐藏进度条
-            QTimer.singleShot(0, lambda: self.progress_bar.setVisible(False))
+            token.post(self.progress_bar.setVisible, False)
     
     def display_results(self, tickets):
         """
@@ -1027,322 +904,138 @@ class MainWindow(QMainWindow):
         Args:
             tickets: 车票信息列表
         """
-        from PyQt5.QtGui import QColor, QFont
-        from PyQt5.QtWidgets import QTableWidgetItem, QTextEdit, QFrame
-        
         try:
             # 保存结果
             self.query_results = tickets
             
-            # 清空表格并释放控件
-            self.clear_table_widgets()
-            self.result_table.setRowCount(0)
-            logger.info("表格已清空")
-            
-            # 计算总行数（包含标题行）
-            total_rows = 1 + len(tickets) if tickets else 0
-            logger.info(f"总共有 {total_rows} 行数据需要显示")
+            # 停止显示上一次查询尚未显示完的中转方案
+            self.cancel_transfer_rendering()
             
-            # 预设置表格行数，避免频繁的行插入操作
-            self.result_table.setRowCount(total_rows)
-            logger.info("表格行数已设置")
-            
-            if tickets:
-                # 添加直达车次标题行
-                logger.info("添加直达车次标题行")
-                
-                # 设置标题行的样式
-                title_font = QFont()
-                title_font.setBold(True)
-                title_font.setPointSize(10)
-                
-                # 创建标题单元格
-                title_item = QTableWidgetItem("直达车次")
-                title_item.setFont(title_font)
-                title_item.setBackground(QColor(200, 220, 255))  # 浅蓝色背景
-                title_item.setTextAlignment(132)  # 居中对齐
-                
-                # 设置标题行的单元格
-                self.result_table.setItem(0, 0, title_item)
-                
-                # 设置车次数量
-                count_item = QTableWidgetItem(f"共 {len(tickets)} 个车次")
-                count_item.setFont(title_font)
-                count_item.setBackground(QColor(200, 220, 255))
-                count_item.setTextAlignment(132)
-                self.result_table.setItem(0, 3, count_item)
-                
-                # 填充表格
-                for idx, ticket in enumerate(tickets):
-                    row_position = idx + 1  # 跳过标题行
-                    logger.info(f"处理第 {idx+1} 个直达车次: {ticket['train_number']}")
-                    
-                    # 为不同车次设置交替背景颜色
-                    bg_color = QColor(245, 245, 245) if idx % 2 == 0 else QColor(255, 255, 255)
-                    
-                    # 填充数据
-                    train_number_item = QTableWidgetItem(ticket["train_number"])
-                    train_number_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 0, train_number_item)
-                    
-                    start_time_item = QTableWidgetItem(ticket["start_time"])
-                    start_time_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 1, start_time_item)
-                    
-                    end_time_item = QTableWidgetItem(ticket["end_time"])
-                    end_time_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 2, end_time_item)
-                    
-                    duration_item = QTableWidgetItem(ticket["duration"])
-                    duration_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 3, duration_item)
-                    
-                    start_station_item = QTableWidgetItem(ticket["start_station"])
-                    start_station_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 4, start_station_item)
-                    
-                    end_station_item = QTableWidgetItem(ticket["end_station"])
-                    end_station_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 5, end_station_item)
-                    
-                    date_item = QTableWidgetItem(ticket["date"])
-                    date_item.setBackground(bg_color)
-                    self.result_table.setItem(row_position, 6, date_item)
-                    
-                    # 格式化余票信息，突出显示有票的座位
-                    remaining_lines = []
-                    for k, v in ticket["remaining_tickets"].items():
-                        if v:
-                            # 获取对应座位的价格
-                            price = ticket.get("prices", {}).get(k, "-")
-                            price_str = f" (¥{price})" if price != "-" else ""
-                            
-                            if v == "有":
-                                # 使用更显眼的样式突出显示有票的座位
-                                line = f"<span style='font-weight: bold; font-size: 20px; color: green;'>{k}: {v}{price_str}</span>"
-                            elif v != "无":
-                                # 显示有具体数量的余票
-                                line = f"<span style='font-weight: bold; font-size: 20px; color: blue;'>{k}: {v}{price_str}</span>"
-                            else:
-                                # 无票信息使用灰色，不突出显示
-                                line = f"<span style='font-size: 20px; color: gray;'>{k}: {v}{price_str}</span>"
-                            remaining_lines.append(line)
-                    remaining_info = "<br>" + "<br>".join(remaining_lines)
-                    # 创建文本编辑框作为单元格widget，支持HTML
-                    text_edit = QTextEdit()
-                    text_edit.setHtml(remaining_info)
-                    text_edit.setReadOnly(True)
-                    text_edit.setFrameShape(QFrame.NoFrame)
-                    text_edit.setStyleSheet(f"background-color: {bg_color.name()}; border: none;")
-                    # 设置文本编辑框的大小
-                    text_edit.setMinimumHeight(100)
-                    text_edit.setMaximumHeight(200)
-                    # 将文本编辑框设置为单元格widget
-                    self.result_table.setCellWidget(row_position, 7, text_edit)
+            # 与表格中原有的车次对比，只更新有变化的行和单元格
+            first_display = self.result_model.rowCount() == 0
+            self.result_model.set_tickets(tickets)
+            logger.info(f"总共有 {self.result_model.rowCount()} 行数据需要显示")
             
             # 启用导出按钮
             self.export_excel_button.setEnabled(len(tickets) > 0)
             self.export_csv_button.setEnabled(len(tickets) > 0)
             logger.info(f"导出按钮状态已更新，Excel: {self.export_excel_button.isEnabled()}, CSV: {self.export_csv_button.isEnabled()}")
             
-            # 调整列宽
-            self.result_table.resizeColumnsToContents()
+            # 第一次显示结果时调整列宽，刷新时保持原有列宽
+            if first_display:
+                self.result_table.resizeColumnsToContents()
             logger.info("直达车次结果显示完成")
         except Exception as e:
             logger.error(f"显示直达车次结果失败: {e}")
             import traceback
             traceback.print_exc()
     
-    def display_transfer_results_in_main_thread(self):
+    def begin_transfer_results(self):
+        """
+        开始显示新一次中转查询的结果，清空表格
+        """
+        self.query_results = []
+        self.cancel_transfer_rendering()
+        self.result_model.clear()
+        self.fit_transfer_columns = True
+        self.export_excel_button.setEnabled(False)
+        self.export_csv_button.setEnabled(False)
+        logger.info("表格已清空")
+    
+    def display_transfer_results(self, transfer_plans):
         """
-        在主线程中显示中转车次结果
-        这个方法会被 QMetaObject.invokeMethod 调用
+        显示中转车次结果，与表格中原有的方案对比后只更新有变化的部分
+        
+        Args:
+            transfer_plans: 中转车次计划列表
         """
         try:
-            logger.info("开始在主线程中显示中转车次结果")
-            if hasattr(self, 'transfer_plans_to_display'):
-                transfer_plans = self.transfer_plans_to_display
-                logger.info(f"从实例变量中获取到 {len(transfer_plans)} 个中转方案")
-                self.display_transfer_results(transfer_plans)
-                logger.info("中转车次结果显示完成")
-            else:
-                logger.error("没有找到 transfer_plans_to_display 实例变量")
+            if len(transfer_plans) > self.max_transfer_plans:
+                logger.info(f"中转方案数量过多，只显示前 {self.max_transfer_plans} 个方案")
+                transfer_plans = transfer_plans[:self.max_transfer_plans]
+            
+            # 队列中尚未显示的方案直接包含在最终结果中
+            self.cancel_transfer_rendering()
+            
+            # 保存结果
+            self.query_results = list(transfer_plans)
+            first_display = self.result_model.rowCount() == 0
+            self.result_model.set_plans(self.query_results)
+            
+            # 启用导出按钮
+            self.export_excel_button.setEnabled(len(self.query_results) > 0)
+            self.export_csv_button.setEnabled(len(self.query_results) > 0)
+            
+            # 第一次显示结果时调整列宽，刷新时保持原有列宽
+            if first_display:
+                self.result_table.resizeColumnsToContents()
+            logger.info(f"中转车次结果显示完成，共 {len(self.query_results)} 个方案")
         except Exception as e:
-            logger.error(f"在主线程中显示中转车次结果失败: {e}")
+            logger.error(f"显示中转车次结果失败: {e}")
             import traceback
             traceback.print_exc()
     
-    def display_transfer_results(self, transfer_plans):
+    def append_transfer_results(self, transfer_plans):
         """
-        显示中转车次结果
+        在表格末尾追加一批中转车次结果
         
         Args:
-            transfer_plans: 中转车次计划列表
+            transfer_plans: 新找到的中转车次计划列表
         """
-        from PyQt5.QtGui import QColor, QFont
-        from PyQt5.QtWidgets import QTableWidgetItem, QTextEdit, QFrame, QApplication
-        
         try:
             # 限制显示的中转方案数量，避免处理过多数据
-            max_plans = 100
-            if len(transfer_plans) > max_plans:
+            max_plans = self.max_transfer_plans
+            shown = len(self.query_results)
+            if shown + len(transfer_plans) > max_plans:
                 logger.info(f"中转方案数量过多，只显示前 {max_plans} 个方案")
-                transfer_plans = transfer_plans[:max_plans]
+                transfer_plans = transfer_plans[:max(0, max_plans - shown)]
+            if not transfer_plans:
+                return
             
-            logger.info(f"开始显示中转车次结果，共 {len(transfer_plans)} 个方案")
+            logger.info(f"收到 {len(transfer_plans)} 个中转方案，之前已收到 {shown} 个")
             
             # 保存结果
-            self.query_results = transfer_plans
-            
-            # 清空表格并释放控件
-            self.clear_table_widgets()
-            self.result_table.setRowCount(0)
-            logger.info("表格已清空")
-            
-            # 计算总行数（每个方案包含标题行 + 车次行）
-            total_rows = sum(1 + len(plan['transfers']) for plan in transfer_plans)
-            logger.info(f"总共有 {total_rows} 行数据需要显示")
+            self.query_results.extend(transfer_plans)
             
-            # 预设置表格行数，避免频繁的行插入操作
-            self.result_table.setRowCount(total_rows)
-            logger.info("表格行数已设置")
-            
-            # 填充表格
-            current_row = 0
-            for plan_idx, plan in enumerate(transfer_plans):
-                logger.info(f"处理第 {plan_idx+1} 个中转方案，包含 {len(plan['transfers'])} 个车次")
-                
-                # 添加方案标题行
-                logger.info(f"添加第 {plan_idx+1} 个方案的标题行")
-                
-                # 设置标题行的样式
-                title_font = QFont()
-                title_font.setBold(True)
-                title_font.setPointSize(10)
-                
-                # 创建标题单元格
-                title_item = QTableWidgetItem(f"中转方案 {plan_idx+1}")
-                title_item.setFont(title_font)
-                title_item.setBackground(QColor(200, 220, 255))  # 浅蓝色背景
-                title_item.setTextAlignment(132)  # 居中对齐
-                
-                # 设置标题行的单元格
-                self.result_table.setItem(current_row, 0, title_item)
-                
-                # 设置总历时
-                total_duration_item = QTableWidgetItem(f"总历时: {plan.get('total_duration', '未知')}")
-                total_duration_item.setFont(title_font)
-                total_duration_item.setBackground(QColor(200, 220, 255))
-                total_duration_item.setTextAlignment(132)
-                self.result_table.setItem(current_row, 3, total_duration_item)
-                
-                # 设置中转站信息
-                transfer_station_item = QTableWidgetItem(f"中转站: {plan.get('transfer_station', '未知')}")
-                transfer_station_item.setFont(title_font)
-                transfer_station_item.setBackground(QColor(200, 220, 255))
-                transfer_station_item.setTextAlignment(132)
-                self.result_table.setItem(current_row, 4, transfer_station_item)
-                
-                # 设置中转时间
-                transfer_time_item = QTableWidgetItem(f"中转时间: {plan.get('transfer_time', '未知')}")
-                transfer_time_item.setFont(title_font)
-                transfer_time_item.setBackground(QColor(200, 220, 255))
-                transfer_time_item.setTextAlignment(132)
-                self.result_table.setItem(current_row, 5, transfer_time_item)
-                
-                # 合并标题行的单元格（如果需要）
-                # 注意：QTableWidget的合并单元格功能有限，这里我们只是设置了每个单元格的样式
-                
-                # 增加当前行索引
-                current_row += 1
-                
-                # 为每个中转方案的车次设置背景颜色
-                plan_background_color = QColor(245, 245, 245) if plan_idx % 2 == 0 else QColor(255, 255, 255)
-                
-                # 为每个中转方案创建多行
-                for i, transfer in enumerate(plan["transfers"]):
-                    logger.info(f"处理第 {current_row} 行，车次: {transfer['train_number']}")
-                    
-                    # 填充数据
-                    train_number_item = QTableWidgetItem(transfer["train_number"])
-                    train_number_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 0, train_number_item)
-                    
-                    start_time_item = QTableWidgetItem(transfer["start_time"])
-                    start_time_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 1, start_time_item)
-                    
-                    end_time_item = QTableWidgetItem(transfer["end_time"])
-                    end_time_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 2, end_time_item)
-                    
-                    duration_item = QTableWidgetItem(transfer["duration"])
-                    duration_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 3, duration_item)
-                    
-                    start_station_item = QTableWidgetItem(transfer["start_station"])
-                    start_station_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 4, start_station_item)
-                    
-                    end_station_item = QTableWidgetItem(transfer["end_station"])
-                    end_station_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 5, end_station_item)
-                    
-                    date_item = QTableWidgetItem(plan["date"])
-                    date_item.setBackground(plan_background_color)
-                    self.result_table.setItem(current_row, 6, date_item)
-                    
-                    # 格式化余票信息，突出显示有票的座位
-                    remaining_lines = []
-                    for k, v in transfer["remaining_tickets"].items():
-                        if v:
-                            # 获取对应座位的价格
-                            price = transfer.get("prices", {}).get(k, "-")
-                            price_str = f" (¥{price})" if price != "-" else ""
-                            
-                            if v == "有":
-                                # 使用更显眼的样式突出显示有票的座位
-                                line = f"<span style='font-weight: bold; font-size: 20px; color: green;'>{k}: {v}{price_str}</span>"
-                            elif v != "无":
-                                # 显示有具体数量的余票
-                                line = f"<span style='font-weight: bold; font-size: 20px; color: blue;'>{k}: {v}{price_str}</span>"
-                            else:
-                                # 无票信息使用灰色，不突出显示
-                                line = f"<span style='font-size: 20px; color: gray;'>{k}: {v}{price_str}</span>"
-                            remaining_lines.append(line)
-                    remaining_info = "<br>" + "<br>".join(remaining_lines)
-                    # 创建文本编辑框作为单元格widget，支持HTML
-                    text_edit = QTextEdit()
-                    text_edit.setHtml(remaining_info)
-                    text_edit.setReadOnly(True)
-                    text_edit.setFrameShape(QFrame.NoFrame)
-                    text_edit.setStyleSheet(f"background-color: {plan_background_color.name()}; border: none;")
-                    # 设置文本编辑框的大小
-                    text_edit.setMinimumHeight(100)
-                    text_edit.setMaximumHeight(200)
-                    # 将文本编辑框设置为单元格widget
-                    self.result_table.setCellWidget(current_row, 7, text_edit)
-                    
-                    # 增加当前行索引
-                    current_row += 1
-                    
-                    # 每处理10个中转方案后，处理事件队列，避免UI卡顿
-                    if (plan_idx + 1) % 10 == 0:
-                        QApplication.processEvents()
+            # 加入分片显示的队列，由定时器分批插入表格
+            self.transfer_appender.append(transfer_plans)
             
             # 启用导出按钮
-            self.export_excel_button.setEnabled(len(transfer_plans) > 0)
-            self.export_csv_button.setEnabled(len(transfer_plans) > 0)
-            
-            # 调整列宽
-            self.result_table.resizeColumnsToContents()
+            self.export_excel_button.setEnabled(len(self.query_results) > 0)
+            self.export_csv_button.setEnabled(len(self.query_results) > 0)
             logger.info(f"导出按钮状态已更新，Excel: {self.export_excel_button.isEnabled()}, CSV: {self.export_csv_button.isEnabled()}")
-            logger.info("中转车次结果显示完成")
         except Exception as e:
             logger.error(f"显示中转车次结果失败: {e}")
             import traceback
             traceback.print_exc()
     
+    def on_transfer_rows_rendered(self, shown, total):
+        """
+        中转方案分片显示的进度更新
+        
+        Args:
+            shown: 已显示的方案数
+            total: 已收到的方案数
+        """
+        # 第一批方案显示后调整列宽
+        if self.fit_transfer_columns and shown:
+            self.fit_transfer_columns = False
+            self.result_table.resizeColumnsToContents()
+        
+        if shown < total:
+            self.render_status_label.setText(f"正在显示中转方案：已显示 {shown} / {total} 个")
+            self.render_status_label.setVisible(True)
+        else:
+            self.render_status_label.setVisible(False)
+            logger.info(f"中转车次结果显示完成，共 {shown} 个方案")
+    
+    def cancel_transfer_rendering(self):
+        """
+        停止分片显示，丢弃尚未显示的中转方案
+        """
+        self.transfer_appender.cancel()
+        self.render_status_label.setVisible(False)
+    
     def toggle_schedule(self):
         """
         切换定时查询状态
@@ -1351,6 +1044,7 @@ class MainWindow(QMainWindow):
             # 停止定时查询
             scheduler.remove_task(self.scheduled_task_id)
             self.scheduled_task_id = None
+            self.query_runner.cancel("scheduled")
             self.schedule_button.setText("定时查询")
             self.update_status.emit("定时查询已停止")
         else:
@@ -1368,13 +1062,15 @@ class MainWindow(QMainWindow):
                 query_date = self.query_date.date().toString("yyyy-MM-dd")
                 train_type = self.train_type.currentText()
                 
-                # 使用QMetaObject.invokeMethod在主线程中执行查询
-                QMetaObject.invokeMethod(self, "query_tickets", 
-                                       Qt.QueuedConnection, 
-                                       Q_ARG(str, start_station),
-                                       Q_ARG(str, end_station),
-                                       Q_ARG(str, query_date),
-                                       Q_ARG(str, train_type))
+                # 用户手动发起的查询还未结束时跳过本次定时查询，不能取代用户的查询
+                if self.query_runner.is_busy("result"):
+                    logger.info("手动查询尚未结束，跳过本次定时查询")
+                    return
+                
+                # 交给查询线程池执行（结果在主线程中更新界面），
+                # 定时查询单独使用一个视图，并使用定时查询优先级，不抢占用户手动发起的查询
+                self.query_runner.submit("scheduled", self.query_tickets, start_station, end_station, query_date,
+                                         train_type, priority=PRIORITY_SCHEDULED)
             
             self.scheduled_task_id = scheduler.add_task(300, scheduled_query)  # 5分钟查询一次
             scheduler.start()
@@ -1423,31 +1119,12 @@ class MainWindow(QMainWindow):
                 logger.error(f"导出CSV失败: {e}")
                 QMessageBox.error(self, "错误", f"导出失败: {str(e)}")
     
-    def clear_table_widgets(self):
-        """
-        清空表格中的所有控件，释放内存
-        """
-        try:
-            # 遍历所有行和列，删除单元格中的控件
-            for row in range(self.result_table.rowCount()):
-                for col in range(self.result_table.columnCount()):
-                    # 检查是否有控件
-                    widget = self.result_table.cellWidget(row, col)
-                    if widget:
-                        # 移除控件
-                        self.result_table.setCellWidget(row, col, None)
-                        # 显式删除控件
-                        widget.deleteLater()
-            logger.info("表格控件已清空")
-        except Exception as e:
-            logger.error(f"清空表格控件失败: {e}")
-    
     def clear_results(self):
         """
         清空结果
         """
-        self.clear_table_widgets()
-        self.result_table.setRowCount(0)
+        self.cancel_transfer_rendering()
+        self.result_model.clear()
         self.query_results = []
         self.export_excel_button.setEnabled(False)
         self.export_csv_button.setEnabled(False)
@@ -1566,12 +1243,12 @@ class MainWindow(QMainWindow):
         
         train_layout.addLayout(search_filter_layout)
         
-        # 创建车次列表表格
-        self.train_table = QTableWidget()
-        self.train_table.setColumnCount(7)
-        self.train_table.setHorizontalHeaderLabels([
-            "选择", "车次", "出发站", "到达站", "发车时间", "到达时间", "历时"
-        ])
+        # 创建车次列表表格，选中状态保存在模型中，筛选只更新代理模型
+        self.train_model = TrainListModel(self.auto_track_config.get('selected_trains', []), dialog)
+        self.train_proxy = TrainFilterProxyModel(dialog)
+        self.train_proxy.setSourceModel(self.train_model)
+        self.train_table = QTableView()
+        self.train_table.setModel(self.train_proxy)
         # 设置第一列为复选框
         self.train_table.setColumnWidth(0, 50)
         # 设置其他列宽
@@ -1581,8 +1258,6 @@ class MainWindow(QMainWindow):
         self.train_table.setColumnWidth(4, 80)
         self.train_table.setColumnWidth(5, 80)
         self.train_table.setColumnWidth(6, 80)
-        # 设置表格自动调整行高
-        self.train_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         
         train_layout.addWidget(self.train_table)
         
@@ -1682,6 +1357,10 @@ class MainWindow(QMainWindow):
         
         dialog.setLayout(layout)
         dialog.exec_()
+        
+        # 对话框关闭后不再需要车次列表，丢弃尚未完成的加载
+        self.query_runner.cancel("trains")
+        self.cancel_load_trains_timer()
     
     def load_trains(self, start_station, end_station, query_date):
         """
@@ -1706,13 +1385,8 @@ class MainWindow(QMainWindow):
         self.load_trains_timer.timeout.connect(self.check_load_trains_timeout)
         self.load_trains_timer.start(20000)  # 20秒超时
         
-        # 在新线程中加载车次数据
-        thread = threading.Thread(
-            target=self._load_trains_thread,
-            args=(start_station, end_station, query_date)
-        )
-        thread.daemon = True
-        thread.start()
+        # 在查询线程池中加载车次数据，取代尚未完成的上一次加载
+        self.query_runner.submit("trains", self._load_trains_thread, start_station, end_station, query_date)
     
     def check_load_trains_timeout(self):
         """
@@ -1721,6 +1395,8 @@ class MainWindow(QMainWindow):
         # 检查是否已经超时
         elapsed = time.time() - self.load_trains_start_time
         if elapsed >= 20:
+            # 丢弃之后到达的加载结果
+            self.query_runner.cancel("trains")
             # 显示超时错误
             error_msg = "加载车次数据超时，请检查网络连接后重试"
             self.train_load_status.setText(f"加载失败: {error_msg}")
@@ -1735,32 +1411,12 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'load_trains_timer') and self.load_trains_timer.isActive():
             self.load_trains_timer.stop()
     
-    def event(self, event):
-        """
-        处理自定义事件
-        """
-        if event.type() == QEvent.User:
-            if isinstance(event, UpdateTrainTableEvent):
-                logger.info("收到更新车次表格事件，车次数量: {}".format(len(event.trains)))
-                self.update_train_table(event.trains)
-                return True
-            elif hasattr(event, 'message'):
-                # 处理通知事件
-                logger.info("收到通知事件，显示余票通知")
-                self.show_ticket_notification(event.message)
-                return True
-            else:
-                # 处理状态更新事件
-                logger.info("收到状态更新事件，更新自动盯票状态")
-                self.update_auto_track_status()
-                return True
-        return super().event(event)
-    
-    def _load_trains_thread(self, start_station, end_station, query_date):
+    def _load_trains_thread(self, token, start_station, end_station, query_date):
         """
-        加载车次数据的线程函数
+        加载车次数据的任务函数，在查询线程池中执行
         
         Args:
+            token: 查询令牌
             start_station: 出发地
             end_station: 目的地
             query_date: 查询日期
@@ -1774,21 +1430,12 @@ class MainWindow(QMainWindow):
             if from_station == start_station or to_station == end_station:
                 error_msg = f"站点编码无效: {start_station} -> {end_station}"
                 logger.error(error_msg)
-                QTimer.singleShot(0, lambda: self.show_train_load_error(error_msg))
+                token.post(self.show_train_load_error, error_msg)
                 return
             
-            # 构建查询参数
-            url = "https://kyfw.12306.cn/otn/leftTicket/query"
-            params = {
-                "leftTicketDTO.train_date": query_date,
-                "leftTicketDTO.from_station": from_station,
-                "leftTicketDTO.to_station": to_station,
-                "purpose_codes": "ADULT"
-            }
-            
-            # 发送请求
-            response = client.get(url, params=params, max_retries=3)
-            result = response.json()
+            # 发送请求（允许复用缓存结果）
+            token.check()
+            result = client.query_left_ticket(query_date, from_station, to_station, max_retries=3)
             
             # 处理查询结果
             if result.get("status"):
@@ -1798,19 +1445,8 @@ class MainWindow(QMainWindow):
                 logger.info(f"查询结果包含 {len(result_list)} 个车次")
                 
                 trains = []
-                for item in result_list:
-                    fields = item.split("|")
-                    if len(fields) < 30:
-                        continue
-                    
-                    train_number = fields[3]
-                    start_station_code = fields[6]
-                    end_station_code = fields[7]
-                    start_station_name = client.get_station_name(start_station_code)
-                    end_station_name = client.get_station_name(end_station_code)
-                    start_time = fields[8]
-                    end_time = fields[9]
-                    duration = fields[10]
+                for record in parser.parse_left_ticket(result_list):
+                    train_number = record.train_number
                     
                     # 获取车次类型
                     train_type = "其他类型"
@@ -1829,36 +1465,33 @@ class MainWindow(QMainWindow):
                     
                     trains.append({
                         "train_number": train_number,
-                        "start_station": start_station_name,
-                        "end_station": end_station_name,
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "duration": duration,
+                        "start_station": client.get_station_name(record.from_station_code),
+                        "end_station": client.get_station_name(record.to_station_code),
+                        "start_time": record.start_time,
+                        "end_time": record.end_time,
+                        "duration": record.duration,
+                        "start_minutes": record.start_minutes,
+                        "duration_minutes": record.duration_minutes,
                         "train_type": train_type
                     })
                 
-                # 保存车次数据
-                self.all_trains = trains
-                
                 logger.info(f"成功解析 {len(trains)} 个车次")
                 
-                # 在主线程中更新表格
-                logger.info("准备更新UI，车次数量: {}".format(len(trains)))
-                # 使用QApplication.postEvent发送事件，在主线程中更新UI
-                event = UpdateTrainTableEvent(trains)
-                QApplication.postEvent(self, event)
-                logger.info("事件已发送到事件队列")
+                # 在主线程中更新表格，加载已被取代时丢弃
+                token.post(self.update_train_table, trains)
             else:
                 error_msg = f"查询失败: {result.get('messages', '未知错误')}"
                 logger.error(error_msg)
-                QTimer.singleShot(0, lambda: self.show_train_load_error(error_msg))
+                token.post(self.show_train_load_error, error_msg)
+        except QueryCancelled:
+            raise
         except Exception as e:
             error_msg = f"加载车次数据失败: {str(e)}"
             logger.error(error_msg)
-            QTimer.singleShot(0, lambda: self.show_train_load_error(error_msg))
+            token.post(self.show_train_load_error, error_msg)
         finally:
             # 确保无论是否发生异常，加载按钮都会重新启用
-            QTimer.singleShot(0, lambda: self.load_trains_button.setEnabled(True))
+            token.post(self.load_trains_button.setEnabled, True)
     
     def update_train_table(self, trains):
         """
@@ -1870,29 +1503,11 @@ class MainWindow(QMainWindow):
         # 取消超时定时器
         self.cancel_load_trains_timer()
         
-        # 清空表格
-        self.train_table.setRowCount(0)
-        
-        # 填充表格
-        for train in trains:
-            row_position = self.train_table.rowCount()
-            self.train_table.insertRow(row_position)
-            
-            # 添加复选框
-            checkbox = QTableWidgetItem()
-            checkbox.setCheckState(Qt.Unchecked)
-            # 检查是否在之前的选择中
-            if train['train_number'] in self.auto_track_config.get('selected_trains', []):
-                checkbox.setCheckState(Qt.Checked)
-            self.train_table.setItem(row_position, 0, checkbox)
-            
-            # 填充其他数据
-            self.train_table.setItem(row_position, 1, QTableWidgetItem(train['train_number']))
-            self.train_table.setItem(row_position, 2, QTableWidgetItem(train['start_station']))
-            self.train_table.setItem(row_position, 3, QTableWidgetItem(train['end_station']))
-            self.train_table.setItem(row_position, 4, QTableWidgetItem(train['start_time']))
-            self.train_table.setItem(row_position, 5, QTableWidgetItem(train['end_time']))
-            self.train_table.setItem(row_position, 6, QTableWidgetItem(train['duration']))
+        # 保存车次数据
+        self.all_trains = trains
+        
+        # 替换模型中的车次，已选中的车次保持选中，当前的筛选条件继续生效
+        self.train_model.set_trains(trains)
         
         # 更新加载状态
         self.train_load_status.setText(f"成功加载 {len(trains)} 个车次")
@@ -1918,24 +1533,7 @@ class MainWindow(QMainWindow):
         """
         筛选车次
         """
-        search_text = self.train_search_edit.text().strip()
-        filter_type = self.train_type_filter.currentText()
-        
-        # 筛选车次
-        filtered_trains = []
-        for train in self.all_trains:
-            # 按搜索文本筛选
-            if search_text and search_text not in train['train_number']:
-                continue
-            
-            # 按车次类型筛选
-            if filter_type != "全部类型" and train['train_type'] != filter_type:
-                continue
-            
-            filtered_trains.append(train)
-        
-        # 更新表格
-        self.update_train_table(filtered_trains)
+        self.train_proxy.set_filter(self.train_search_edit.text(), self.train_type_filter.currentText())
     
     def start_auto_track(self, dialog, start_station, end_station, query_date):
         """
@@ -1961,13 +1559,8 @@ class MainWindow(QMainWindow):
         
         # 获取选中的车次
         selected_trains = []
-        if hasattr(self, 'train_table'):
-            for row in range(self.train_table.rowCount()):
-                checkbox_item = self.train_table.item(row, 0)
-                if checkbox_item and checkbox_item.checkState() == Qt.Checked:
-                    train_number_item = self.train_table.item(row, 1)
-                    if train_number_item:
-                        selected_trains.append(train_number_item.text())
+        if hasattr(self, 'train_model'):
+            selected_trains = self.train_model.checked_trains()
         
         # 获取查询间隔范围
         min_interval = self.min_interval_spinbox.value()
@@ -2210,18 +1803,10 @@ class MainWindow(QMainWindow):
                     time.sleep(random_interval)
                     continue
                 
-                # 构建查询参数
-                url = "https://kyfw.12306.cn/otn/leftTicket/query"
-                params = {
-                    "leftTicketDTO.train_date": query_date,
-                    "leftTicketDTO.from_station": from_station,
-                    "leftTicketDTO.to_station": to_station,
-                    "purpose_codes": "ADULT"
-                }
-                
-                # 发送请求
-                response = client.get(url, params=params, max_retries=3)
-                result = response.json()
+                # 发送请求，盯票需要实时数据，跳过缓存
+                result = client.query_left_ticket(query_date, from_station, to_station,
+                                                  force_refresh=True, max_retries=3,
+                                                  priority=PRIORITY_SCHEDULED)
                 
                 # 处理查询结果
                 if result.get("status"):
@@ -2229,30 +1814,8 @@ class MainWindow(QMainWindow):
                     result_list = data.get("result", [])
                     
                     # 遍历车次
-                    for item in result_list:
-                        fields = item.split("|")
-                        if len(fields) < 30:
-                            continue
-                        
-                        train_number = fields[3]
-                        start_station_code = fields[6]
-                        end_station_code = fields[7]
-                        start_station_name = client.get_station_name(start_station_code)
-                        end_station_name = client.get_station_name(end_station_code)
-                        start_time = fields[8]
-                        end_time = fields[9]
-                        duration = fields[10]
-                        
-                        # 解析余票信息
-                        remaining_tickets = {
-                            "商务座": fields[32] if fields[32] != "" else "无",
-                            "一等座": fields[31] if fields[31] != "" else "无",
-                            "二等座": fields[30] if fields[30] != "" else "无",
-                            "硬卧": fields[28] if fields[28] != "" else "无",
-                            "硬座": fields[29] if fields[29] != "" else "无",
-                            "软卧": fields[23] if fields[23] != "" else "无",
-                            "站票": fields[26] if len(fields) > 26 and fields[26] != "" else "无"
-                        }
+                    for record in parser.parse_left_ticket(result_list):
+                        train_number = record.train_number
                         
                         # 检查车类型
                         train_type = "普通列车"
@@ -2272,53 +1835,29 @@ class MainWindow(QMainWindow):
                         # 检查是否有符合条件的座位
                         available_seats = []
                         for seat_class in seat_classes:
-                            if seat_class in remaining_tickets:
-                                seat_status = remaining_tickets[seat_class]
-                                if seat_status != "无" and seat_status != "":
-                                    available_seats.append(f"{seat_class}: {seat_status}")
+                            if record.has_seat(seat_class):
+                                available_seats.append(f"{seat_class}: {record.seat_status(seat_class)}")
                         
                         # 如果有符合条件的座位，发送通知
                         if available_seats:
-                            message = f"发现符合条件的余票！\n车次: {train_number}\n出发: {start_station_name} {start_time}\n到达: {end_station_name} {end_time}\n历时: {duration}\n余票: {', '.join(available_seats)}"
+                            start_station_name = client.get_station_name(record.from_station_code)
+                            end_station_name = client.get_station_name(record.to_station_code)
+                            message = f"发现符合条件的余票！\n车次: {train_number}\n出发: {start_station_name} {record.start_time}\n到达: {end_station_name} {record.end_time}\n历时: {record.duration}\n余票: {', '.join(available_seats)}"
                             logger.info(message)
                             
                             # 发送邮件通知
                             send_email_notification(message)
                             
-                            # 在主线程中显示通知
-                            logger.info("准备显示余票通知")
-                            # 使用QApplication.postEvent发送事件，在主线程中显示通知
-                            class NotificationEvent(QEvent):
-                                def __init__(self, message):
-                                    super().__init__(QEvent.User)
-                                    self.message = message
-                            
-                            event = NotificationEvent(message)
-                            QApplication.postEvent(self, event)
-                            
                             # 发现余票后自动停止盯票
                             logger.info("发现余票，自动停止盯票任务")
                             self.auto_track_running = False
                             
-                            # 启用所有配置控件
-                            def enable_controls():
-                                if hasattr(self, 'enable_config_controls'):
-                                    self.enable_config_controls()
-                            
-                            # 在主线程中启用配置控件
-                            QTimer.singleShot(0, enable_controls)
-                            
-                            # 发送事件更新状态
-                            class StatusUpdateEvent(QEvent):
-                                def __init__(self):
-                                    super().__init__(QEvent.User)
-                            
-                            event = StatusUpdateEvent()
-                            QApplication.postEvent(self, event)
+                            # 通过信号在主线程中启用配置控件、更新状态并显示通知
+                            self.auto_track_ticket_found.emit(message)
                             
                             # 立即跳出所有循环
                             return
-                
+            
             except Exception as e:
                 logger.error(f"自动盯票任务异常: {e}")
             
@@ -2334,8 +1873,19 @@ class MainWindow(QMainWindow):
         
         logger.info("自动盯票任务已停止")
         
-        # 更新主界面的自动盯票状态标签
-        QTimer.singleShot(0, lambda: self.update_auto_track_status())
+        # 通过信号在主线程中更新自动盯票状态标签
+        self.auto_track_stopped.emit()
+    
+    def on_auto_track_ticket_found(self, message):
+        """
+        自动盯票发现余票后在主线程中启用配置控件、更新状态并显示通知
+        
+        Args:
+            message: 通知消息
+        """
+        self.enable_config_controls()
+        self.update_auto_track_status()
+        self.show_ticket_notification(message)
     
     def show_ticket_notification(self, message):
         """
@@ -2464,7 +2014,7 @@ class MainWindow(QMainWindow):
                 self.test_network_button.setEnabled(True)
                 # 更新状态栏信息
                 self.status_bar.showMessage("就绪 - 网络连接异常，请重新检测")
-            
+        
         except Exception as e:
             logger.error(f"网络检测失败: {e}")
             self.status_bar.showMessage("网络检测失败")
@@ -2728,6 +2278,9 @@ class MainWindow(QMainWindow):
             scheduler.remove_task(self.scheduled_task_id)
         scheduler.stop()
         
+        # 取消尚未完成的查询
+        self.query_runner.shutdown()
+        
         # 关闭网络客户端
         client.close()
         
@@ -2791,7 +2344,7 @@ class MainWindow(QMainWindow):
                 # 释放内存
                 import gc
                 gc.collect()
-                
+        
         except Exception as e:
             print(f"清理日志时出错: {e}")
             QMessageBox.critical(self, "错误", f"清理日志时出错: {e}")
@@ -2871,18 +2424,18 @@ class MainWindow(QMainWindow):
             padding: 3px 5px;
         }
         
-        QTableWidget {
+        QTableView {
             background-color: #3c3c3c;
             color: #e0e0e0;
             border: 1px solid #555;
         }
         
-        QTableWidget::item {
+        QTableView::item {
             background-color: #3c3c3c;
             color: #e0e0e0;
         }
         
-        QTableWidget::item:selected {
+        QTableView::item:selected {
             background-color: #5a5a5a;
             color: #e0e0e0;
         }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面查询任务的执行器
+
+查询在有界线程池中执行，每个视图（查询结果表格、盯票车次列表）同一时间只保留最新的一次查询：
+发起新查询时取消该视图尚未开始的旧查询，正在执行的旧查询在下一个检查点停止，
+旧查询晚到的结果和状态更新在主线程中直接丢弃，不会覆盖新查询的结果。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+class QueryCancelled(Exception):
+    """查询已被同一视图的新查询取代"""
+
+
+class QueryToken:
+    """
+    一次查询的令牌
+    
+    查询任务通过令牌判断自己是否已被取代，并通过令牌把界面更新交给主线程执行。
+    """
+    
+    def __init__(self, runner, view, generation):
+        """
+        初始化令牌
+        
+        Args:
+            runner: 所属的 QueryRunner
+            view: 视图名称
+            generation: 该视图的查询代号
+        """
+        self._runner = runner
+        self.view = view
+        self.generation = generation
+        self.cancelled = threading.Event()
+    
+    def is_current(self):
+        """
+        判断查询是否仍是该视图的最新查询
+        
+        Returns:
+            bool: 未被取消且没有更新的查询时返回True
+        """
+        return not self.cancelled.is_set() and self._runner.generation(self.view) == self.generation
+    
+    def check(self):
+        """
+        检查点：查询已被取代时抛出 QueryCancelled，在发送请求前调用
+        
+        Raises:
+            QueryCancelled: 查询已被取代
+        """
+        if not self.is_current():
+            raise QueryCancelled(f"{self.view} 查询 #{self.generation} 已被取代")
+    
+    def post(self, callback, *args):
+        """
+        在主线程中执行界面更新，执行时查询已被取代则丢弃
+        
+        Args:
+            callback: 界面更新函数（或信号的 emit）
+            args: 参数
+        """
+        self._runner.posted.emit(self, callback, args)
+
+
+class QueryRunner(QObject):
+    """
+    有界线程池和按视图划分的查询代号
+    """
+    
+    # 查询任务提交的界面更新: (令牌, 函数, 参数)
+    posted = pyqtSignal(object, object, object)
+    
+    def __init__(self, max_workers=2, parent=None):
+        """
+        初始化执行器，需要在主线程中创建
+        
+        Args:
+            max_workers: 线程池的最大线程数
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Query")
+        self._lock = threading.Lock()
+        # {视图名称: 查询代号}
+        self._generations = {}
+        # {视图名称: (令牌, Future)}
+        self._current = {}
+        self.posted.connect(self._deliver)
+    
+    def generation(self, view):
+        """
+        获取视图当前的查询代号
+        
+        Args:
+            view: 视图名称
+        
+        Returns:
+            int: 查询代号，没有查询过时为0
+        """
+        return self._generations.get(view, 0)
+    
+    def is_busy(self, view):
+        """
+        判断视图是否还有未结束的查询
+        
+        Args:
+            view: 视图名称
+        
+        Returns:
+            bool: 最新的查询还在排队或执行时返回True
+        """
+        with self._lock:
+            current = self._current.get(view)
+            return current is not None and current[0].is_current() and not current[1].done()
+    
+    def submit(self, view, func, *args, **kwargs):
+        """
+        提交查询任务，取代该视图之前的查询
+        
+        Args:
+            view: 视图名称
+            func: 任务函数，第一个参数为 QueryToken
+            args: 任务参数
+            kwargs: 任务关键字参数
+        
+        Returns:
+            QueryToken: 本次查询的令牌
+        """
+        with self._lock:
+            self._cancel_locked(view)
+            token = QueryToken(self, view, self._generations.get(view, 0) + 1)
+            self._generations[view] = token.generation
+            future = self._executor.submit(self._run, token, func, args, kwargs)
+            self._current[view] = (token, future)
+        return token
+    
+    def cancel(self, view):
+        """
+        取消视图当前的查询，之后到达的结果都会被丢弃
+        
+        Args:
+            view: 视图名称
+        """
+        with self._lock:
+            self._cancel_locked(view)
+            # 已经结束的查询可能还有尚未执行的界面更新，同样丢弃
+            self._generations[view] = self._generations.get(view, 0) + 1
+    
+    def _cancel_locked(self, view):
+        """取消视图当前的查询"""
+        current = self._current.pop(view, None)
+        if current is None:
+            return
+        token, future = current
+        token.cancelled.set()
+        # 还在队列中的任务直接移除，不会占用线程和请求令牌
+        if future.cancel():
+            logger.info(f"已取消排队中的 {view} 查询 #{token.generation}")
+    
+    def _run(self, token, func, args, kwargs):
+        """在线程池中执行任务"""
+        if not token.is_current():
+            return
+        try:
+            func(token, *args, **kwargs)
+        except QueryCancelled as e:
+            logger.info(str(e))
+        except Exception as e:
+            logger.error(f"{token.view} 查询失败: {e}")
+        finally:
+            with self._lock:
+                if self._current.get(token.view, (None,))[0] is token:
+                    del self._current[token.view]
+    
+    def _deliver(self, token, callback, args):
+        """在主线程中执行查询任务提交的界面更新"""
+        if token.is_current():
+            callback(*args)
+    
+    def shutdown(self):
+        """
+        取消所有查询并关闭线程池，不等待正在执行的查询
+        """
+        with self._lock:
+            for view in list(self._generations):
+                self._cancel_locked(view)
+                self._generations[view] += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
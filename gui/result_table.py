@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果表格，使用模型/视图结构显示直达和中转车次
+
+表格只保存车次信息的引用，单元格内容在绘制时由模型给出，余票信息由委托直接绘制，
+不再为每个单元格创建控件，显示和清空的耗时与控件数量无关。
+"""
+
+import time
+from collections import namedtuple, deque
+from difflib import SequenceMatcher
+from PyQt5.QtWidgets import QTableView, QStyledItemDelegate, QStyleOptionViewItem, QStyle, QHeaderView
+from PyQt5.QtCore import Qt, QObject, QAbstractTableModel, QModelIndex, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+
+# 表格列
+COLUMNS = ("车次", "出发时间", "到达时间", "历时", "出发站", "到达站", "日期", "余票信息")
+SEAT_COLUMN = 7
+
+# 行类型
+ROW_TITLE = 0   # 标题行（直达车次、中转方案）
+ROW_TRAIN = 1   # 车次行
+
+# 余票信息的数据角色，值为 [(文本, 余票状态), ...]
+SEAT_ROLE = Qt.UserRole + 1
+
+# 余票状态
+SEAT_PLENTY = 0   # 有票
+SEAT_COUNT = 1    # 有具体数量的余票
+SEAT_NONE = 2     # 无票
+
+_TITLE_BACKGROUND = QColor(200, 220, 255)
+_GROUP_BACKGROUNDS = (QColor(245, 245, 245), QColor(255, 255, 255))
+_SEAT_COLORS = {SEAT_PLENTY: QColor("green"), SEAT_COUNT: QColor("blue"), SEAT_NONE: QColor("gray")}
+
+# 变化的余票信息高亮显示的时间（毫秒）
+HIGHLIGHT_MS = 2000
+_HIGHLIGHT_BACKGROUND = QColor(255, 236, 179)
+
+# 表格中的一行：类型, 标识（刷新时按标识对应新旧行）, 所属分组序号（用于交替背景色，直达车次为None）,
+# 前七列的文本, 车次信息（标题行为None）
+ResultRow = namedtuple("ResultRow", ["kind", "key", "group", "cells", "ticket"])
+
+
+def seat_lines(ticket):
+    """
+    生成车次的余票信息
+    
+    Args:
+        ticket: 车票信息字典
+    
+    Returns:
+        list: [(文本, 余票状态), ...]，文本如 "二等座: 有 (¥553)"
+    """
+    prices = ticket.get("prices", {})
+    lines = []
+    for seat_type, remaining in ticket["remaining_tickets"].items():
+        if not remaining:
+            continue
+        price = prices.get(seat_type, "-")
+        price_text = f" (¥{price})" if price != "-" else ""
+        if remaining == "有":
+            level = SEAT_PLENTY
+        elif remaining != "无":
+            level = SEAT_COUNT
+        else:
+            level = SEAT_NONE
+        lines.append((f"{seat_type}: {remaining}{price_text}", level))
+    return lines
+
+
+def _train_row(key, group, ticket, date):
+    """生成车次行"""
+    return ResultRow(ROW_TRAIN, key, group, (
+        ticket["train_number"], ticket["start_time"], ticket["end_time"], ticket["duration"],
+        ticket["start_station"], ticket["end_station"], date
+    ), ticket)
+
+
+def _parity(group):
+    """分组序号的奇偶，决定行的背景色"""
+    return None if group is None else group % 2
+
+
+class ResultTableModel(QAbstractTableModel):
+    """
+    查询结果的表格模型
+    
+    每行是一个 ResultRow；直达结果为一个标题行加所有车次行，
+    中转结果中每个方案为一个标题行加各段行程的车次行。
+    显示新的结果时按行标识与当前内容对比，只插入、删除有变化的行，
+    只对内容变化的单元格发出 dataChanged，表格的滚动位置和选中行不受影响。
+    """
+    
+    def __init__(self, parent=None):
+        """
+        初始化模型
+        
+        Args:
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self._rows = []
+        self._plan_count = 0
+        # 余票信息有变化的行: {行标识: 高亮结束时间}
+        self._highlighted = {}
+        self._title_font = QFont()
+        self._title_font.setBold(True)
+        self._title_font.setPointSize(10)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            if column < SEAT_COLUMN:
+                return row.cells[column]
+            if row.ticket is not None:
+                return "\n".join(text for text, _ in seat_lines(row.ticket))
+            return None
+        if role == SEAT_ROLE:
+            return seat_lines(row.ticket) if column == SEAT_COLUMN and row.ticket is not None else None
+        if role == Qt.BackgroundRole:
+            if row.kind == ROW_TITLE:
+                return _TITLE_BACKGROUND if row.cells[column] else None
+            if column == SEAT_COLUMN and row.key in self._highlighted:
+                return _HIGHLIGHT_BACKGROUND
+            # 直达车次使用表格的交替行背景色
+            return None if row.group is None else _GROUP_BACKGROUNDS[row.group % 2]
+        if row.kind == ROW_TITLE and row.cells[column]:
+            if role == Qt.FontRole:
+                return self._title_font
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+        return None
+    
+    def row_kind(self, row):
+        """
+        获取行类型
+        
+        Args:
+            row: 行号
+        
+        Returns:
+            int: ROW_TITLE 或 ROW_TRAIN
+        """
+        return self._rows[row].kind
+    
+    def clear(self):
+        """
+        清空表格
+        """
+        self.beginResetModel()
+        self._rows = []
+        self._plan_count = 0
+        self._highlighted = {}
+        self.endResetModel()
+    
+    def set_tickets(self, tickets):
+        """
+        显示直达车次，与表格中原有的内容对比后更新
+        
+        Args:
+            tickets: 车票信息列表
+        """
+        rows = []
+        if tickets:
+            rows.append(ResultRow(ROW_TITLE, ("direct",), None,
+                                  ("直达车次", "", "", f"共 {len(tickets)} 个车次", "", "", "", ""), None))
+            rows.extend(_train_row(("train", ticket["train_number"], ticket["start_station"], ticket["end_station"]),
+                                   None, ticket, ticket["date"]) for ticket in tickets)
+        self._plan_count = 0
+        self._reconcile(rows)
+    
+    def set_plans(self, plans):
+        """
+        显示中转方案，与表格中原有的内容对比后更新
+        
+        Args:
+            plans: 中转方案列表
+        """
+        self._plan_count = len(plans)
+        self._reconcile(self._plan_rows(plans, 0))
+    
+    def append_plans(self, plans):
+        """
+        在表格末尾追加中转方案
+        
+        Args:
+            plans: 中转方案列表
+        """
+        rows = self._plan_rows(plans, self._plan_count)
+        if not rows:
+            return
+        
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self._plan_count += len(plans)
+        self.endInsertRows()
+    
+    def _plan_rows(self, plans, first_number):
+        """
+        生成中转方案的标题行和车次行
+        
+        Args:
+            plans: 中转方案列表
+            first_number: 第一个方案的序号
+        
+        Returns:
+            list: ResultRow 列表
+        """
+        rows = []
+        for plan_idx, plan in enumerate(plans, first_number):
+            plan_key = ("plan", plan["date"]) + tuple(transfer["train_number"] for transfer in plan["transfers"])
+            rows.append(ResultRow(ROW_TITLE, plan_key, plan_idx, (
+                f"中转方案 {plan_idx+1}", "", "",
+                f"总历时: {plan.get('total_duration', '未知')}",
+                f"中转站: {plan.get('transfer_station', '未知')}",
+                f"中转时间: {plan.get('transfer_time', '未知')}", "", ""
+            ), None))
+            rows.extend(_train_row(plan_key + (i,), plan_idx, transfer, plan["date"])
+                        for i, transfer in enumerate(plan["transfers"]))
+        return rows
+    
+    def _reconcile(self, rows):
+        """
+        将表格内容更新为新的行列表
+        
+        按行标识求出新旧内容的差异：删除、插入有变化的连续行，标识相同的行逐个单元格比较，
+        只对变化的单元格发出 dataChanged，余票信息变化的行高亮显示一段时间。
+        
+        Args:
+            rows: 新的 ResultRow 列表
+        """
+        old_keys = [row.key for row in self._rows]
+        new_keys = [row.key for row in rows]
+        if old_keys == new_keys:
+            opcodes = [("equal", 0, len(rows), 0, len(rows))]
+        else:
+            opcodes = SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+        
+        highlighted = False
+        # 从后向前处理，前面的行号不受影响
+        for tag, old_start, old_end, new_start, new_end in reversed(opcodes):
+            if tag == "equal":
+                for offset in range(old_end - old_start):
+                    new_row = rows[new_start + offset]
+                    if self._rows[old_start + offset] != new_row:
+                        highlighted |= self._update_row(old_start + offset, new_row)
+                    else:
+                        self._rows[old_start + offset] = new_row
+                continue
+            if old_end > old_start:
+                self.beginRemoveRows(QModelIndex(), old_start, old_end - 1)
+                del self._rows[old_start:old_end]
+                self.endRemoveRows()
+            if new_end > new_start:
+                self.beginInsertRows(QModelIndex(), old_start, old_start + new_end - new_start - 1)
+                self._rows[old_start:old_start] = rows[new_start:new_end]
+                self.endInsertRows()
+        
+        if highlighted:
+            QTimer.singleShot(HIGHLIGHT_MS, self._expire_highlights)
+    
+    def _update_row(self, row, new_row):
+        """
+        用标识相同的新行替换第 row 行，对内容变化的单元格发出 dataChanged
+        
+        Args:
+            row: 行号
+            new_row: 新的 ResultRow
+        
+        Returns:
+            bool: 余票信息是否有变化
+        """
+        old_row = self._rows[row]
+        self._rows[row] = new_row
+        
+        if _parity(old_row.group) != _parity(new_row.group):
+            # 背景色变化，整行更新
+            self.dataChanged.emit(self.index(row, 0), self.index(row, SEAT_COLUMN))
+            changed_columns = []
+        else:
+            changed_columns = [column for column in range(SEAT_COLUMN)
+                               if old_row.cells[column] != new_row.cells[column]]
+        
+        seats_changed = old_row.ticket is not None and new_row.ticket is not None and (
+            old_row.ticket["remaining_tickets"] != new_row.ticket["remaining_tickets"]
+            or old_row.ticket.get("prices") != new_row.ticket.get("prices"))
+        if seats_changed:
+            self._highlighted[new_row.key] = time.monotonic() + HIGHLIGHT_MS / 1000
+            changed_columns.append(SEAT_COLUMN)
+        
+        for column in changed_columns:
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index)
+        return seats_changed
+    
+    def _expire_highlights(self):
+        """
+        取消已到期的高亮显示
+        """
+        now = time.monotonic()
+        expired = {key for key, until in self._highlighted.items() if until <= now}
+        if not expired:
+            return
+        for key in expired:
+            del self._highlighted[key]
+        for row, result_row in enumerate(self._rows):
+            if result_row.key in expired:
+                index = self.index(row, SEAT_COLUMN)
+                self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+
+class ChunkedPlanAppender(QObject):
+    """
+    分片追加中转方案
+    
+    新找到的方案先进入队列，由零间隔定时器分批插入模型，两个分片之间事件循环可以处理绘制和输入。
+    插入行之后视图的布局和绘制在分片之外进行，所以每个分片的方案数按上一帧的实际耗时
+    （从上一个分片开始到这一个分片开始）估算，使一帧的总耗时接近时间预算，方案再多界面也不会卡住。
+    """
+    
+    # 已显示的方案数, 已收到的方案数
+    progressed = pyqtSignal(int, int)
+    
+    def __init__(self, model, budget_ms=16, batch_size=8, parent=None):
+        """
+        初始化
+        
+        Args:
+            model: ResultTableModel
+            budget_ms: 每一帧的时间预算（毫秒）
+            batch_size: 每次插入模型的方案数，也是第一个分片的方案数
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.model = model
+        self.budget = budget_ms / 1000
+        self.batch_size = batch_size
+        self._pending = deque()
+        self.shown = 0
+        self.total = 0
+        # 上一个分片的开始时间和方案数，用于估算每个方案的耗时
+        self._last_start = None
+        self._last_count = 0
+        self._slice_plans = batch_size
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._run_slice)
+    
+    def append(self, plans):
+        """
+        将方案加入待显示队列
+        
+        Args:
+            plans: 中转方案列表
+        """
+        if not plans:
+            return
+        self._pending.extend(plans)
+        self.total += len(plans)
+        if not self._timer.isActive():
+            self._last_start = None
+            self._timer.start()
+    
+    def cancel(self):
+        """
+        丢弃尚未显示的方案，并重新开始计数
+        """
+        self._timer.stop()
+        self._pending.clear()
+        self.shown = 0
+        self.total = 0
+        self._last_start = None
+    
+    def is_running(self):
+        """
+        是否还有尚未显示的方案
+        
+        Returns:
+            bool: 队列不为空时返回True
+        """
+        return bool(self._pending)
+    
+    def _run_slice(self):
+        """插入一个分片的方案"""
+        start = time.perf_counter()
+        if self._last_start is not None and self._last_count:
+            per_plan = (start - self._last_start) / self._last_count
+            self._slice_plans = max(1, int(self.budget / per_plan))
+        
+        count = min(self._slice_plans, len(self._pending))
+        deadline = start + self.budget
+        inserted = 0
+        while inserted < count and time.perf_counter() < deadline:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, count - inserted))]
+            self.model.append_plans(batch)
+            inserted += len(batch)
+        
+        self.shown += inserted
+        self._last_start = start
+        self._last_count = inserted
+        if not self._pending:
+            self._timer.stop()
+        self.progressed.emit(self.shown, self.total)
+
+
+class SeatDelegate(QStyledItemDelegate):
+    """
+    余票信息委托，每个座位一行，有票为绿色、有具体数量为蓝色、无票为灰色
+    """
+    
+    def __init__(self, parent=None, pixel_size=20):
+        """
+        初始化委托
+        
+        Args:
+            parent: 父对象
+            pixel_size: 余票信息的字号（像素）
+        """
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setPixelSize(pixel_size)
+        self.bold_font = QFont(self.font)
+        self.bold_font.setBold(True)
+        self.margin = 4
+    
+    def line_height(self):
+        """
+        获取每行余票信息的高度
+        
+        Returns:
+            int: 行高（像素）
+        """
+        return self.font.pixelSize() + 6
+    
+    def paint(self, painter, option, index):
+        lines = index.data(SEAT_ROLE)
+        if not lines:
+            super().paint(painter, option, index)
+            return
+        
+        # 先按普通单元格绘制背景和选中状态，再逐行绘制余票信息
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget else None
+        if style is not None:
+            style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+        
+        painter.save()
+        rect = option.rect.adjusted(self.margin, self.margin, -self.margin, -self.margin)
+        line_height = self.line_height()
+        top = rect.top()
+        for text, level in lines:
+            if top + line_height > rect.bottom() + 1:
+                break
+            painter.setFont(self.font if level == SEAT_NONE else self.bold_font)
+            painter.setPen(_SEAT_COLORS[level])
+            painter.drawText(rect.left(), top, rect.width(), line_height, Qt.AlignLeft | Qt.AlignVCenter, text)
+            top += line_height
+        painter.restore()
+    
+    def sizeHint(self, option, index):
+        lines = index.data(SEAT_ROLE)
+        if not lines:
+            return super().sizeHint(option, index)
+        width = max(len(text) for text, _ in lines) * self.font.pixelSize()
+        return QSize(width, len(lines) * self.line_height() + 2 * self.margin)
+
+
+class ResultTableView(QTableView):
+    """
+    查询结果表格
+    
+    车次行使用固定行高（所有座位类型的余票信息），标题行使用较小的行高；
+    行高只在插入行时设置，不需要逐行计算内容大小。
+    """
+    
+    def __init__(self, parent=None, seat_count=7):
+        """
+        初始化表格
+        
+        Args:
+            parent: 父对象
+            seat_count: 每个车次显示的座位类型数
+        """
+        super().__init__(parent)
+        self.result_model = ResultTableModel(self)
+        self.seat_delegate = SeatDelegate(self)
+        self.setModel(self.result_model)
+        self.setItemDelegateForColumn(SEAT_COLUMN, self.seat_delegate)
+        
+        header = self.verticalHeader()
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        self.train_row_height = seat_count * self.seat_delegate.line_height() + 2 * self.seat_delegate.margin
+        self.title_row_height = 36
+        header.setDefaultSectionSize(self.train_row_height)
+        # 各行内容格式相同，调整列宽时只取前若干行计算
+        self.horizontalHeader().setResizeContentsPrecision(50)
+        
+        self.result_model.rowsInserted.connect(lambda parent, first, last: self._fit_title_rows(first, last))
+        self.result_model.modelReset.connect(lambda: self._fit_title_rows(0, self.result_model.rowCount() - 1))
+    
+    def _fit_title_rows(self, first, last):
+        """
+        设置标题行的行高
+        
+        Args:
+            first: 第一行
+            last: 最后一行
+        """
+        for row in range(first, last + 1):
+            if self.result_model.row_kind(row) == ROW_TITLE:
+                self.setRowHeight(row, self.title_row_height)
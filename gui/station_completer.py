@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+站点输入自动补全，候选站点来自站点解析器的前缀索引，支持中文名称、全拼和简拼
+"""
+
+from PyQt5.QtWidgets import QCompleter
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from utils.station_parser import station_parser
+
+
+class StationCompleterModel(QAbstractListModel):
+    """
+    自动补全候选站点的列表模型
+    
+    只保存当前输入对应的若干个候选站点，输入变化时整体替换。
+    显示文本为 "站点名称  全拼"，补全到输入框的文本为站点名称。
+    """
+    
+    def __init__(self, limit=12, parent=None):
+        """
+        初始化模型
+        
+        Args:
+            limit: 最多显示的候选站点数
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.limit = limit
+        self._stations = []
+        self._text = None
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._stations)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._stations):
+            return None
+        station = self._stations[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{station.name}  {station.pinyin}"
+        if role == Qt.EditRole:
+            return station.name
+        if role == Qt.ToolTipRole:
+            return f"{station.name}（{station.city}）"
+        return None
+    
+    def set_text(self, text):
+        """
+        根据输入文本更新候选站点
+        
+        Args:
+            text: 输入的中文名称、全拼或简拼前缀
+        """
+        if text == self._text:
+            return
+        self._text = text
+        self.beginResetModel()
+        self._stations = station_parser.search_stations(text, self.limit)
+        self.endResetModel()
+
+
+class StationCompleter(QCompleter):
+    """
+    站点自动补全器
+    
+    候选站点由前缀索引直接给出，不再由 QCompleter 自己过滤，
+    切换城市时也不需要重新创建补全器。
+    """
+    
+    def __init__(self, parent=None, limit=12):
+        """
+        初始化补全器
+        
+        Args:
+            parent: 父对象
+            limit: 最多显示的候选站点数
+        """
+        super().__init__(parent)
+        self.station_model = StationCompleterModel(limit, self)
+        self.setModel(self.station_model)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setMaxVisibleItems(limit)
+    
+    def splitPath(self, path):
+        # QCompleter 在输入变化时调用，借此更新候选站点
+        self.station_model.set_text(path)
+        return [""]
+    
+    def pathFromIndex(self, index):
+        return index.data(Qt.EditRole)
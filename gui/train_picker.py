@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动盯票的车次选择列表，车次和选中状态保存在模型中，搜索和类型筛选由代理模型完成
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# 表格列
+COLUMNS = ("选择", "车次", "出发站", "到达站", "发车时间", "到达时间", "历时")
+_FIELDS = (None, "train_number", "start_station", "end_station", "start_time", "end_time", "duration")
+
+# 不筛选车次类型
+ALL_TYPES = "全部类型"
+
+
+class TrainListModel(QAbstractTableModel):
+    """
+    车次列表模型
+    
+    选中状态按车次编号保存，筛选、重新加载车次都不会丢失已选中的车次。
+    """
+    
+    def __init__(self, checked=(), parent=None):
+        """
+        初始化模型
+        
+        Args:
+            checked: 初始选中的车次编号
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self._trains = []
+        self._checked = set(checked)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._trains)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        train = self._trains[index.row()]
+        column = index.column()
+        if column == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if train["train_number"] in self._checked else Qt.Unchecked
+            return None
+        if role == Qt.DisplayRole:
+            return train[_FIELDS[column]]
+        return None
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or index.column() != 0 or role != Qt.CheckStateRole:
+            return False
+        train_number = self._trains[index.row()]["train_number"]
+        if value == Qt.Checked:
+            self._checked.add(train_number)
+        else:
+            self._checked.discard(train_number)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+    
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == 0:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+    
+    def train(self, row):
+        """
+        获取第 row 行的车次信息
+        
+        Args:
+            row: 行号
+        
+        Returns:
+            dict: 车次信息
+        """
+        return self._trains[row]
+    
+    def set_trains(self, trains):
+        """
+        替换车次列表，已选中的车次保持选中
+        
+        Args:
+            trains: 车次信息列表
+        """
+        self.beginResetModel()
+        self._trains = list(trains)
+        self.endResetModel()
+    
+    def checked_trains(self):
+        """
+        获取选中的车次，包括被筛选隐藏的车次
+        
+        Returns:
+            list: 车次编号列表，按列表中的顺序排列
+        """
+        return [train["train_number"] for train in self._trains if train["train_number"] in self._checked]
+
+
+class TrainFilterProxyModel(QSortFilterProxyModel):
+    """
+    按车次编号关键词和车次类型筛选车次
+    """
+    
+    def __init__(self, parent=None):
+        """
+        初始化代理模型
+        
+        Args:
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self._text = ""
+        self._train_type = ALL_TYPES
+    
+    def set_filter(self, text, train_type):
+        """
+        设置筛选条件
+        
+        Args:
+            text: 车次编号关键词，不区分大小写
+            train_type: 车次类型（如 "G字头"），ALL_TYPES 表示不限
+        """
+        text = text.strip().upper()
+        if text == self._text and train_type == self._train_type:
+            return
+        self._text = text
+        self._train_type = train_type
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row, source_parent):
+        train = self.sourceModel().train(source_row)
+        if self._text and self._text not in train["train_number"].upper():
+            return False
+        return self._train_type == ALL_TYPES or train["train_type"] == self._train_type
@@ -5,9 +5,13 @@
 """
 
 import sys
+import time
 from gui.main_window import MainWindow
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from logger.logger import setup_logger
+from network.client import client
+from utils.station_parser import station_parser
 
 # 设置日志
 logger = setup_logger()
@@ -19,9 +23,17 @@ def main():
         # 创建应用实例
         app = QApplication(sys.argv)
         
+        # 加载站点信息，需要时在后台从官网更新
+        station_parser.load_stations()
+        
         # 创建主窗口
+        start_time = time.time()
         main_window = MainWindow()
         main_window.show()
+        logger.info(f"主窗口显示耗时: {time.time() - start_time:.2f} 秒")
+        
+        # 窗口显示后再创建网络客户端，会话初始化在后台进行
+        QTimer.singleShot(0, client.get_instance)
         
         # 运行应用
         sys.exit(app.exec_())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应退避模块，根据反爬检测结果调整请求间隔
+"""
+
+import time
+import random
+import threading
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+# 熔断器状态
+CIRCUIT_CLOSED = "closed"        # 正常请求
+CIRCUIT_OPEN = "open"            # 熔断中，直接失败
+CIRCUIT_HALF_OPEN = "half_open"  # 试探请求
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝请求时抛出"""
+
+
+class AdaptiveBackoff:
+    """
+    自适应请求间隔控制器
+    
+    遇到反爬页面或请求错误时成倍增大请求间隔，连续成功若干次后逐步缩小；
+    连续失败过多时熔断一段时间，期间请求直接失败，避免持续触发反爬。
+    """
+    
+    def __init__(self, base_interval=3, max_interval=60, increase_factor=2.0, decrease_step=0.5,
+                 success_threshold=5, failure_threshold=4, open_duration=120,
+                 retry_base=3, retry_cap=60, on_interval_change=None):
+        """
+        初始化控制器
+        
+        Args:
+            base_interval: 最小请求间隔（秒）
+            max_interval: 最大请求间隔（秒）
+            increase_factor: 失败时请求间隔的放大倍数
+            decrease_step: 连续成功后请求间隔的缩小量（秒）
+            success_threshold: 缩小请求间隔所需的连续成功次数
+            failure_threshold: 触发熔断的连续失败次数
+            open_duration: 熔断持续时间（秒）
+            retry_base: 重试等待的基础时间（秒）
+            retry_cap: 重试等待的最长时间（秒）
+            on_interval_change: 请求间隔变化时的回调，参数为新的间隔
+        """
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.increase_factor = increase_factor
+        self.decrease_step = decrease_step
+        self.success_threshold = success_threshold
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.on_interval_change = on_interval_change
+        
+        self._lock = threading.Lock()
+        self.interval = base_interval
+        self.circuit = CIRCUIT_CLOSED
+        self.opened_at = 0
+        self.trial_in_flight = False
+        # 发送试探请求的线程
+        self.trial_owner = None
+        self.consecutive_successes = 0
+        self.consecutive_failures = 0
+        self.total_blocked = 0
+        self.total_errors = 0
+    
+    def _set_interval(self, interval):
+        """更新请求间隔并通知回调（需持有锁）"""
+        interval = min(self.max_interval, max(self.base_interval, interval))
+        if interval != self.interval:
+            logger.info(f"请求间隔调整: {self.interval:.1f} -> {interval:.1f} 秒")
+            self.interval = interval
+            if self.on_interval_change:
+                self.on_interval_change(interval)
+    
+    def allow_request(self):
+        """
+        判断当前是否允许发送请求
+        
+        Returns:
+            bool: 熔断期间返回False，熔断时间结束后只允许一个试探请求
+        """
+        with self._lock:
+            if self.circuit == CIRCUIT_OPEN:
+                if time.time() - self.opened_at < self.open_duration:
+                    return False
+                logger.info("熔断时间结束，发送试探请求")
+                self.circuit = CIRCUIT_HALF_OPEN
+                self._start_trial()
+                return True
+            if self.circuit == CIRCUIT_HALF_OPEN:
+                # 试探请求返回前拒绝其他请求
+                if self.trial_in_flight:
+                    return False
+                self._start_trial()
+            return True
+    
+    def _start_trial(self):
+        """开始一次试探请求（需持有锁）"""
+        self.trial_in_flight = True
+        self.trial_owner = threading.get_ident()
+    
+    def release_trial(self):
+        """
+        结束当前线程的试探请求，但不记录结果
+        
+        请求因其他异常中断、没有调用 record_success / record_blocked / record_error 时使用，
+        熔断器保持半开状态，下一个请求重新试探；当前线程没有进行中的试探请求时不做任何事
+        """
+        with self._lock:
+            if self.trial_in_flight and self.trial_owner == threading.get_ident():
+                self.trial_in_flight = False
+                self.trial_owner = None
+    
+    def record_success(self):
+        """记录一次正常的JSON响应"""
+        with self._lock:
+            self.consecutive_failures = 0
+            self.consecutive_successes += 1
+            self.trial_in_flight = False
+            self.trial_owner = None
+            if self.circuit == CIRCUIT_HALF_OPEN:
+                logger.info("试探请求成功，解除熔断")
+                self.circuit = CIRCUIT_CLOSED
+            if self.consecutive_successes >= self.success_threshold:
+                self.consecutive_successes = 0
+                self._set_interval(self.interval - self.decrease_step)
+    
+    def record_blocked(self):
+        """记录一次反爬响应（返回了HTML页面）"""
+        with self._lock:
+            self.total_blocked += 1
+            self._record_failure()
+    
+    def record_error(self):
+        """记录一次请求错误"""
+        with self._lock:
+            self.total_errors += 1
+            self._record_failure()
+    
+    def _record_failure(self):
+        """成倍增大请求间隔，连续失败过多时熔断（需持有锁）"""
+        self.consecutive_successes = 0
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        self.trial_owner = None
+        self._set_interval(self.interval * self.increase_factor)
+        if self.circuit == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.circuit != CIRCUIT_OPEN:
+                logger.warning(f"连续失败 {self.consecutive_failures} 次，暂停请求 {self.open_duration} 秒")
+            self.circuit = CIRCUIT_OPEN
+            self.opened_at = time.time()
+    
+    def retry_delay(self, attempt):
+        """
+        计算重试前的等待时间（带随机抖动的指数退避）
+        
+        Args:
+            attempt: 已重试的次数（从0开始）
+        
+        Returns:
+            float: 等待时间（秒）
+        """
+        delay = min(self.retry_cap, self.retry_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def state(self):
+        """
+        获取当前状态
+        
+        Returns:
+            dict: 请求间隔、熔断状态和统计信息
+        """
+        with self._lock:
+            remaining = 0
+            if self.circuit == CIRCUIT_OPEN:
+                remaining = max(0, self.open_duration - (time.time() - self.opened_at))
+            return {
+                "interval": self.interval,
+                "circuit": self.circuit,
+                "circuit_remaining": remaining,
+                "consecutive_successes": self.consecutive_successes,
+                "consecutive_failures": self.consecutive_failures,
+                "total_blocked": self.total_blocked,
+                "total_errors": self.total_errors
+            }
@@ -6,13 +6,129 @@
 
 import time
 import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait, TimeoutError as FutureTimeoutError
+from urllib.parse import urlparse
 import requests
 from logger.logger import setup_logger
+from network.rate_limiter import RateLimiter, RequestCancelled, CANCEL_CHECK_INTERVAL, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH
+from network.session_store import SessionStore
+from network.backoff import AdaptiveBackoff, CircuitOpenError
+from parser.ticket_parser import parser as ticket_parser
+from transfer.matcher import match_transfers, CROSS_STATION_MINUTES
+from transfer.hub_index import HubIndex
+from transfer.journey_search import JourneySearch
+from transfer.ranker import TransferRanker, plan_metrics
 from utils.station_parser import station_parser
 
 # 设置日志
 logger = setup_logger()
 
+# 余票查询接口
+LEFT_TICKET_URL = "https://kyfw.12306.cn/otn/leftTicket/query"
+
+
+class TicketCache:
+    """余票查询结果缓存，支持过期时间（TTL）和容量上限（LRU）"""
+    
+    def __init__(self, ttl=30, max_size=128):
+        """
+        初始化缓存
+        
+        Args:
+            ttl: 缓存有效期（秒）
+            max_size: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, max_age=None):
+        """
+        获取缓存结果
+        
+        Args:
+            key: 缓存键
+            max_age: 可接受的最大缓存时长（秒），默认使用ttl
+        
+        Returns:
+            缓存的结果，不存在或已过期时返回None
+        """
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > max_age:
+                # 过期条目直接移除
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 缓存结果
+        """
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key=None):
+        """
+        使缓存失效
+        
+        Args:
+            key: 缓存键，为None时清空全部缓存
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self):
+        """
+        获取缓存统计信息
+        
+        Returns:
+            dict: 命中次数、未命中次数和当前条目数
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries)
+            }
+
+
+class InflightQuery:
+    """进行中的余票查询，供相同查询的调用方共享结果"""
+    
+    def __init__(self, priority):
+        """
+        初始化进行中的查询
+        
+        Args:
+            priority: 当前请求优先级，有更高优先级的调用方加入时会被提升
+        """
+        self.future = Future()
+        self.priority = priority
+
 
 class NetworkClient:
     """网络请求客户端，包含反爬机制"""
@@ -87,23 +203,94 @@ class NetworkClient:
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36 Vivaldi/6.4"
     ]
     
-    def __init__(self, base_url="https://kyfw.12306.cn", timeout=30):
+    def __init__(self, base_url="https://kyfw.12306.cn", timeout=30, min_interval=3, burst=2,
+                 cache_ttl=30, cache_size=128, transfer_workers=4, session_store=None, hub_index=None,
+                 leg_cache_ttl=300, cross_station_buffer=CROSS_STATION_MINUTES):
         """
         初始化网络客户端
         
         Args:
             base_url: 基础URL
             timeout: 请求超时时间（秒）
+            min_interval: 余票查询接口的最小请求间隔（秒）
+            burst: 全局允许的突发请求数
+            cache_ttl: 余票查询结果缓存有效期（秒）
+            cache_size: 余票查询结果缓存条目上限
+            transfer_workers: 中转查询并发线程数
+            session_store: 会话状态存储，默认保存到 data/session.json
+            hub_index: 中转站候选索引，默认保存到 data/hub_index.json
+            leg_cache_ttl: 中转查询已解析线路的缓存有效期（秒），同一会话内的中转查询复用
+            cross_station_buffer: 中转时同城换站额外需要的时间（分钟）
         """
         self.base_url = base_url
         self.timeout = timeout
         self.session = requests.Session()
-        self.last_request_time = 0
-        self.min_interval = 3  # 最小请求间隔（秒），增加到3秒
+        # 令牌桶限流，所有线程共享；余票查询接口额外限制为每 min_interval 秒一次
+        self.rate_limiter = RateLimiter(
+            rate=1.0 / min_interval,
+            burst=burst,
+            endpoint_limits={urlparse(LEFT_TICKET_URL).path: (1.0 / min_interval, 1)}
+        )
+        # 根据反爬检测结果自适应调整余票查询接口的请求间隔，持续被拦截时熔断
+        self.backoff = AdaptiveBackoff(
+            base_interval=min_interval,
+            on_interval_change=lambda interval: self.rate_limiter.set_rate(1.0 / interval, urlparse(LEFT_TICKET_URL).path)
+        )
+        self.transfer_workers = transfer_workers
+        # 根据查询结果统计的站点连通关系，用于挑选中转站
+        self.hub_index = hub_index or HubIndex(city_of=station_parser.get_station_city)
+        self.cross_station_buffer = cross_station_buffer
+        # 余票查询结果缓存，避免同一线路短时间内重复请求
+        self.ticket_cache = TicketCache(ttl=cache_ttl, max_size=cache_size)
+        # 中转查询已解析的线路车次，多次中转搜索和后续查询直接复用
+        self.leg_cache = TicketCache(ttl=leg_cache_ttl, max_size=256)
+        # 进行中的余票查询，相同查询共享一个请求
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
         # 使用station_parser获取站点信息
         logger.info(f"已加载 {len(station_parser.get_all_stations())} 个站点信息")
-        # 初始化会话，访问首页获取Cookie
-        self._init_session()
+        # 持久化的会话状态，重启后有效期内无需重新访问首页
+        self.session_store = session_store or SessionStore()
+        self.warmed_at = None
+        # 被拦截后重新初始化会话，多个线程同时被拦截时只由一个线程执行，其他线程等待它完成
+        self._reinit_lock = threading.Lock()
+        self._reinit_finished_at = 0
+        # 在后台线程中初始化会话（访问首页获取Cookie），不阻塞调用方
+        # 第一次请求前会等待 ready 完成
+        self.ready = Future()
+        threading.Thread(target=self._warmup, name="NetworkClientWarmup", daemon=True).start()
+    
+    def _warmup(self):
+        """后台初始化会话，优先复用本地保存的会话状态，完成后设置 ready"""
+        try:
+            self.hub_index.load()
+            self.warmed_at = self.session_store.load(self.session.cookies)
+            if self.warmed_at is None:
+                self._init_session()
+            else:
+                logger.info("复用本地保存的会话状态，跳过会话初始化")
+        finally:
+            self.ready.set_result(True)
+    
+    def wait_until_ready(self, timeout=None):
+        """
+        等待后台会话初始化完成
+        
+        Args:
+            timeout: 最长等待时间（秒），默认为两次请求超时时间
+        
+        Returns:
+            bool: 是否已完成初始化
+        """
+        if self.ready.done():
+            return True
+        timeout = self.timeout * 2 if timeout is None else timeout
+        try:
+            self.ready.result(timeout=timeout)
+            return True
+        except FutureTimeoutError:
+            logger.warning(f"等待会话初始化超时（{timeout}秒），继续发送请求")
+            return False
     
     def _get_random_user_agent(self):
         """获取随机User-Agent"""
@@ -150,19 +337,66 @@ class NetworkClient:
             # 随机等待一段时间
             time.sleep(random.uniform(1, 2))
             
+            # 保存会话状态，下次启动时直接复用
+            self.warmed_at = time.time()
+            self.session_store.save(self.session.cookies, self.warmed_at)
+        
         except Exception as e:
             logger.error(f"初始化会话失败: {e}")
             # 即使失败也继续执行，后续请求会重新创建会话
     
-    def _wait_for_interval(self):
-        """等待请求间隔"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        if elapsed < self.min_interval:
-            time.sleep(self.min_interval - elapsed)
-        self.last_request_time = time.time()
+    def _reinit_session(self, blocked_at):
+        """
+        被拦截后重新初始化会话
+        
+        中转查询的多个线程可能同时被拦截，只有第一个线程访问首页，其他线程等待它完成；
+        被拦截之后已经重新初始化过（无论成功与否）时直接返回，使用新的会话重试
+        
+        Args:
+            blocked_at: 请求被拦截的时间
+        """
+        with self._reinit_lock:
+            if self._reinit_finished_at >= blocked_at:
+                logger.info("会话已由其他请求重新初始化，直接重试")
+                return
+            try:
+                self._init_session()
+            finally:
+                self._reinit_finished_at = time.time()
+    
+    def _wait_for_interval(self, url, priority=PRIORITY_INTERACTIVE, cancelled=None):
+        """
+        等待请求令牌
+        
+        Args:
+            url: 请求URL，按接口路径匹配限流配置
+            priority: 请求优先级
+            cancelled: threading.Event，被设置时放弃等待
+        
+        Raises:
+            RequestCancelled: 获得令牌前请求被取消
+        """
+        if cancelled is not None and cancelled.is_set():
+            raise RequestCancelled(f"请求已取消: {url}")
+        self.rate_limiter.acquire(urlparse(url).path, priority, cancelled)
+    
+    def _retry_sleep(self, wait_time, cancelled=None):
+        """
+        重试前等待
+        
+        Args:
+            wait_time: 等待时间（秒）
+            cancelled: threading.Event，被设置时提前结束等待
+        
+        Raises:
+            RequestCancelled: 等待期间请求被取消
+        """
+        if cancelled is None:
+            time.sleep(wait_time)
+        elif cancelled.wait(wait_time):
+            raise RequestCancelled("请求已取消，不再重试")
     
-    def get(self, url, params=None, headers=None, max_retries=3):
+    def get(self, url, params=None, headers=None, max_retries=3, priority=PRIORITY_INTERACTIVE, cancelled=None):
         """
         发送GET请求，支持重试
         
@@ -171,14 +405,30 @@ class NetworkClient:
             params: 请求参数
             headers: 请求头
             max_retries: 最大重试次数
+            priority: 请求优先级，交互查询优先于定时查询和预取
+            cancelled: threading.Event，被设置后不再发送请求和重试
         
         Returns:
             response: 响应对象
+        
+        Raises:
+            RequestCancelled: 请求被取消
         """
+        # 等待后台会话初始化完成
+        self.wait_until_ready()
+        
+        # 余票查询接口的响应用于调整请求间隔和熔断
+        is_query = "leftTicket/query" in url
+        
         for retry in range(max_retries):
+            # 熔断期间直接失败，不再请求
+            if is_query and not self.backoff.allow_request():
+                remaining = self.backoff.state()["circuit_remaining"]
+                raise CircuitOpenError(f"12306持续返回反爬页面，暂停查询，{remaining:.0f} 秒后重试")
+            
             try:
                 # 等待请求间隔
-                self._wait_for_interval()
+                self._wait_for_interval(url, priority, cancelled)
                 
                 # 根据URL类型设置不同的请求头
                 if "leftTicket/query" in url:
@@ -261,35 +511,50 @@ class NetworkClient:
                 response.raise_for_status()
                 
                 # 检查响应是否为HTML页面（可能是反爬）
-                if "leftTicket/query" in url and "DOCTYPE html" in response.text:
+                if is_query and "DOCTYPE html" in response.text:
                     logger.error(f"12306返回了HTML页面，可能是反爬，重试次数: {retry+1}/{max_retries}")
+                    blocked_at = time.time()
+                    self.backoff.record_blocked()
                     if retry < max_retries - 1:
                         logger.info(f"正在重试... ({retry+2}/{max_retries})")
-                        # 增加等待时间，随着重试次数增加而增加
-                        wait_time = random.uniform(3 + retry, 6 + retry)
-                        time.sleep(wait_time)
+                        # 带随机抖动的指数退避
+                        wait_time = self.backoff.retry_delay(retry)
+                        self._retry_sleep(wait_time, cancelled)
                         # 重新初始化会话，包括访问首页和余票查询页面
-                        self._init_session()
+                        self._reinit_session(blocked_at)
                         continue
                     else:
                         raise Exception("12306返回了HTML页面，反爬机制触发")
                 
+                if is_query:
+                    # 能解析为JSON才算一次正常响应，被截断或不是JSON的内容按请求错误处理
+                    try:
+                        response.json()
+                    except ValueError as e:
+                        raise requests.exceptions.RequestException(f"余票查询返回的内容不是JSON: {e}")
+                    self.backoff.record_success()
                 logger.info(f"请求成功: {url}, 状态码: {response.status_code}")
                 return response
-                
+            
             except requests.exceptions.RequestException as e:
                 logger.error(f"请求失败: {url}, 错误: {e}")
+                if is_query:
+                    self.backoff.record_error()
                 if retry < max_retries - 1:
                     logger.info(f"正在重试... ({retry+2}/{max_retries})")
-                    # 增加等待时间，随着重试次数增加而增加
-                    wait_time = random.uniform(3 + retry, 6 + retry)
-                    time.sleep(wait_time)
-                    # 重新初始化会话，包括访问首页和余票查询页面
-                    self._init_session()
+                    # 带随机抖动的指数退避
+                    # 网络错误与会话无关，只有返回反爬页面时才重新初始化会话
+                    wait_time = self.backoff.retry_delay(retry)
+                    self._retry_sleep(wait_time, cancelled)
                 else:
                     raise
+            
+            finally:
+                # 没有记录结果就中断的试探请求（如其他异常）也要结束，否则熔断器一直停在半开状态
+                if is_query:
+                    self.backoff.release_trial()
     
-    def post(self, url, data=None, json=None, headers=None):
+    def post(self, url, data=None, json=None, headers=None, priority=PRIORITY_INTERACTIVE):
         """
         发送POST请求
         
@@ -298,13 +563,17 @@ class NetworkClient:
             data: 表单数据
             json: JSON数据
             headers: 请求头
+            priority: 请求优先级
         
         Returns:
             response: 响应对象
         """
+        # 等待后台会话初始化完成
+        self.wait_until_ready()
+        
         try:
             # 等待请求间隔
-            self._wait_for_interval()
+            self._wait_for_interval(url, priority)
             
             # 构建请求头
             default_headers = {
@@ -335,11 +604,154 @@ class NetworkClient:
             
             logger.info(f"请求成功: {url}, 状态码: {response.status_code}")
             return response
-            
+        
         except requests.exceptions.RequestException as e:
             logger.error(f"请求失败: {url}, 错误: {e}")
             raise
     
+    def query_left_ticket(self, train_date, from_station, to_station, purpose_codes="ADULT",
+                          force_refresh=False, max_age=None, max_retries=3, priority=PRIORITY_INTERACTIVE,
+                          cancelled=None):
+        """
+        查询余票接口，结果按 (日期, 出发站, 到达站, 乘客类型) 缓存，
+        并发的相同查询合并为一次请求
+        
+        Args:
+            train_date: 乘车日期（yyyy-MM-dd）
+            from_station: 出发站编码
+            to_station: 到达站编码
+            purpose_codes: 乘客类型
+            force_refresh: 是否跳过缓存强制请求（自动盯票使用）
+            max_age: 可接受的最大缓存时长（秒），默认使用缓存TTL
+            max_retries: 最大重试次数
+            priority: 请求优先级（PRIORITY_INTERACTIVE / PRIORITY_SCHEDULED / PRIORITY_PREFETCH）
+            cancelled: threading.Event，被设置后不再发送请求
+        
+        Returns:
+            dict: 接口返回的JSON结果
+        
+        Raises:
+            RequestCancelled: 请求被取消
+        """
+        key = (train_date, from_station, to_station, purpose_codes)
+        
+        while True:
+            # 相同的查询正在进行时，直接等待该请求的结果，不再重复发送
+            with self._inflight_lock:
+                # 缓存检查和登记查询在同一个锁内完成，刚完成的相同查询已写入缓存时不会再发送请求
+                cached = None if force_refresh else self.ticket_cache.get(key, max_age)
+                if cached is None:
+                    inflight = self._inflight.get(key)
+                    # 已结束但尚未注销的查询（发起方取消）不再等待
+                    is_leader = inflight is None or inflight.future.done()
+                    if is_leader:
+                        inflight = InflightQuery(priority)
+                        self._inflight[key] = inflight
+                    elif priority < inflight.priority:
+                        # 更高优先级的调用方加入时提升排队中请求的优先级，避免优先级反转
+                        inflight.priority = priority
+                        self.rate_limiter.notify()
+            
+            if cached is not None:
+                logger.info(f"命中余票缓存: {key}")
+                return cached
+            if is_leader:
+                break
+            logger.info(f"等待进行中的相同余票查询: {key}")
+            try:
+                return inflight.future.result()
+            except RequestCancelled:
+                # 发起请求的调用方已取消，未取消的调用方重新发起查询
+                if cancelled is not None and cancelled.is_set():
+                    raise
+        
+        try:
+            result = self._fetch_left_ticket(key, max_retries, lambda: inflight.priority, cancelled)
+            inflight.future.set_result(result)
+            return result
+        except Exception as e:
+            inflight.future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+    
+    def _fetch_left_ticket(self, key, max_retries, priority, cancelled=None):
+        """
+        发送余票查询请求并写入缓存
+        
+        Args:
+            key: 查询键 (日期, 出发站, 到达站, 乘客类型)
+            max_retries: 最大重试次数
+            priority: 请求优先级
+            cancelled: threading.Event，被设置后不再发送请求
+        
+        Returns:
+            dict: 接口返回的JSON结果
+        """
+        train_date, from_station, to_station, purpose_codes = key
+        params = {
+            "leftTicketDTO.train_date": train_date,
+            "leftTicketDTO.from_station": from_station,
+            "leftTicketDTO.to_station": to_station,
+            "purpose_codes": purpose_codes
+        }
+        extra_headers = {
+            "Referer": "https://kyfw.12306.cn/otn/leftTicket/init",
+            "X-Requested-With": "XMLHttpRequest",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-origin"
+        }
+        
+        response = self.get(LEFT_TICKET_URL, params=params, headers=extra_headers,
+                            max_retries=max_retries, priority=priority, cancelled=cancelled)
+        try:
+            result = response.json()
+        except ValueError as e:
+            logger.error(f"JSON解析失败: {e}")
+            # 记录响应内容的前200字符，避免编码错误
+            safe_content = repr(response.text[:200]).encode('utf-8', 'ignore').decode('utf-8')
+            logger.error(f"响应内容前200字符: {safe_content}")
+            raise
+        
+        # 只缓存成功的查询结果
+        if result and result.get("status"):
+            self.ticket_cache.set(key, result)
+            # 记录车次经过的站点，供中转查询挑选中转站
+            self.hub_index.observe(result.get("data", {}).get("result", []))
+        return result
+    
+    def invalidate_left_ticket(self, train_date=None, from_station=None, to_station=None, purpose_codes="ADULT"):
+        """
+        使余票缓存失效
+        
+        Args:
+            train_date: 乘车日期，为None时清空全部缓存
+            from_station: 出发站编码
+            to_station: 到达站编码
+            purpose_codes: 乘客类型
+        """
+        if train_date is None:
+            self.ticket_cache.invalidate()
+        else:
+            self.ticket_cache.invalidate((train_date, from_station, to_station, purpose_codes))
+    
+    def get_network_state(self):
+        """
+        获取网络层当前状态
+        
+        Returns:
+            dict: 自适应退避、限流和缓存的状态
+        """
+        return {
+            "backoff": self.backoff.state(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "cache": self.ticket_cache.stats(),
+            "hub_index": self.hub_index.stats()
+        }
+    
     def get_station_code(self, station_name):
         """
         获取站点编码
@@ -364,7 +776,8 @@ class NetworkClient:
         """
         return station_parser.get_station_name(station_code)
     
-    def query_transfer_tickets(self, start_station, end_station, query_date, max_transfers=1):
+    def query_transfer_tickets(self, start_station, end_station, query_date, max_transfers=1,
+                               priority=PRIORITY_PREFETCH, max_hubs=4, max_total_minutes=48 * 60):
         """
         查询中转车次
         
@@ -373,291 +786,439 @@ class NetworkClient:
             end_station: 目的地
             query_date: 查询日期
             max_transfers: 最大中转次数
+            priority: 请求优先级，默认低于交互查询，批量请求不会阻塞用户的直达查询
+            max_hubs: 最多查询的中转站数量
+            max_total_minutes: 中转方案的最长总历时（分钟）
         
         Returns:
-            list: 中转车次列表
+            list: 排名靠前和 Pareto 最优的中转方案，按排序指标排列
+        """
+        ranker = TransferRanker()
+        for _ in self.iter_transfer_plans(start_station, end_station, query_date, max_transfers,
+                                          priority, max_hubs, max_total_minutes, ranker):
+            pass
+        
+        transfer_plans = ranker.ranked()
+        logger.info(f"找到 {ranker.offered} 个中转组合，保留 {len(transfer_plans)} 个中转方案")
+        return transfer_plans
+    
+    def iter_transfer_plans(self, start_station, end_station, query_date, max_transfers=1,
+                            priority=PRIORITY_PREFETCH, max_hubs=4, max_total_minutes=48 * 60, ranker=None,
+                            cancelled=None):
         """
-        import json
+        逐批查询中转车次，每个中转站（多次中转时为每一轮）匹配完成后立即返回找到的方案
+        
+        找到的方案先交给排序器，只有进入排名或 Pareto 前沿的方案才会被构造和返回；
+        之后找到的更优方案可能把已返回的方案挤出排名，最终结果以 ranker.ranked() 为准。
+        cancelled 被设置后不再发送新的线路查询，放弃尚未完成的查询并结束迭代。
+        
+        Args:
+            start_station: 出发地
+            end_station: 目的地
+            query_date: 查询日期
+            max_transfers: 最大中转次数
+            priority: 请求优先级
+            max_hubs: 最多查询的中转站数量
+            max_total_minutes: 中转方案的最长总历时（分钟）
+            ranker: 中转方案排序器，默认新建 TransferRanker
+            cancelled: threading.Event，查询被取代时由调用方设置
+        
+        Yields:
+            list: 新找到的一批中转方案
+        """
+        if ranker is None:
+            ranker = TransferRanker()
         
         # 获取站点编码
         from_station = self.get_station_code(start_station)
         to_station = self.get_station_code(end_station)
         
-        # 构建查询URL
-        url = "https://kyfw.12306.cn/otn/leftTicket/query"
-        params = {
-            "leftTicketDTO.train_date": query_date,
-            "leftTicketDTO.from_station": from_station,
-            "leftTicketDTO.to_station": to_station,
-            "purpose_codes": "ADULT"
-        }
+        # 多次中转按轮次搜索
+        if max_transfers > 1:
+            yield from self._search_transfer_plans(from_station, to_station, query_date, max_transfers,
+                                                   max_total_minutes, max_hubs, ranker, priority, cancelled)
+            return
         
-        # 添加额外的请求头
-        extra_headers = {
-            "Referer": "https://kyfw.12306.cn/otn/leftTicket/init",
-            "X-Requested-With": "XMLHttpRequest",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin"
-        }
+        # 根据已查询到的车次挑选连通度最高的中转站，没有统计到中转站时使用常用中转站
+        transfer_stations = self.hub_index.candidates(from_station, to_station, limit=max_hubs)
+        logger.info(f"使用 {len(transfer_stations)} 个中转站: {', '.join(self.get_station_name(code) for code in transfer_stations)}")
         
-        # 生成中转方案
-        transfer_plans = []
+        # 并发查询各中转站的两段车次，请求仍受全局请求间隔限制
+        # 同一段线路只请求一次
+        leg_futures = {}
+        first_legs = {}
         
-        # 手动添加常用中转站
-        common_transfer_stations = [
-            "NNZ",  # 南宁
-            "GLZ",  # 桂林
-            "GBZ",  # 桂林北
-            "LZQ",  # 柳州
-            "HZH",  # 杭州
-            "SHH",  # 上海
-            "BJP"   # 北京
-        ]
-        
-        # 过滤掉起点和终点
-        transfer_stations = [station for station in common_transfer_stations if station not in [from_station, to_station]]
-        logger.info(f"使用 {len(transfer_stations)} 个常用中转站")
-        
-        # 查询出发地到中转站的车次
-        for transfer_station in transfer_stations:
-            # 查询出发地到中转站
-            transfer_params = {
-                "leftTicketDTO.train_date": query_date,
-                "leftTicketDTO.from_station": from_station,
-                "leftTicketDTO.to_station": transfer_station,
-                "purpose_codes": "ADULT"
-            }
+        def submit_leg(executor, leg_from, leg_to):
+            key = (leg_from, leg_to)
+            if key not in leg_futures:
+                leg_futures[key] = executor.submit(self._fetch_leg_records, query_date, leg_from, leg_to, priority, cancelled)
+            return leg_futures[key]
+        
+        executor = ThreadPoolExecutor(max_workers=self.transfer_workers)
+        try:
+            # 先查询出发地到各中转站
+            pending = {}
+            for transfer_station in transfer_stations:
+                pending.setdefault(submit_leg(executor, from_station, transfer_station), []).append((transfer_station, "first"))
             
-            try:
-                transfer_response = self.get(url, params=transfer_params, headers=extra_headers, max_retries=3)
-                transfer_result = transfer_response.json()
-                
-                if transfer_result.get("status"):
-                    transfer_data = transfer_result.get("data", {})
-                    transfer_result_list = transfer_data.get("result", [])
-                    
-                    if not transfer_result_list:
-                        logger.info(f"从 {start_station} 到中转站 {self.get_station_name(transfer_station)} 没有直达车次")
-                        continue
-                    
-                    # 查询中转站到目的地
-                    dest_params = {
-                        "leftTicketDTO.train_date": query_date,
-                        "leftTicketDTO.from_station": transfer_station,
-                        "leftTicketDTO.to_station": to_station,
-                        "purpose_codes": "ADULT"
-                    }
-                    
-                    dest_response = self.get(url, params=dest_params, headers=extra_headers, max_retries=3)
-                    dest_result = dest_response.json()
-                    
-                    if dest_result.get("status"):
-                        dest_data = dest_result.get("data", {})
-                        dest_result_list = dest_data.get("result", [])
+            # 每个中转站的两段结果都返回后立即匹配
+            while pending:
+                done, _ = wait(pending, timeout=self._cancel_check_timeout(cancelled), return_when=FIRST_COMPLETED)
+                if cancelled is not None and cancelled.is_set():
+                    logger.info("中转查询已取消，放弃尚未完成的线路查询")
+                    return
+                for future in done:
+                    for transfer_station, stage in pending.pop(future):
+                        transfer_station_name = self.get_station_name(transfer_station)
+                        try:
+                            result_list = future.result()
+                        except Exception as e:
+                            logger.error(f"查询中转车次失败: {e}")
+                            continue
+                        
+                        if stage == "first":
+                            if not result_list:
+                                logger.info(f"从 {start_station} 到中转站 {transfer_station_name} 没有直达车次")
+                                continue
+                            first_legs[transfer_station] = result_list
+                            # 查询中转站到目的地
+                            pending.setdefault(submit_leg(executor, transfer_station, to_station), []).append((transfer_station, "second"))
+                            continue
                         
-                        if not dest_result_list:
-                            logger.info(f"从中转站 {self.get_station_name(transfer_station)} 到 {end_station} 没有直达车次")
+                        if not result_list:
+                            logger.info(f"从中转站 {transfer_station_name} 到 {end_station} 没有直达车次")
                             continue
                         
-                        logger.info(f"从 {start_station} 到 {self.get_station_name(transfer_station)} 有 {len(transfer_result_list)} 个车次")
-                        logger.info(f"从 {self.get_station_name(transfer_station)} 到 {end_station} 有 {len(dest_result_list)} 个车次")
+                        logger.info(f"从 {start_station} 到 {transfer_station_name} 有 {len(first_legs[transfer_station])} 个车次")
+                        logger.info(f"从 {transfer_station_name} 到 {end_station} 有 {len(result_list)} 个车次")
                         
-                        # 匹配中转方案
-                        for first_train in transfer_result_list:
-                            first_fields = first_train.split("|")
-                            if len(first_fields) < 30:
-                                continue
-                            
-                            first_train_number = first_fields[3]
-                            first_start_time = first_fields[8]
-                            first_end_time = first_fields[9]
-                            first_start_station_name = self.get_station_name(first_fields[6])
-                            first_end_station_name = self.get_station_name(first_fields[7])
-                            
-                            # 解析余票信息
-                            first_remaining_tickets = {
-                                "商务座": first_fields[32] if first_fields[32] != "" else "无",
-                                "一等座": first_fields[31] if first_fields[31] != "" else "无",
-                                "二等座": first_fields[30] if first_fields[30] != "" else "无",
-                                "硬卧": first_fields[28] if first_fields[28] != "" else "无",
-                                "硬座": first_fields[29] if first_fields[29] != "" else "无",
-                                "软卧": first_fields[23] if first_fields[23] != "" else "无",
-                                "站票": first_fields[26] if len(first_fields) > 26 and first_fields[26] != "" else "无"
-                            }
-                            
-                            # 解析价格信息
-                            first_prices = {}
-                            # 常见的价格字段位置（根据实际API返回调整）
-                            # 注意：不同座位类型的价格字段位置可能不同
-                            # 尝试从多个可能的位置获取价格信息
-                            possible_price_positions = {
-                                "硬座": [36, 42],
-                                "硬卧": [37, 43],
-                                "软卧": [38, 44],
-                                "二等座": [39, 45],
-                                "一等座": [40, 46],
-                                "商务座": [41, 47]
-                            }
-                            
-                            # 解析价格信息
-                            for seat_type, positions in possible_price_positions.items():
-                                for pos in positions:
-                                    if pos < len(first_fields):
-                                        price = first_fields[pos]
-                                        if price and price != "" and price != "0":
-                                            # 尝试解析价格为数字
-                                            try:
-                                                # 提取数字部分
-                                                import re
-                                                clean_price = re.sub(r'[^0-9]', '', price)
-                                                if clean_price:
-                                                    price_int = int(clean_price)
-                                                    # 检查价格是否合理（10-10000之间）
-                                                    if 10 <= price_int <= 10000:
-                                                        first_prices[seat_type] = str(price_int)
-                                                        break
-                                            except:
-                                                pass
-                                if seat_type not in first_prices:
-                                    first_prices[seat_type] = "-"
-                            
-                            for second_train in dest_result_list:
-                                second_fields = second_train.split("|")
-                                if len(second_fields) < 30:
-                                    continue
-                                
-                                second_train_number = second_fields[3]
-                                second_start_time = second_fields[8]
-                                second_end_time = second_fields[9]
-                                second_start_station_name = self.get_station_name(second_fields[6])
-                                second_end_station_name = self.get_station_name(second_fields[7])
-                                
-                                # 检查中转时间是否合理（至少20分钟）
-                                import datetime
-                                first_end_dt = datetime.datetime.strptime(first_end_time, "%H:%M")
-                                second_start_dt = datetime.datetime.strptime(second_start_time, "%H:%M")
-                                
-                                # 计算时间差
-                                time_diff = (second_start_dt - first_end_dt).total_seconds() / 60
-                                
-                                # 处理跨天的情况
-                                if time_diff < 0:
-                                    # 假设是跨天，加上24小时
-                                    time_diff += 24 * 60
-                                
-                                if time_diff >= 20 and time_diff <= 720:  # 20分钟到12小时
-                                    # 解析余票信息
-                                    second_remaining_tickets = {
-                                        "商务座": second_fields[32] if second_fields[32] != "" else "无",
-                                        "一等座": second_fields[31] if second_fields[31] != "" else "无",
-                                        "二等座": second_fields[30] if second_fields[30] != "" else "无",
-                                        "硬卧": second_fields[28] if second_fields[28] != "" else "无",
-                                        "硬座": second_fields[29] if second_fields[29] != "" else "无",
-                                        "软卧": second_fields[23] if second_fields[23] != "" else "无",
-                                        "站票": second_fields[26] if len(second_fields) > 26 and second_fields[26] != "" else "无"
-                                    }
-                                    
-                                    # 解析价格信息
-                                    second_prices = {}
-                                    # 常见的价格字段位置（根据实际API返回调整）
-                                    # 注意：不同座位类型的价格字段位置可能不同
-                                    # 尝试从多个可能的位置获取价格信息
-                                    possible_price_positions = {
-                                        "硬座": [36, 42],
-                                        "硬卧": [37, 43],
-                                        "软卧": [38, 44],
-                                        "二等座": [39, 45],
-                                        "一等座": [40, 46],
-                                        "商务座": [41, 47]
-                                    }
-                                    
-                                    # 解析价格信息
-                                    for seat_type, positions in possible_price_positions.items():
-                                        for pos in positions:
-                                            if pos < len(second_fields):
-                                                price = second_fields[pos]
-                                                if price and price != "" and price != "0":
-                                                    # 尝试解析价格为数字
-                                                    try:
-                                                        # 提取数字部分
-                                                        import re
-                                                        clean_price = re.sub(r'[^0-9]', '', price)
-                                                        if clean_price:
-                                                            price_int = int(clean_price)
-                                                            # 检查价格是否合理（10-10000之间）
-                                                            if 10 <= price_int <= 10000:
-                                                                second_prices[seat_type] = str(price_int)
-                                                                break
-                                                    except:
-                                                        pass
-                                        if seat_type not in second_prices:
-                                            second_prices[seat_type] = "-"
-                                        
-                                    # 计算总历时
-                                    first_duration = first_fields[10]
-                                    second_duration = second_fields[10]
-                                    
-                                    # 解析历时
-                                    def parse_duration(duration_str):
-                                        if '天' in duration_str:
-                                            days, rest = duration_str.split('天')
-                                            hours, minutes = rest.split(':')
-                                            return int(days)*24*60 + int(hours)*60 + int(minutes)
-                                        else:
-                                            hours, minutes = duration_str.split(':')
-                                            return int(hours)*60 + int(minutes)
-                                    
-                                    total_duration_minutes = parse_duration(first_duration) + parse_duration(second_duration) + int(time_diff)
-                                    
-                                    # 格式化为时分
-                                    total_hours = total_duration_minutes // 60
-                                    total_minutes = total_duration_minutes % 60
-                                    total_duration = f"{total_hours}:{total_minutes:02d}"
-                                    
-                                    # 创建中转方案
-                                    transfer_plan = {
-                                        "transfers": [
-                                            {
-                                                "train_number": first_train_number,
-                                                "start_station": first_start_station_name,
-                                                "end_station": first_end_station_name,
-                                                "start_time": first_start_time,
-                                                "end_time": first_end_time,
-                                                "duration": first_duration,
-                                                "remaining_tickets": first_remaining_tickets,
-                                                "prices": first_prices
-                                            },
-                                            {
-                                                "train_number": second_train_number,
-                                                "start_station": second_start_station_name,
-                                                "end_station": second_end_station_name,
-                                                "start_time": second_start_time,
-                                                "end_time": second_end_time,
-                                                "duration": second_duration,
-                                                "remaining_tickets": second_remaining_tickets,
-                                                "prices": second_prices
-                                            }
-                                        ],
-                                        "total_duration": total_duration,
-                                        "transfer_station": second_start_station_name,
-                                        "transfer_time": f"{time_diff:.0f}分钟",
-                                        "date": query_date
-                                    }
-                                    
-                                    transfer_plans.append(transfer_plan)
-                                    logger.info(f"找到中转方案: {first_train_number} -> {second_train_number}")
-            except Exception as e:
-                logger.error(f"查询中转车次失败: {e}")
+                        try:
+                            plans = self._match_transfer_plans(first_legs[transfer_station], result_list,
+                                                               query_date, max_total_minutes, ranker)
+                        except Exception as e:
+                            logger.error(f"匹配中转方案失败: {e}")
+                            continue
+                        if plans:
+                            yield plans
+        finally:
+            # 调用方提前停止迭代或查询被取消时，取消尚未开始的查询
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _cancel_check_timeout(cancelled):
+        """
+        等待线路查询结果的超时时间，可取消时定期醒来检查是否已取消
+        
+        Args:
+            cancelled: threading.Event 或 None
+        
+        Returns:
+            float: 超时时间（秒），不可取消时为None
+        """
+        return None if cancelled is None else CANCEL_CHECK_INTERVAL
+    
+    def _fetch_leg_records(self, query_date, from_station, to_station, priority=PRIORITY_PREFETCH, cancelled=None):
+        """
+        查询单段线路的车次，解析结果在会话内缓存
+        
+        接口会返回两端城市所有车站之间的车次，因此按城市缓存，同城的其他站点直接复用。
+        
+        Args:
+            query_date: 查询日期
+            from_station: 出发站编码
+            to_station: 到达站编码
+            priority: 请求优先级
+            cancelled: threading.Event，被设置后不再发送请求
+        
+        Returns:
+            list: TicketRecord 列表
+        
+        Raises:
+            RequestCancelled: 查询已取消
+        """
+        key = (query_date, station_parser.get_station_city(from_station) or from_station,
+               station_parser.get_station_city(to_station) or to_station)
+        records = self.leg_cache.get(key)
+        if records is not None:
+            return records
+        
+        if cancelled is not None and cancelled.is_set():
+            raise RequestCancelled(f"线路查询已取消: {from_station} -> {to_station}")
+        result = self.query_left_ticket(query_date, from_station, to_station, priority=priority, cancelled=cancelled)
+        if not result.get("status"):
+            return []
+        records = ticket_parser.parse_left_ticket(result.get("data", {}).get("result", []))
+        self.leg_cache.set(key, records)
+        return records
+    
+    def _fetch_legs(self, query_date, pairs, priority=PRIORITY_PREFETCH, cancelled=None):
+        """
+        并发查询多段线路的车次
+        
+        Args:
+            query_date: 查询日期
+            pairs: [(出发站编码, 到达站编码), ...]
+            priority: 请求优先级
+            cancelled: threading.Event，被设置后放弃尚未完成的查询
+        
+        Returns:
+            dict: {(出发站编码, 到达站编码): [TicketRecord, ...]}，查询失败的线路为空列表
+        
+        Raises:
+            RequestCancelled: 查询已取消
+        """
+        legs = {}
+        executor = ThreadPoolExecutor(max_workers=self.transfer_workers)
+        try:
+            futures = {executor.submit(self._fetch_leg_records, query_date, from_station, to_station, priority, cancelled): (from_station, to_station)
+                       for from_station, to_station in pairs}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=self._cancel_check_timeout(cancelled))
+                if cancelled is not None and cancelled.is_set():
+                    raise RequestCancelled("线路查询已取消")
+                for future in done:
+                    pair = futures[future]
+                    try:
+                        legs[pair] = future.result()
+                    except Exception as e:
+                        logger.error(f"查询线路 {pair[0]} -> {pair[1]} 失败: {e}")
+                        legs[pair] = []
+        finally:
+            # 查询被取消时不等待正在执行的查询，尚未开始的查询直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+        return legs
+    
+    def _search_transfer_plans(self, from_station, to_station, query_date, max_transfers, max_total_minutes,
+                               max_hubs, ranker, priority=PRIORITY_PREFETCH, cancelled=None):
+        """
+        按轮次搜索多次中转方案
+        
+        Args:
+            from_station: 出发站编码
+            to_station: 到达站编码
+            query_date: 查询日期
+            max_transfers: 最大中转次数
+            max_total_minutes: 最长总历时（分钟）
+            max_hubs: 每个站点最多尝试的中转站数量
+            ranker: 中转方案排序器
+            priority: 请求优先级
+            cancelled: threading.Event，被设置后不再开始新的一轮查询
+        
+        Yields:
+            list: 每一轮新找到并进入排名的中转方案
+        """
+        search = JourneySearch(
+            fetch_legs=lambda pairs: self._fetch_legs(query_date, pairs, priority, cancelled),
+            # 只有出发站在没有统计数据时使用常用中转站，之后各轮只尝试统计到的中转站
+            hub_candidates=lambda station, destination, limit, exclude, hops: self.hub_index.candidates(
+                station, destination, limit=limit, exclude=exclude, hops=hops, fallback=station == from_station),
+            max_transfers=max_transfers,
+            max_total_minutes=max_total_minutes,
+            cross_station_buffer=self.cross_station_buffer,
+            hubs_per_station=max_hubs
+        )
+        legs = {}
+        try:
+            for journeys in search.iter_search(from_station, to_station):
+                plans = []
+                for journey in journeys:
+                    metrics = plan_metrics(journey.legs, journey.total_minutes, journey.waits)
+                    if ranker.admits(metrics):
+                        plan = self._journey_plan(journey, query_date, legs)
+                        ranker.add(metrics, plan)
+                        plans.append(plan)
+                if plans:
+                    yield plans
+        except RequestCancelled:
+            logger.info("中转查询已取消，不再查询后续各轮")
+    
+    def _journey_plan(self, journey, query_date, legs):
+        """
+        将行程转换为中转方案
+        
+        Args:
+            journey: Journey 行程
+            query_date: 查询日期
+            legs: 已转换的行程段缓存 {id(车次记录): 行程信息}
+        
+        Returns:
+            dict: 中转方案
+        """
+        transfers = []
+        for record in journey.legs:
+            leg = legs.get(id(record))
+            if leg is None:
+                leg = legs[id(record)] = self._transfer_leg(record)
+            transfers.append(leg)
+        
+        total_hours, total_minutes = divmod(journey.total_minutes, 60)
+        return {
+            "transfers": transfers,
+            "total_duration": f"{total_hours}:{total_minutes:02d}",
+            "total_minutes": journey.total_minutes,
+            "transfer_station": " / ".join(self._transfer_station_text(arrival, departure)
+                                           for arrival, departure in zip(transfers, transfers[1:])),
+            "transfer_time": " / ".join(f"{wait}分钟" for wait in journey.waits),
+            "date": query_date
+        }
+    
+    def _match_transfer_plans(self, first_records, second_records, query_date, max_total_minutes=None, ranker=None):
+        """
+        匹配两段车次生成中转方案
+        
+        Args:
+            first_records: 出发地到中转站的车次记录列表
+            second_records: 中转站到目的地的车次记录列表
+            query_date: 查询日期
+            max_total_minutes: 最长总历时（分钟），为None时不限制
+            ranker: 中转方案排序器，为None时保留全部方案
+        
+        Returns:
+            list: 中转方案列表（使用排序器时只包括进入排名的方案）
+        """
+        transfer_plans = []
+        
+        # 第二段按出发时间建立索引，二分查找可换乘的车次
+        legs = {}
+        for first, second, time_diff in match_transfers(first_records, second_records,
+                                                        cross_station_buffer=self.cross_station_buffer):
+            # 计算总历时
+            total_duration_minutes = first.duration_minutes + second.duration_minutes + time_diff
+            if max_total_minutes is not None and total_duration_minutes > max_total_minutes:
                 continue
+            
+            # 进不了排名的组合不构造方案
+            if ranker is not None:
+                metrics = plan_metrics((first, second), total_duration_minutes, (time_diff,))
+                if not ranker.admits(metrics):
+                    continue
+            
+            # 每个车次只转换一次
+            first_leg = legs.get(id(first))
+            if first_leg is None:
+                first_leg = legs[id(first)] = self._transfer_leg(first)
+            second_leg = legs.get(id(second))
+            if second_leg is None:
+                second_leg = legs[id(second)] = self._transfer_leg(second)
+            
+            # 格式化为时分
+            total_hours = total_duration_minutes // 60
+            total_minutes = total_duration_minutes % 60
+            total_duration = f"{total_hours}:{total_minutes:02d}"
+            
+            # 创建中转方案
+            transfer_plan = {
+                "transfers": [first_leg, second_leg],
+                "total_duration": total_duration,
+                "total_minutes": total_duration_minutes,
+                "transfer_station": self._transfer_station_text(first_leg, second_leg),
+                "transfer_time": f"{time_diff}分钟",
+                "date": query_date
+            }
+            
+            if ranker is not None:
+                ranker.add(metrics, transfer_plan)
+            transfer_plans.append(transfer_plan)
+            logger.debug(f"找到中转方案: {first.train_number} -> {second.train_number}")
         
-        logger.info(f"找到 {len(transfer_plans)} 个中转方案")
         return transfer_plans
     
+    def _transfer_station_text(self, arrival_leg, departure_leg):
+        """
+        获取换乘站的显示文本
+        
+        Args:
+            arrival_leg: 到达中转站的行程
+            departure_leg: 从中转站出发的行程
+        
+        Returns:
+            str: 同站换乘时为站名，同城换站时为 "到达站→出发站"
+        """
+        if arrival_leg["end_station"] == departure_leg["start_station"]:
+            return departure_leg["start_station"]
+        return f"{arrival_leg['end_station']}→{departure_leg['start_station']}"
+    
+    def _transfer_leg(self, record):
+        """
+        将车次记录转换为中转方案中的一段行程
+        
+        Args:
+            record: TicketRecord 车次记录
+        
+        Returns:
+            dict: 行程信息
+        """
+        return {
+            "train_number": record.train_number,
+            "start_station": self.get_station_name(record.from_station_code),
+            "end_station": self.get_station_name(record.to_station_code),
+            "start_time": record.start_time,
+            "end_time": record.end_time,
+            "duration": record.duration,
+            "start_minutes": record.start_minutes,
+            "end_minutes": record.end_minutes,
+            "duration_minutes": record.duration_minutes,
+            "arrival_day": record.arrival_day,
+            "remaining_tickets": record.remaining_tickets(),
+            "prices": record.price_texts()
+        }
+    
     def close(self):
-        """关闭会话"""
+        """关闭会话，保存最新的Cookie"""
+        if self.warmed_at is not None:
+            self.session_store.save(self.session.cookies, self.warmed_at)
+        self.hub_index.save()
         self.session.close()
 
 
-# 创建全局网络客户端实例
-client = NetworkClient()
+class LazyNetworkClient:
+    """
+    延迟创建的全局网络客户端
+    
+    导入模块时不创建客户端、不发送任何请求，首次访问属性时才创建
+    NetworkClient 实例，会话初始化在后台线程中进行。
+    """
+    
+    def __init__(self, **kwargs):
+        """
+        初始化延迟客户端
+        
+        Args:
+            **kwargs: 创建 NetworkClient 时使用的参数
+        """
+        self._kwargs = kwargs
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def get_instance(self):
+        """
+        获取（必要时创建）NetworkClient 实例
+        
+        Returns:
+            NetworkClient: 网络客户端实例
+        """
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = NetworkClient(**self._kwargs)
+        return self._instance
+    
+    def close(self):
+        """关闭会话，未创建客户端时不做任何操作"""
+        if self._instance is not None:
+            self._instance.close()
+    
+    def __getattr__(self, name):
+        return getattr(self.get_instance(), name)
+    
+    def __setattr__(self, name, value):
+        # 自身的私有属性保存在代理对象上，其余属性转发给实际客户端
+        if name.startswith('_'):
+            super().__setattr__(name, value)
+        else:
+            setattr(self.get_instance(), name, value)
+
+
+# 创建全局网络客户端（首次使用时才真正初始化）
+client = LazyNetworkClient()
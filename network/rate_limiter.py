@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求限流模块，基于令牌桶算法
+"""
+
+import time
+import threading
+import itertools
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+# 请求优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0  # 用户点击触发的查询
+PRIORITY_SCHEDULED = 1    # 定时查询、自动盯票
+PRIORITY_PREFETCH = 2     # 中转查询等批量预取
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_SCHEDULED: "scheduled",
+    PRIORITY_PREFETCH: "prefetch"
+}
+
+# 可取消的等待每隔多久检查一次是否已取消（秒）
+CANCEL_CHECK_INTERVAL = 0.2
+
+
+class RequestCancelled(Exception):
+    """请求在发送前被调用方取消"""
+
+
+class TokenBucket:
+    """令牌桶"""
+    
+    def __init__(self, rate, burst):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量，即允许的突发请求数
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+    
+    def refill(self, now):
+        """
+        按经过的时间补充令牌
+        
+        Args:
+            now: 当前时间（time.monotonic）
+        """
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+    
+    def time_until_available(self):
+        """
+        计算下一个令牌可用前需要等待的时间
+        
+        Returns:
+            float: 等待时间（秒），已有令牌时返回0
+        """
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限流器
+    
+    所有请求共享一个全局令牌桶，并可为指定接口额外配置独立的令牌桶。
+    等待中的请求按优先级依次获得令牌，同一优先级内按到达顺序（FIFO）；
+    接口令牌桶为空的请求不会挡住其他接口的请求，令牌只在接口令牌桶有令牌的请求中分配。
+    """
+    
+    def __init__(self, rate=1 / 3, burst=1, endpoint_limits=None):
+        """
+        初始化限流器
+        
+        Args:
+            rate: 全局每秒请求数
+            burst: 全局允许的突发请求数
+            endpoint_limits: 接口独立限流配置，格式为 {接口路径: (每秒请求数, 突发请求数)}
+        """
+        self._cond = threading.Condition()
+        self._global_bucket = TokenBucket(rate, burst)
+        self._endpoint_buckets = {}
+        for endpoint, (endpoint_rate, endpoint_burst) in (endpoint_limits or {}).items():
+            self._endpoint_buckets[endpoint] = TokenBucket(endpoint_rate, endpoint_burst)
+        # 等待队列，元素为 [优先级, 到达序号, 接口路径]
+        self._waiters = []
+        self._sequence = itertools.count()
+        
+        # 统计信息
+        self._requests = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._class_stats = {}
+    
+    @staticmethod
+    def _priority_of(waiter):
+        priority = waiter[0]
+        return priority() if callable(priority) else priority
+    
+    def _endpoint_delay(self, endpoint, now):
+        """接口令牌桶下一个令牌可用前需要等待的时间，没有独立令牌桶的接口为0（需持有锁）"""
+        bucket = self._endpoint_buckets.get(endpoint)
+        if bucket is None:
+            return 0.0
+        bucket.refill(now)
+        return bucket.time_until_available()
+    
+    def _next_waiter(self, now):
+        """
+        返回下一个应获得令牌的等待者（需持有锁）
+        
+        只在接口令牌桶有令牌的等待者中选择，接口令牌桶为空的等待者不会挡住其他接口的请求；
+        所有等待者的接口令牌桶都为空时选择优先级最高的等待者
+        """
+        ready = [waiter for waiter in self._waiters if self._endpoint_delay(waiter[2], now) <= 0]
+        return min(ready or self._waiters, key=lambda waiter: (self._priority_of(waiter), waiter[1]))
+    
+    @staticmethod
+    def _wait_timeout(delay, cancelled):
+        """可取消的等待最多等待 CANCEL_CHECK_INTERVAL 秒后重新检查"""
+        if cancelled is None:
+            return delay
+        return CANCEL_CHECK_INTERVAL if delay is None else min(delay, CANCEL_CHECK_INTERVAL)
+    
+    def set_rate(self, rate, endpoint=None):
+        """
+        调整令牌补充速率
+        
+        Args:
+            rate: 新的每秒请求数
+            endpoint: 接口路径，为None时调整全局令牌桶
+        """
+        with self._cond:
+            bucket = self._global_bucket if endpoint is None else self._endpoint_buckets.get(endpoint)
+            if bucket is None:
+                return
+            bucket.refill(time.monotonic())
+            bucket.rate = rate
+            self._cond.notify_all()
+    
+    def notify(self):
+        """等待者的优先级发生变化后调用，重新选择下一个获得令牌的请求"""
+        with self._cond:
+            self._cond.notify_all()
+    
+    def acquire(self, endpoint=None, priority=PRIORITY_INTERACTIVE, cancelled=None):
+        """
+        获取一个请求令牌，令牌不足时阻塞等待
+        
+        Args:
+            endpoint: 接口路径，用于匹配接口独立的令牌桶
+            priority: 请求优先级，也可以是返回优先级的函数（等待期间可提升）
+            cancelled: threading.Event，被设置时放弃等待，不消耗令牌
+        
+        Returns:
+            float: 本次等待的时间（秒）
+        
+        Raises:
+            RequestCancelled: 获得令牌前 cancelled 被设置
+        """
+        start = time.monotonic()
+        ticket = [priority, next(self._sequence), endpoint]
+        
+        with self._cond:
+            self._waiters.append(ticket)
+            # 新请求可能比当前队首更优先，唤醒队首重新判断
+            self._cond.notify_all()
+            try:
+                while True:
+                    if cancelled is not None and cancelled.is_set():
+                        raise RequestCancelled(f"请求已取消: {endpoint}")
+                    now = time.monotonic()
+                    if self._next_waiter(now) is ticket:
+                        buckets = [self._global_bucket]
+                        if endpoint in self._endpoint_buckets:
+                            buckets.append(self._endpoint_buckets[endpoint])
+                        for bucket in buckets:
+                            bucket.refill(now)
+                        
+                        delay = max(bucket.time_until_available() for bucket in buckets)
+                        if delay <= 0:
+                            for bucket in buckets:
+                                bucket.tokens -= 1
+                            break
+                        self._cond.wait(self._wait_timeout(delay, cancelled))
+                    else:
+                        # 未轮到当前请求，等待前面的请求获取令牌；
+                        # 接口令牌桶为空时，到有令牌时重新判断
+                        self._cond.wait(self._wait_timeout(self._endpoint_delay(endpoint, now) or None, cancelled))
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+            
+            waited = time.monotonic() - start
+            self._requests += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            
+            # 按优先级分类统计等待时间
+            class_name = PRIORITY_NAMES.get(self._priority_of(ticket), str(self._priority_of(ticket)))
+            class_stats = self._class_stats.setdefault(class_name, {"requests": 0, "total_wait": 0.0, "max_wait": 0.0})
+            class_stats["requests"] += 1
+            class_stats["total_wait"] += waited
+            class_stats["max_wait"] = max(class_stats["max_wait"], waited)
+        
+        if waited > 0.01:
+            logger.debug(f"限流等待 {waited:.2f} 秒: {endpoint}, 优先级: {class_name}")
+        return waited
+    
+    def stats(self):
+        """
+        获取限流统计信息
+        
+        Returns:
+            dict: 请求数、等待时间和当前排队数
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._global_bucket.refill(now)
+            buckets = {}
+            for endpoint, bucket in self._endpoint_buckets.items():
+                bucket.refill(now)
+                buckets[endpoint] = round(bucket.tokens, 2)
+            
+            # 各优先级的等待统计和当前排队数
+            by_class = {}
+            for class_name in PRIORITY_NAMES.values():
+                class_stats = self._class_stats.get(class_name, {"requests": 0, "total_wait": 0.0, "max_wait": 0.0})
+                by_class[class_name] = dict(class_stats)
+                by_class[class_name]["avg_wait"] = class_stats["total_wait"] / class_stats["requests"] if class_stats["requests"] else 0.0
+                by_class[class_name]["queued"] = 0
+            for waiter in self._waiters:
+                class_name = PRIORITY_NAMES.get(self._priority_of(waiter))
+                if class_name in by_class:
+                    by_class[class_name]["queued"] += 1
+            
+            return {
+                "requests": self._requests,
+                "total_wait": self._total_wait,
+                "avg_wait": self._total_wait / self._requests if self._requests else 0.0,
+                "max_wait": self._max_wait,
+                "queue_depth": len(self._waiters),
+                "tokens": round(self._global_bucket.tokens, 2),
+                "endpoint_tokens": buckets,
+                "by_class": by_class
+            }
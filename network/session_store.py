@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话状态持久化模块，保存Cookie和会话初始化时间
+"""
+
+import os
+import json
+import time
+import tempfile
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+class SessionStore:
+    """会话状态存储，将Cookie保存到本地文件，重启后可直接复用"""
+    
+    def __init__(self, session_file=None, ttl=2 * 60 * 60):
+        """
+        初始化会话状态存储
+        
+        Args:
+            session_file: 会话文件路径，默认保存到 data/session.json
+            ttl: 会话有效期（秒），超过后需要重新初始化会话
+        """
+        self.session_file = session_file or os.path.join(os.path.dirname(__file__), "../data/session.json")
+        self.ttl = ttl
+    
+    def save(self, cookie_jar, warmed_at):
+        """
+        保存会话状态，先写入临时文件再替换，避免写入中断导致文件损坏
+        
+        Args:
+            cookie_jar: requests 的 Cookie 容器
+            warmed_at: 会话初始化完成的时间戳
+        """
+        cookies = []
+        for cookie in cookie_jar:
+            cookies.append({
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires,
+                "secure": cookie.secure
+            })
+        data = {
+            "warmed_at": warmed_at,
+            "cookies": cookies
+        }
+        
+        try:
+            data_dir = os.path.dirname(os.path.abspath(self.session_file))
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
+            
+            fd, temp_path = tempfile.mkstemp(dir=data_dir, prefix=".session-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.session_file)
+            except Exception:
+                os.remove(temp_path)
+                raise
+            logger.info(f"会话状态已保存到 {self.session_file}，共 {len(cookies)} 个Cookie")
+        except Exception as e:
+            logger.error(f"保存会话状态失败: {e}")
+    
+    def load(self, cookie_jar):
+        """
+        加载未过期的会话状态到 Cookie 容器
+        
+        Args:
+            cookie_jar: requests 的 Cookie 容器
+        
+        Returns:
+            float: 会话初始化时间戳，文件不存在、已过期或加载失败时返回None
+        """
+        if not os.path.exists(self.session_file):
+            return None
+        
+        try:
+            with open(self.session_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            warmed_at = data.get("warmed_at", 0)
+            if time.time() - warmed_at > self.ttl:
+                logger.info("本地会话状态已过期，需要重新初始化会话")
+                return None
+            
+            now = time.time()
+            cookies = [c for c in data.get("cookies", []) if not c.get("expires") or c["expires"] > now]
+            if not cookies:
+                return None
+            
+            for cookie in cookies:
+                cookie_jar.set(
+                    cookie["name"],
+                    cookie["value"],
+                    domain=cookie.get("domain", ""),
+                    path=cookie.get("path", "/"),
+                    expires=cookie.get("expires"),
+                    secure=cookie.get("secure", False)
+                )
+            logger.info(f"从本地文件加载了 {len(cookies)} 个Cookie")
+            return warmed_at
+        except Exception as e:
+            logger.error(f"加载会话状态失败: {e}")
+            return None
+    
+    def clear(self):
+        """删除本地会话状态"""
+        try:
+            if os.path.exists(self.session_file):
+                os.remove(self.session_file)
+        except Exception as e:
+            logger.error(f"删除会话状态失败: {e}")
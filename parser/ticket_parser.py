@@ -5,12 +5,399 @@
 """
 
 import re
+import threading
+from array import array
+from operator import itemgetter
 from bs4 import BeautifulSoup
 from logger.logger import setup_logger
 
 # 设置日志
 logger = setup_logger()
 
+# 余票查询接口返回的车次字符串至少包含的字段数
+MIN_ROW_FIELDS = 30
+
+# 座位类型及其余票字段位置，顺序即余票信息的显示顺序
+SEAT_TYPES = ("商务座", "一等座", "二等座", "硬卧", "硬座", "软卧", "站票")
+SEAT_FIELDS = (32, 31, 30, 28, 29, 23, 26)
+SEAT_INDEX = {seat_type: i for i, seat_type in enumerate(SEAT_TYPES)}
+
+# 价格字段的候选位置（不同座位类型的价格字段位置可能不同，依次尝试）
+PRICE_TYPES = ("硬座", "硬卧", "软卧", "二等座", "一等座", "商务座")
+PRICE_FIELDS = ((36, 42), (37, 43), (38, 44), (39, 45), (40, 46), (41, 47))
+PRICE_INDEX = {seat_type: i for i, seat_type in enumerate(PRICE_TYPES)}
+
+# 余票状态编码：正数为余票张数，0表示无票，负数为非数字状态
+SEAT_NONE = 0
+SEAT_PLENTY = -1
+SEAT_NOT_ON_SALE = -2
+SEAT_WAITLIST = -3
+
+# 余票文本与编码的对应关系，遇到新的非数字状态时动态追加
+_seat_codes = {"": SEAT_NONE, "无": SEAT_NONE, "有": SEAT_PLENTY, "*": SEAT_NOT_ON_SALE, "候补": SEAT_WAITLIST}
+_seat_texts = {SEAT_NONE: "无", SEAT_PLENTY: "有", SEAT_NOT_ON_SALE: "*", SEAT_WAITLIST: "候补"}
+_seat_codes_lock = threading.Lock()
+
+_NON_DIGIT = re.compile(r'[^0-9]')
+
+# 无法解析的时间
+INVALID_MINUTES = -1
+
+# 一天的分钟数
+DAY_MINUTES = 24 * 60
+
+# "HH:MM" 文本与分钟数的对照表（00:00-99:59），时间和历时的解析、格式化直接查表
+_CLOCK_TEXTS = tuple(f"{minutes // 60:02d}:{minutes % 60:02d}" for minutes in range(100 * 60))
+_CLOCK_MINUTES = {text: minutes for minutes, text in enumerate(_CLOCK_TEXTS)}
+
+# 价格类型对应的余票位置
+_PRICE_SEAT_INDEXES = tuple(SEAT_INDEX[seat_type] for seat_type in PRICE_TYPES)
+
+# 余票数字直接查表（超出范围的张数和新的非数字状态由 _seat_code 处理）
+_seat_codes.update((str(count), count) for count in range(1, 1000))
+
+# 价格文本与价格的对照表，不合理的价格为0，条目过多时清空
+_price_values = {"": 0, "0": 0}
+_PRICE_CACHE_LIMIT = 4096
+
+# 一次取出解析需要的字段：车次, 出发站, 到达站, 出发时间, 到达时间, 历时
+_ROW_FIELDS = itemgetter(3, 6, 7, 8, 9, 10)
+_SEAT_TEXTS = itemgetter(*SEAT_FIELDS)
+_PRICE_TEXTS = itemgetter(*(pos for positions in PRICE_FIELDS for pos in positions))
+# 包含所有余票和价格字段的车次可以走快速路径
+_FULL_ROW_FIELDS = max(max(SEAT_FIELDS), max(pos for positions in PRICE_FIELDS for pos in positions)) + 1
+
+
+def _seat_code(text):
+    """
+    将余票文本转换为编码
+    
+    Args:
+        text: 接口返回的余票文本，如 "有"、"无"、"12"
+    
+    Returns:
+        int: 余票状态编码
+    """
+    code = _seat_codes.get(text)
+    if code is not None:
+        return code
+    if text.isdigit():
+        return min(int(text), 32767)
+    with _seat_codes_lock:
+        code = _seat_codes.get(text)
+        if code is None:
+            code = -len(_seat_texts) - 1
+            _seat_codes[text] = code
+            _seat_texts[code] = text
+        return code
+
+
+def seat_text(code):
+    """
+    将余票状态编码转换为显示文本
+    
+    Args:
+        code: 余票状态编码
+    
+    Returns:
+        str: 余票文本，无票时为 "无"
+    """
+    if code > 0:
+        return str(code)
+    return _seat_texts.get(code, "无")
+
+
+def parse_clock(text):
+    """
+    解析 "HH:MM" 格式的时间（或历时）为分钟数
+    
+    Args:
+        text: 时间字符串，历时可能带有 "N天" 前缀
+    
+    Returns:
+        int: 分钟数，无法解析时返回 INVALID_MINUTES
+    """
+    # 常见格式直接查表
+    minutes = _CLOCK_MINUTES.get(text)
+    if minutes is not None:
+        return minutes
+    try:
+        days = 0
+        if "天" in text:
+            day_text, text = text.split("天")
+            days = int(day_text)
+        hours, minutes = text.split(":")
+        hours = int(hours)
+        minutes = int(minutes)
+    except ValueError:
+        return INVALID_MINUTES
+    if days < 0 or hours < 0 or not 0 <= minutes <= 59:
+        return INVALID_MINUTES
+    return days * DAY_MINUTES + hours * 60 + minutes
+
+
+def format_clock(minutes):
+    """
+    将分钟数格式化为 "HH:MM"
+    
+    Args:
+        minutes: 分钟数
+    
+    Returns:
+        str: 格式化后的时间，无效时返回 "--:--"
+    """
+    if minutes < 0:
+        return "--:--"
+    if minutes < len(_CLOCK_TEXTS):
+        return _CLOCK_TEXTS[minutes]
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _price_value(text):
+    """
+    解析单个价格字段，结果记入对照表
+    
+    Args:
+        text: 价格字段
+    
+    Returns:
+        int: 价格，不合理（不在10-10000之间）或无法解析时返回0
+    """
+    value = 0
+    digits = text if text.isdigit() else _NON_DIGIT.sub("", text)
+    if digits:
+        price = int(digits)
+        # 检查价格是否合理（10-10000之间）
+        if 10 <= price <= 10000:
+            value = price
+    if len(_price_values) >= _PRICE_CACHE_LIMIT:
+        _price_values.clear()
+        _price_values.update({"": 0, "0": 0})
+    _price_values[text] = value
+    return value
+
+
+def _parse_price(fields, positions):
+    """
+    从候选位置中解析价格
+    
+    Args:
+        fields: 车次字段列表
+        positions: 价格字段的候选位置
+    
+    Returns:
+        int: 价格，未找到合理价格时返回0
+    """
+    field_count = len(fields)
+    for pos in positions:
+        if pos >= field_count:
+            continue
+        price = fields[pos]
+        if not price or price == "0":
+            continue
+        if not price.isdigit():
+            price = _NON_DIGIT.sub("", price)
+            if not price:
+                continue
+        price_int = int(price)
+        # 检查价格是否合理（10-10000之间）
+        if 10 <= price_int <= 10000:
+            return price_int
+    return 0
+
+
+class TicketRecord:
+    """
+    余票查询接口返回的单个车次
+    
+    余票状态保存在定长数组中（顺序同 SEAT_TYPES），价格保存在定长数组中（顺序同 PRICE_TYPES），
+    时间在解析时转换为分钟数：出发、到达时间为当天 00:00 起的分钟数，arrival_day 为到达时相对出发日期的天数，
+    排序、筛选和换乘计算都只做整数运算，需要显示时再转换为字符串。
+    """
+    
+    __slots__ = ("train_number", "from_station_code", "to_station_code",
+                 "start_minutes", "end_minutes", "duration_minutes", "arrival_day", "seats", "prices")
+    
+    def __init__(self, train_number, from_station_code, to_station_code,
+                 start_minutes, end_minutes, duration_minutes, seats, prices):
+        self.train_number = train_number
+        self.from_station_code = from_station_code
+        self.to_station_code = to_station_code
+        self.start_minutes = start_minutes
+        self.end_minutes = end_minutes
+        self.duration_minutes = duration_minutes
+        if start_minutes >= 0 and duration_minutes >= 0:
+            self.arrival_day = (start_minutes + duration_minutes) // DAY_MINUTES
+        else:
+            self.arrival_day = 0
+        self.seats = seats
+        self.prices = prices
+    
+    def __repr__(self):
+        return (f"TicketRecord({self.train_number} {self.from_station_code}->{self.to_station_code} "
+                f"{self.start_time}-{self.end_time})")
+    
+    @property
+    def start_time(self):
+        return format_clock(self.start_minutes)
+    
+    @property
+    def end_time(self):
+        return format_clock(self.end_minutes)
+    
+    @property
+    def duration(self):
+        return format_clock(self.duration_minutes)
+    
+    @property
+    def arrive_minutes(self):
+        """到达时间，为出发日期 00:00 起的分钟数（跨天后继续累加）"""
+        return self.arrival_day * DAY_MINUTES + self.end_minutes
+    
+    def seat_status(self, seat_type):
+        """
+        获取指定座位类型的余票文本
+        
+        Args:
+            seat_type: 座位类型，如 "二等座"
+        
+        Returns:
+            str: 余票文本，未知座位类型返回None
+        """
+        index = SEAT_INDEX.get(seat_type)
+        if index is None:
+            return None
+        return seat_text(self.seats[index])
+    
+    def has_seat(self, seat_type):
+        """
+        判断指定座位类型是否有票（包括 "有"、具体张数以及其他非 "无" 状态）
+        
+        Args:
+            seat_type: 座位类型
+        
+        Returns:
+            bool: 是否有票
+        """
+        index = SEAT_INDEX.get(seat_type)
+        return index is not None and self.seats[index] != SEAT_NONE
+    
+    def bookable(self):
+        """
+        判断是否有可以直接购买的座位（"有" 或具体张数，不包括候补和未开售）
+        
+        Returns:
+            bool: 是否有票
+        """
+        return any(code > 0 or code == SEAT_PLENTY for code in self.seats)
+    
+    def lowest_price(self):
+        """
+        获取最低票价，优先在有票的座位中选择
+        
+        Returns:
+            int: 最低票价，价格未知时返回0
+        """
+        available = [price for price, seat_index in zip(self.prices, _PRICE_SEAT_INDEXES)
+                     if price and (self.seats[seat_index] > 0 or self.seats[seat_index] == SEAT_PLENTY)]
+        if not available:
+            available = [price for price in self.prices if price]
+        return min(available) if available else 0
+    
+    def remaining_tickets(self):
+        """
+        获取所有座位类型的余票信息
+        
+        Returns:
+            dict: 座位类型到余票文本的映射
+        """
+        return {seat_type: seat_text(code) for seat_type, code in zip(SEAT_TYPES, self.seats)}
+    
+    def price_texts(self):
+        """
+        获取所有座位类型的价格信息
+        
+        Returns:
+            dict: 座位类型到价格文本的映射，未知价格为 "-"
+        """
+        return {seat_type: str(price) if price else "-" for seat_type, price in zip(PRICE_TYPES, self.prices)}
+    
+    def to_ticket_info(self, query_date, station_name_of):
+        """
+        转换为界面、导出使用的车票信息字典
+        
+        Args:
+            query_date: 查询日期
+            station_name_of: 将站点编码转换为中文名称的函数
+        
+        Returns:
+            dict: 车票信息
+        """
+        return {
+            "train_number": self.train_number,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "start_minutes": self.start_minutes,
+            "end_minutes": self.end_minutes,
+            "duration_minutes": self.duration_minutes,
+            "arrival_day": self.arrival_day,
+            "start_station": station_name_of(self.from_station_code),
+            "end_station": station_name_of(self.to_station_code),
+            "date": query_date,
+            "remaining_tickets": self.remaining_tickets(),
+            "prices": self.price_texts()
+        }
+
+
+def decode_ticket_row(row):
+    """
+    解析余票查询接口返回的单个车次字符串
+    
+    Args:
+        row: 以 "|" 分隔的车次字符串
+    
+    Returns:
+        TicketRecord: 车次记录，字段不足时返回None
+    """
+    fields = row.split("|")
+    field_count = len(fields)
+    if field_count < MIN_ROW_FIELDS:
+        return None
+    
+    if field_count >= _FULL_ROW_FIELDS:
+        # 字段齐全时一次取出所有余票、价格字段，常见的文本直接查表
+        seat_texts = _SEAT_TEXTS(fields)
+        try:
+            seats = array("h", map(_seat_codes.__getitem__, seat_texts))
+        except KeyError:
+            seats = array("h", map(_seat_code, seat_texts))
+        price_texts = _PRICE_TEXTS(fields)
+        try:
+            values = list(map(_price_values.__getitem__, price_texts))
+        except KeyError:
+            values = list(map(_price_value, price_texts))
+        # 每种座位的两个候选位置相邻，取第一个合理的价格
+        prices = array("H", [values[0] or values[1], values[2] or values[3], values[4] or values[5],
+                             values[6] or values[7], values[8] or values[9], values[10] or values[11]])
+    else:
+        seats = array("h", [_seat_code(fields[pos]) if pos < field_count else SEAT_NONE for pos in SEAT_FIELDS])
+        prices = array("H", [_parse_price(fields, positions) for positions in PRICE_FIELDS])
+    
+    train_number, from_station_code, to_station_code, start_text, end_text, duration_text = _ROW_FIELDS(fields)
+    start_minutes = _CLOCK_MINUTES.get(start_text)
+    if start_minutes is None:
+        start_minutes = parse_clock(start_text)
+    end_minutes = _CLOCK_MINUTES.get(end_text)
+    if end_minutes is None:
+        end_minutes = parse_clock(end_text)
+    duration_minutes = _CLOCK_MINUTES.get(duration_text)
+    if duration_minutes is None:
+        duration_minutes = parse_clock(duration_text)
+    
+    return TicketRecord(train_number, from_station_code, to_station_code,
+                        start_minutes, end_minutes, duration_minutes, seats, prices)
+
 
 class TicketParser:
     """车票信息解析器"""
@@ -72,7 +459,7 @@ class TicketParser:
             
             logger.info(f"成功解析 {len(ticket_list)} 条车票信息")
             return ticket_list
-            
+        
         except Exception as e:
             logger.error(f"解析车票信息失败: {e}")
             # 保存页面内容到文件，以便调试
@@ -187,7 +574,7 @@ class TicketParser:
             
             logger.info(f"解析车次 {train_number} 成功")
             return ticket_info
-            
+        
         except Exception as e:
             logger.error(f"解析单行车票信息失败: {e}")
             return None
@@ -222,10 +609,27 @@ class TicketParser:
             
             logger.info(f"成功解析 {len(station_dict)} 个站点编码")
             return station_dict
-            
+        
         except Exception as e:
             logger.error(f"解析站点编码失败: {e}")
             return {}
+    
+    def parse_left_ticket(self, result_list):
+        """
+        解析余票查询接口返回的车次列表
+        
+        Args:
+            result_list: 接口返回的车次字符串列表
+        
+        Returns:
+            list: TicketRecord 列表，跳过字段不足的车次
+        """
+        records = []
+        for row in result_list:
+            record = decode_ticket_row(row)
+            if record is not None:
+                records.append(record)
+        return records
 
 
 # 创建全局解析器实例
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试自动盯票线程与主线程的交互，不访问网络
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# 没有显示器时使用离屏渲染
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QMainWindow
+import gui.main_window as main_window
+from gui.main_window import MainWindow
+from fakes import make_row
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+class TrackWindow(MainWindow):
+    """跳过主窗口的界面初始化，记录自动盯票触发的界面更新及其所在线程"""
+    
+    def __init__(self):
+        QMainWindow.__init__(self)
+        self.query_count = 0
+        self.auto_track_running = True
+        self.auto_track_config = {}
+        self.calls = []
+        self.auto_track_ticket_found.connect(self.on_auto_track_ticket_found)
+        self.auto_track_stopped.connect(self.update_auto_track_status)
+    
+    def enable_config_controls(self):
+        self.calls.append(("enable", threading.current_thread()))
+    
+    def update_auto_track_status(self):
+        self.calls.append(("status", threading.current_thread()))
+    
+    def show_ticket_notification(self, message):
+        self.calls.append(("notify", threading.current_thread()))
+
+
+class FakeClient:
+    """返回预设余票的客户端"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def get_station_code(self, station_name):
+        return {"北京": "BJP", "上海": "SHH"}.get(station_name, station_name)
+    
+    def get_station_name(self, station_code):
+        return station_code
+    
+    def query_left_ticket(self, train_date, from_station, to_station, **kwargs):
+        return {"status": True, "data": {"result": self.rows}}
+
+
+def run_auto_track(window, monkeypatch, rows):
+    """在后台线程中执行自动盯票任务，余票查询使用预设的车次"""
+    monkeypatch.setattr(main_window, "client", FakeClient(rows))
+    thread = threading.Thread(target=window.auto_track_task,
+                              args=("北京", "上海", "2026-10-20", ["全部"], ["二等座"], 1, 1, [], False, "", ""))
+    thread.start()
+    return thread
+
+
+def wait_until(condition, timeout=2):
+    """处理主线程事件，直到条件成立或超时"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_ticket_found_updates_ui_on_main_thread(monkeypatch):
+    """发现余票后停止盯票，启用配置控件、更新状态和显示通知都在主线程中执行"""
+    window = TrackWindow()
+    thread = run_auto_track(window, monkeypatch, [make_row("G1", seats={30: "有"})])
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not window.auto_track_running
+    
+    assert wait_until(lambda: len(window.calls) == 3)
+    assert [name for name, _ in window.calls] == ["enable", "status", "notify"]
+    assert all(caller is threading.main_thread() for _, caller in window.calls)
+
+
+def test_stop_updates_status_on_main_thread(monkeypatch):
+    """手动停止盯票后，状态更新在主线程中执行"""
+    window = TrackWindow()
+    thread = run_auto_track(window, monkeypatch, [make_row("G1", seats={30: "无"})])
+    assert wait_until(lambda: window.query_count >= 1)
+    window.auto_track_running = False
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    
+    assert wait_until(lambda: window.calls)
+    assert [name for name, _ in window.calls] == ["status"]
+    assert window.calls[0][1] is threading.main_thread()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试自适应退避和熔断
+"""
+
+import sys
+import os
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+import requests
+from network.backoff import AdaptiveBackoff, CircuitOpenError, CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN
+from network.client import LEFT_TICKET_URL
+from fakes import FakeResponse, FakeSession, make_client
+
+
+def open_circuit(backoff):
+    """连续失败直到熔断，并让熔断时间立即结束"""
+    for _ in range(backoff.failure_threshold):
+        backoff.record_blocked()
+    assert backoff.circuit == CIRCUIT_OPEN
+    backoff.opened_at -= backoff.open_duration
+
+
+def test_interval_grows_on_failure_and_shrinks_after_successes():
+    """失败时请求间隔成倍增大，连续成功后逐步缩小，不超出上下限"""
+    backoff = AdaptiveBackoff(base_interval=3, max_interval=20, success_threshold=2, failure_threshold=10)
+    backoff.record_blocked()
+    backoff.record_error()
+    assert backoff.interval == 12
+    backoff.record_blocked()
+    assert backoff.interval == 20
+    
+    for _ in range(4):
+        backoff.record_success()
+    assert backoff.interval == 19
+    assert backoff.state()["total_blocked"] == 2
+
+
+def test_half_open_allows_one_trial():
+    """熔断时间结束后只允许一个试探请求，成功后解除熔断"""
+    backoff = AdaptiveBackoff()
+    open_circuit(backoff)
+    assert backoff.allow_request()
+    assert backoff.circuit == CIRCUIT_HALF_OPEN
+    assert not backoff.allow_request()
+    
+    backoff.record_success()
+    assert backoff.circuit == CIRCUIT_CLOSED
+    assert backoff.allow_request()
+
+
+def test_failed_trial_reopens_circuit():
+    """试探请求失败时重新熔断"""
+    backoff = AdaptiveBackoff()
+    open_circuit(backoff)
+    assert backoff.allow_request()
+    backoff.record_error()
+    assert backoff.circuit == CIRCUIT_OPEN
+    assert not backoff.allow_request()
+
+
+def test_release_trial_only_from_owner_thread():
+    """没有记录结果的试探请求可以结束，其他线程不能结束它"""
+    backoff = AdaptiveBackoff()
+    open_circuit(backoff)
+    assert backoff.allow_request()
+    
+    other = threading.Thread(target=backoff.release_trial)
+    other.start()
+    other.join()
+    assert not backoff.allow_request()
+    
+    backoff.release_trial()
+    assert backoff.circuit == CIRCUIT_HALF_OPEN
+    assert backoff.allow_request()
+
+
+def test_truncated_json_does_not_close_circuit():
+    """截断的JSON按请求错误处理，不会解除熔断"""
+    client = make_client(FakeSession([FakeResponse('{"status": true, "data": {"res')]))
+    open_circuit(client.backoff)
+    with pytest.raises(requests.exceptions.RequestException):
+        client.get(LEFT_TICKET_URL, max_retries=1)
+    assert client.backoff.circuit == CIRCUIT_OPEN
+
+
+def test_json_response_closes_circuit():
+    """试探请求返回正常的JSON时解除熔断"""
+    client = make_client(FakeSession([FakeResponse('{"status": true}')]))
+    open_circuit(client.backoff)
+    assert client.get(LEFT_TICKET_URL, max_retries=1).json() == {"status": True}
+    assert client.backoff.circuit == CIRCUIT_CLOSED
+
+
+def test_unexpected_error_releases_trial():
+    """试探请求因其他异常中断时，熔断器不会一直拒绝请求"""
+    client = make_client(FakeSession([KeyError("headers"), FakeResponse('{"status": true}')]))
+    open_circuit(client.backoff)
+    with pytest.raises(KeyError):
+        client.get(LEFT_TICKET_URL, max_retries=1)
+    assert client.backoff.circuit == CIRCUIT_HALF_OPEN
+    client.get(LEFT_TICKET_URL, max_retries=1)
+    assert client.backoff.circuit == CIRCUIT_CLOSED
+    
+    open_circuit(client.backoff)
+    client.backoff.opened_at += client.backoff.open_duration
+    with pytest.raises(CircuitOpenError):
+        client.get(LEFT_TICKET_URL, max_retries=1)
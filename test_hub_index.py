@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试中转站候选索引
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from transfer.hub_index import HubIndex, DEFAULT_HUBS
+from fakes import make_row
+
+CITIES = {"GLZ": "桂林", "GBZ": "桂林", "NNZ": "南宁", "BJP": "北京", "BXP": "北京"}
+
+
+def make_index(tmp_path=None):
+    """
+    创建索引：南宁到桂林2个车次、桂林到北京3个车次，南宁到杭州1个车次、杭州到北京5个车次
+    
+    Args:
+        tmp_path: 保存索引文件的临时目录，为None时不保存
+    
+    Returns:
+        HubIndex: 中转站候选索引
+    """
+    index = HubIndex(index_file=str(tmp_path / "hub_index.json") if tmp_path else os.devnull,
+                     city_of=CITIES.get)
+    index.observe([make_row("D1", "NNZ", "GLZ"), make_row("D2", "NNZ", "GLZ"),
+                   make_row("K1", "NNZ", "HZH")])
+    index.observe([make_row(f"G{i}", "GLZ", "BJP") for i in range(3)])
+    index.observe([make_row(f"G1{i}", "HZH", "BJP") for i in range(5)])
+    return index
+
+
+def test_candidates_ranked_by_connectivity():
+    """中转站按两段中较少的车次数排序，同城站点只保留一个"""
+    index = make_index()
+    assert index.candidates("NNZ", "BJP", limit=2) == ["GLZ", "HZH"]
+    assert index.candidates("NNZ", "BJP") == ["GLZ", "HZH"]
+
+
+def test_default_hubs_only_without_observed_hubs():
+    """统计到中转站后不再用常用中转站补充，没有统计到时才使用"""
+    index = HubIndex(index_file=os.devnull)
+    assert index.candidates("BJP", "HZH", limit=3) == DEFAULT_HUBS[:3]
+    assert index.candidates("BJP", "HZH", fallback=False) == []
+    
+    index.observe([make_row("G1", "BJP", "SHH"), make_row("G2", "SHH", "HZH")])
+    assert index.candidates("BJP", "HZH", limit=4) == ["SHH"]
+    assert index.candidates("NNZ", "HZH", limit=2) == ["GLZ", "GBZ"]
+
+
+def test_candidates_exclude_cities():
+    """排除的站点所在的城市不作为中转站"""
+    index = make_index()
+    assert index.candidates("NNZ", "BJP", limit=1, exclude=("GBZ",)) == ["HZH"]
+    # 目的站的同城车站也不作为中转站
+    index.observe([make_row("G9", "NNZ", "BXP"), make_row("G8", "BXP", "BJP")])
+    assert "BXP" not in index.candidates("NNZ", "BJP")
+
+
+def test_route_records_every_pair():
+    """始发站、查询站点和终到站之间按行驶顺序两两记录"""
+    index = HubIndex(index_file=os.devnull)
+    index.observe([make_row("Z1", "GLZ", "CSQ", origin="NNZ", terminus="BJP"), "short|row"])
+    assert index.stats() == {"stations": 4, "edges": 6}
+    assert index.candidates("NNZ", "BJP", limit=2) == ["GLZ", "CSQ"]
+
+
+def test_multi_hop_candidates():
+    """多次中转时，中转站可以经过多段车次到达目的站"""
+    index = HubIndex(index_file=os.devnull)
+    index.observe([make_row("A1", "NNZ", "LZQ"), make_row("A2", "LZQ", "CSQ"),
+                   make_row("A3", "CSQ", "BJP")])
+    assert "LZQ" not in index.candidates("NNZ", "BJP", limit=1)
+    assert index.candidates("NNZ", "BJP", limit=1, hops=2) == ["LZQ"]
+
+
+def test_edge_cap():
+    """每对站点记录的车次数有上限"""
+    index = HubIndex(index_file=os.devnull, max_trains_per_edge=2)
+    index.observe([make_row(f"G{i}", "NNZ", "GLZ") for i in range(5)])
+    assert len(index._reach["NNZ"]["GLZ"]) == 2
+
+
+def test_save_and_load(tmp_path):
+    """保存后重新加载，候选结果不变"""
+    index = make_index(tmp_path)
+    index.save()
+    loaded = HubIndex(index_file=str(tmp_path / "hub_index.json"), city_of=CITIES.get)
+    loaded.load()
+    assert loaded.stats() == index.stats()
+    assert loaded.candidates("NNZ", "BJP", limit=2) == ["GLZ", "HZH"]
+    assert not loaded._dirty
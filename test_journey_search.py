@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多次中转行程搜索
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from transfer.journey_search import JourneySearch, Journey
+from transfer.matcher import DAY_MINUTES
+from fakes import FakeSession, make_client, make_record, make_row
+
+
+# A 到 D：经 B 或 C 中转，也可以 A -> C -> B -> D
+LEGS = {
+    ("A", "B"): [make_record("T1", "A", "B", "08:00", 120)],
+    ("A", "C"): [make_record("T3", "A", "C", "08:00", 60)],
+    ("B", "D"): [make_record("T2", "B", "D", "10:30", 60)],
+    ("C", "D"): [make_record("T5", "C", "D", "09:30", 60)],
+    ("C", "B"): [make_record("T4", "C", "B", "09:30", 20)],
+    ("B", "A"): [make_record("T6", "B", "A", "11:00", 120)],
+}
+HUBS = {"A": ["B", "C"], "C": ["B"], "B": ["A"]}
+
+
+class FakeLegs:
+    """按预设的线路返回车次，并记录查询过的线路"""
+    
+    def __init__(self):
+        self.fetched = []
+    
+    def __call__(self, pairs):
+        self.fetched.append(list(pairs))
+        return {pair: LEGS.get(pair, []) for pair in pairs}
+
+
+def hub_candidates(station, destination, limit, exclude, hops):
+    """按预设返回中转站候选"""
+    return HUBS.get(station, [])[:limit]
+
+
+def describe(journey):
+    """行程经过的站点、车次和总历时"""
+    return "-".join(journey.stations), tuple(record.train_number for record in journey.legs), journey.total_minutes
+
+
+def test_search_rounds():
+    """按轮次找到一次和两次中转的行程，按总历时和中转次数排序，不会回到已经过的站点"""
+    fetch = FakeLegs()
+    search = JourneySearch(fetch, hub_candidates, max_transfers=2)
+    journeys = search.search("A", "D")
+    assert [describe(journey) for journey in journeys] == [
+        ("A-C-D", ("T3", "T5"), 150),
+        ("A-B-D", ("T1", "T2"), 210),
+        ("A-C-B-D", ("T3", "T4", "T2"), 210),
+    ]
+    assert journeys[2].waits == (30, 40)
+    # 第一轮只查询到中转站的线路，最后一轮只查询到目的站的线路
+    assert fetch.fetched[0] == [("A", "B"), ("A", "C")]
+    assert fetch.fetched[-1] == [("B", "D")]
+
+
+def test_iter_search_yields_each_round():
+    """每一轮新找到的行程分别返回"""
+    rounds = list(JourneySearch(FakeLegs(), hub_candidates, max_transfers=2).iter_search("A", "D"))
+    assert [[describe(journey)[0] for journey in journeys] for journeys in rounds] == [["A-C-D", "A-B-D"], ["A-C-B-D"]]
+
+
+def test_limits():
+    """最大中转次数、最长总历时、线路数和结果数都有上限"""
+    one_transfer = JourneySearch(FakeLegs(), hub_candidates, max_transfers=1).search("A", "D")
+    assert [describe(journey)[0] for journey in one_transfer] == ["A-C-D", "A-B-D"]
+    
+    short = JourneySearch(FakeLegs(), hub_candidates, max_total_minutes=180).search("A", "D")
+    assert [describe(journey)[0] for journey in short] == ["A-C-D"]
+    
+    fetch = FakeLegs()
+    assert JourneySearch(fetch, hub_candidates, leg_budget=2).search("A", "D") == []
+    assert sum(len(pairs) for pairs in fetch.fetched) == 2
+    
+    assert len(JourneySearch(FakeLegs(), hub_candidates, result_budget=1).search("A", "D")) == 1
+
+
+def test_journey_extend_across_midnight():
+    """跨天换乘后到达时间继续累加"""
+    journey = Journey.start(make_record("Z1", "A", "B", "22:00", 120), "A", "B")
+    assert journey.arrive == DAY_MINUTES
+    journey = journey.extend(make_record("Z2", "B", "C", "00:30", 60), "C", 30)
+    assert journey.arrive == DAY_MINUTES + 90
+    assert journey.total_minutes == 210
+    assert journey.transfers == 1
+
+
+def test_later_rounds_use_only_observed_hubs():
+    """使用统计到的中转站时，后续各轮不会再向不相关的常用中转站发送请求"""
+    client = make_client(FakeSession([]))
+    rows = {("BJP", "SHH"): [make_row("G1", "BJP", "SHH", "08:00", "12:30", "04:30")],
+            ("SHH", "HZH"): [make_row("G2", "SHH", "HZH", "13:30", "14:30", "01:00")]}
+    client.hub_index.observe([row for pair_rows in rows.values() for row in pair_rows])
+    requested = []
+    
+    def query_left_ticket(train_date, from_station, to_station, **kwargs):
+        requested.append((from_station, to_station))
+        return {"status": True, "data": {"result": rows.get((from_station, to_station), [])}}
+    
+    client.query_left_ticket = query_left_ticket
+    batches = list(client.iter_transfer_plans("北京", "杭州", "2026-10-20", max_transfers=2))
+    assert sorted(requested) == [("BJP", "SHH"), ("SHH", "HZH")]
+    assert [[leg["train_number"] for leg in plan["transfers"]] for plans in batches for plan in plans] == [["G1", "G2"]]
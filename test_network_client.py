@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试网络客户端，不访问网络
+"""
+
+import sys
+import os
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, Future
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import network.client as client_module
+from network.client import TicketCache, InflightQuery, LazyNetworkClient, LEFT_TICKET_URL
+from network.rate_limiter import RateLimiter, RequestCancelled
+from fakes import FakeResponse, make_client, EMPTY_RESULT
+
+BLOCKED_PAGE = "<!DOCTYPE html><html>网络可能存在问题</html>"
+
+
+class BlockingSession:
+    """前 blocked 次余票查询返回反爬页面，之后返回JSON，每次请求耗时 delay 秒"""
+    
+    def __init__(self, blocked, delay=0):
+        self.blocked = blocked
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.calls += 1
+            blocked = self.calls <= self.blocked
+        time.sleep(self.delay)
+        return FakeResponse(BLOCKED_PAGE if blocked else EMPTY_RESULT)
+
+
+class CancellingSession:
+    """每次请求时设置 cancelled，模拟请求发出后查询被新查询取代"""
+    
+    def __init__(self, cancelled):
+        self.cancelled = cancelled
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.cancelled.set()
+        return FakeResponse()
+
+
+class RecordingClient:
+    """代替 NetworkClient，记录创建次数，不访问网络"""
+    
+    created = []
+    
+    def __init__(self, **kwargs):
+        RecordingClient.created.append(kwargs)
+        self.timeout = kwargs.get("timeout", 30)
+        self.closed = False
+    
+    def get_station_code(self, station_name):
+        return "BJP"
+    
+    def close(self):
+        self.closed = True
+
+
+class HookedLock:
+    """第一次加锁前执行 hook，模拟在加锁前刚好完成的另一个调用"""
+    
+    def __init__(self, hook):
+        self._lock = threading.Lock()
+        self._hook = hook
+    
+    def __enter__(self):
+        hook, self._hook = self._hook, None
+        if hook:
+            hook()
+        self._lock.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+def test_concurrent_blocks_reinit_session_once():
+    """多个线程同时被拦截时只重新初始化一次会话"""
+    workers = 4
+    client = make_client(BlockingSession(blocked=workers), failure_threshold=100)
+    warmups = []
+    
+    def init_session():
+        warmups.append(threading.current_thread().name)
+        time.sleep(0.2)
+    
+    client._init_session = init_session
+    barrier = threading.Barrier(workers)
+    
+    def query(_):
+        barrier.wait()
+        return client.get(LEFT_TICKET_URL, max_retries=2).status_code
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        assert list(executor.map(query, range(workers))) == [200] * workers
+    assert len(warmups) == 1
+
+
+def test_later_block_reinits_again():
+    """重新初始化之后再次被拦截时，会再次重新初始化"""
+    client = make_client(BlockingSession(blocked=0))
+    warmups = []
+    client._init_session = lambda: warmups.append(time.time())
+    
+    client._reinit_session(time.time())
+    client._reinit_session(time.time() + 1)
+    assert len(warmups) == 2
+
+
+def test_ticket_cache_ttl_and_lru():
+    """缓存条目过期后失效，超出容量时淘汰最久未使用的条目"""
+    cache = TicketCache(ttl=30, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    
+    # 调用方可以要求更短的缓存时长
+    cache._entries["a"] = (time.time() - 10, 1)
+    assert cache.get("a", max_age=5) is None
+    cache.set("a", 1)
+    cache._entries["a"] = (time.time() - 31, 1)
+    assert cache.get("a") is None
+    
+    cache.invalidate("c")
+    assert cache.get("c") is None
+    assert cache.stats() == {"hits": 3, "misses": 4, "size": 0}
+
+
+def test_query_left_ticket_uses_cache():
+    """成功的查询结果写入缓存，强制刷新时跳过缓存"""
+    client = make_client(BlockingSession(blocked=0))
+    
+    first = client.query_left_ticket("2026-10-20", "BJP", "SHH")
+    assert client.query_left_ticket("2026-10-20", "BJP", "SHH") is first
+    assert client.session.calls == 1
+    client.query_left_ticket("2026-10-20", "BJP", "SHH", force_refresh=True)
+    assert client.session.calls == 2
+    client.query_left_ticket("2026-10-21", "BJP", "SHH")
+    assert client.session.calls == 3
+
+
+def test_identical_inflight_queries_share_one_request():
+    """并发的相同查询只发送一次请求，不同查询各自发送"""
+    client = make_client(BlockingSession(blocked=0, delay=0.2))
+    keys = [("2026-10-20", "BJP", "SHH")] * 3 + [("2026-10-20", "BJP", "NNZ")]
+    barrier = threading.Barrier(len(keys))
+    
+    def query(key):
+        barrier.wait()
+        return client.query_left_ticket(*key, force_refresh=True)
+    
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        results = list(executor.map(query, keys))
+    assert client.session.calls == 2
+    assert results[0] is results[1] is results[2]
+    assert not client._inflight
+
+
+def test_inflight_failure_reaches_every_caller():
+    """共享的请求失败时，所有等待的调用方都收到异常"""
+    client = make_client(BlockingSession(blocked=10, delay=0.2))
+    barrier = threading.Barrier(2)
+    
+    def query(_):
+        barrier.wait()
+        try:
+            client.query_left_ticket("2026-10-20", "BJP", "SHH", max_retries=1)
+        except Exception as e:
+            return str(e)
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        errors = list(executor.map(query, range(2)))
+    assert client.session.calls == 1
+    assert all("反爬" in error for error in errors)
+
+
+def test_cancelled_transfer_search_stops_requests():
+    """中转查询被取代后不再发送线路查询，排队等待令牌的查询立即放弃，一次和多次中转都是如此"""
+    for max_transfers in (1, 2):
+        cancelled = threading.Event()
+        client = make_client(CancellingSession(cancelled))
+        # 第一个请求之后的请求都要等待令牌
+        client.rate_limiter = RateLimiter(rate=0.5, burst=1)
+        
+        started = time.monotonic()
+        batches = list(client.iter_transfer_plans("北京", "上海", "2026-10-20", max_transfers=max_transfers,
+                                                  cancelled=cancelled))
+        assert batches == []
+        assert time.monotonic() - started < 1
+        assert client.session.calls == 1
+        # 等待令牌的线路查询都已放弃
+        deadline = time.monotonic() + 1
+        while client.rate_limiter.stats()["queue_depth"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.rate_limiter.stats()["queue_depth"] == 0
+        assert client.session.calls == 1
+
+
+def test_query_completed_before_registration_uses_cache():
+    """相同的查询在登记之前刚好完成并写入缓存时，直接使用缓存，不再发送请求"""
+    client = make_client(BlockingSession(blocked=0))
+    key = ("2026-10-20", "BJP", "SHH", "ADULT")
+    finished = {"status": True, "data": {"result": []}}
+    client._inflight_lock = HookedLock(lambda: client.ticket_cache.set(key, finished))
+    
+    assert client.query_left_ticket("2026-10-20", "BJP", "SHH") is finished
+    assert client.session.calls == 0
+    assert not client._inflight
+
+
+def test_query_after_cancelled_leader_sends_own_request():
+    """发起共享请求的调用方取消后，其他调用方自己发送请求"""
+    client = make_client(BlockingSession(blocked=0))
+    key = ("2026-10-20", "BJP", "SHH", "ADULT")
+    cancelled_query = InflightQuery(0)
+    cancelled_query.future.set_exception(RequestCancelled("请求已取消"))
+    client._inflight[key] = cancelled_query
+    
+    assert client.query_left_ticket("2026-10-20", "BJP", "SHH")["status"]
+    assert client.session.calls == 1
+    assert not client._inflight
+
+
+def test_import_creates_no_client():
+    """导入模块时不创建客户端，不启动会话初始化线程"""
+    code = ("import threading, network.client as module; "
+            "assert module.client._instance is None; "
+            "assert 'NetworkClientWarmup' not in [thread.name for thread in threading.enumerate()]")
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+def test_lazy_client_created_on_first_access(monkeypatch):
+    """首次访问属性时才创建客户端且只创建一次，读写属性转发给实际客户端"""
+    RecordingClient.created = []
+    monkeypatch.setattr(client_module, "NetworkClient", RecordingClient)
+    lazy = LazyNetworkClient(timeout=5)
+    
+    # 未创建时关闭不做任何操作
+    lazy.close()
+    assert RecordingClient.created == []
+    
+    barrier = threading.Barrier(4)
+    
+    def first_access(_):
+        barrier.wait()
+        return lazy.get_station_code("北京")
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(first_access, range(4))) == ["BJP"] * 4
+    assert RecordingClient.created == [{"timeout": 5}]
+    
+    instance = lazy.get_instance()
+    assert lazy.timeout == 5
+    lazy.timeout = 10
+    assert instance.timeout == 10
+    assert "timeout" not in vars(lazy)
+    # 下划线开头的属性保存在代理对象上
+    lazy._note = "local"
+    assert vars(lazy)["_note"] == "local"
+    assert not hasattr(instance, "_note")
+    
+    lazy.close()
+    assert instance.closed
+    assert len(RecordingClient.created) == 1
+
+
+def test_wait_until_ready_timeout():
+    """会话初始化未完成时等待超时返回False，完成后返回True"""
+    client = make_client(BlockingSession(blocked=0))
+    client.ready = Future()
+    started = time.monotonic()
+    assert client.wait_until_ready(timeout=0.05) is False
+    assert 0.04 < time.monotonic() - started < 1
+    
+    client.ready.set_result(True)
+    assert client.wait_until_ready(timeout=0.05) is True
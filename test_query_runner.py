@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试界面查询任务的执行器
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# 没有显示器时使用离屏渲染
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from gui.query_runner import QueryRunner
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def wait_until(condition, timeout=2):
+    """
+    处理主线程事件，直到条件成立或超时
+    
+    Args:
+        condition: 条件函数
+        timeout: 超时时间（秒）
+    
+    Returns:
+        bool: 条件是否成立
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_new_query_supersedes_old_one():
+    """新查询取代同一视图的旧查询，旧查询的检查点停止执行，晚到的界面更新被丢弃"""
+    runner = QueryRunner(max_workers=2)
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+    checkpoints = []
+    
+    def slow_query(token):
+        started.set()
+        release.wait(2)
+        token.post(results.append, "old")
+        try:
+            token.check()
+        except Exception as e:
+            checkpoints.append(type(e).__name__)
+            raise
+    
+    runner.submit("result", slow_query)
+    assert started.wait(2)
+    assert runner.is_busy("result")
+    runner.submit("result", lambda token: token.post(results.append, "new"))
+    release.set()
+    
+    assert wait_until(lambda: results and checkpoints)
+    assert results == ["new"]
+    assert checkpoints == ["QueryCancelled"]
+    assert wait_until(lambda: not runner.is_busy("result"))
+    runner.shutdown()
+
+
+def test_queued_query_is_cancelled():
+    """还在排队的查询被取消后不会执行，其他视图的查询不受影响"""
+    runner = QueryRunner(max_workers=1)
+    release = threading.Event()
+    ran = []
+    runner.submit("track", lambda token: release.wait(2) and ran.append("track"))
+    runner.submit("result", lambda token: ran.append("queued"))
+    assert runner.is_busy("result")
+    
+    runner.cancel("result")
+    assert not runner.is_busy("result")
+    assert runner.is_busy("track")
+    release.set()
+    assert wait_until(lambda: not runner.is_busy("track"))
+    time.sleep(0.05)
+    assert ran == ["track"]
+    runner.shutdown()
+
+
+def test_cancel_drops_pending_updates():
+    """取消视图后，已结束查询尚未执行的界面更新同样被丢弃"""
+    runner = QueryRunner()
+    results = []
+    finished = threading.Event()
+    runner.submit("result", lambda token: (token.post(results.append, "done"), finished.set()))
+    # 不处理主线程事件，界面更新留在事件队列中
+    assert finished.wait(2)
+    runner.cancel("result")
+    app.processEvents()
+    assert results == []
+    runner.shutdown()
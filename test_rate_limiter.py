@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试令牌桶限流器
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from network.rate_limiter import RateLimiter, RequestCancelled, PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED, PRIORITY_PREFETCH
+
+
+def start_waiters(limiter, requests, order):
+    """
+    依次启动等待令牌的线程，每个线程排上队后再启动下一个
+    
+    Args:
+        limiter: 限流器
+        requests: [(名称, 接口路径, 优先级)]
+        order: 按获得令牌的顺序记录名称
+    
+    Returns:
+        list: 线程列表
+    """
+    threads = []
+    for name, endpoint, priority in requests:
+        queued = len(limiter._waiters)
+        thread = threading.Thread(target=lambda n=name, e=endpoint, p=priority: (limiter.acquire(e, p), order.append(n)))
+        thread.start()
+        while len(limiter._waiters) == queued and thread.is_alive():
+            time.sleep(0.001)
+        threads.append(thread)
+    return threads
+
+
+def test_burst_then_rate():
+    """突发请求数以内不等待，之后按速率等待"""
+    limiter = RateLimiter(rate=20, burst=2)
+    assert limiter.acquire() < 0.01
+    assert limiter.acquire() < 0.01
+    waited = limiter.acquire()
+    assert 0.02 < waited < 0.2
+    assert limiter.stats()["requests"] == 3
+
+
+def test_priority_then_fifo():
+    """等待中的请求按优先级获得令牌，同一优先级按到达顺序"""
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.acquire()
+    order = []
+    threads = start_waiters(limiter, [("prefetch", None, PRIORITY_PREFETCH),
+                                      ("scheduled-1", None, PRIORITY_SCHEDULED),
+                                      ("interactive", None, PRIORITY_INTERACTIVE),
+                                      ("scheduled-2", None, PRIORITY_SCHEDULED)], order)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["interactive", "scheduled-1", "scheduled-2", "prefetch"]
+
+
+def test_priority_can_be_raised_while_waiting():
+    """优先级为函数时，等待期间提升的优先级生效"""
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.acquire()
+    raised = {"priority": PRIORITY_PREFETCH}
+    order = []
+    threads = start_waiters(limiter, [("scheduled", None, PRIORITY_SCHEDULED),
+                                      ("raised", None, lambda: raised["priority"])], order)
+    raised["priority"] = PRIORITY_INTERACTIVE
+    limiter.notify()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["raised", "scheduled"]
+
+
+def test_empty_endpoint_bucket_does_not_block_other_endpoints():
+    """接口令牌桶为空的高优先级请求不会挡住其他接口的请求"""
+    limiter = RateLimiter(rate=100, burst=10, endpoint_limits={"/query": (2, 1)})
+    limiter.acquire("/query")
+    order = []
+    threads = start_waiters(limiter, [("query", "/query", PRIORITY_INTERACTIVE),
+                                      ("other", "/other", PRIORITY_PREFETCH)], order)
+    threads[1].join(timeout=5)
+    assert order == ["other"]
+    threads[0].join(timeout=5)
+    assert order == ["other", "query"]
+
+
+def test_set_rate_applies_to_waiters():
+    """降低接口速率后，等待中的请求按新速率等待"""
+    limiter = RateLimiter(rate=100, burst=10, endpoint_limits={"/query": (100, 1)})
+    limiter.acquire("/query")
+    limiter.set_rate(5, "/query")
+    waited = limiter.acquire("/query")
+    assert 0.1 < waited < 0.5
+
+
+def test_cancelled_waiter_gives_up():
+    """等待中的请求被取消时放弃等待，不消耗令牌，也不留在等待队列中"""
+    limiter = RateLimiter(rate=0.5, burst=1)
+    limiter.acquire()
+    cancelled = threading.Event()
+    errors = []
+    
+    def acquire():
+        try:
+            limiter.acquire(cancelled=cancelled)
+        except RequestCancelled as e:
+            errors.append(e)
+    
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    while not limiter._waiters:
+        time.sleep(0.001)
+    started = time.monotonic()
+    cancelled.set()
+    thread.join(timeout=5)
+    assert len(errors) == 1
+    assert time.monotonic() - started < 0.5
+    assert limiter.stats()["queue_depth"] == 0
+    assert limiter.stats()["requests"] == 1
+    
+    # 已经取消的请求直接放弃，即使有令牌也不消耗
+    limiter = RateLimiter(rate=0.5, burst=1)
+    try:
+        limiter.acquire(cancelled=cancelled)
+    except RequestCancelled:
+        pass
+    assert limiter.acquire() < 0.01
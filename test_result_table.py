@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试查询结果表格模型
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# 没有显示器时使用离屏渲染
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from gui.result_table import (ResultTableModel, ChunkedPlanAppender, seat_lines, ROW_TITLE, ROW_TRAIN, SEAT_ROLE, SEAT_COLUMN,
+                              SEAT_PLENTY, SEAT_COUNT, SEAT_NONE)
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def make_ticket(train_number, second_class="有", start_station="北京南", end_station="上海虹桥"):
+    """
+    生成车票信息
+    
+    Args:
+        train_number: 车次
+        second_class: 二等座余票
+        start_station: 出发站
+        end_station: 到达站
+    
+    Returns:
+        dict: 车票信息
+    """
+    return {
+        "train_number": train_number,
+        "start_time": "08:00",
+        "end_time": "12:30",
+        "duration": "04:30",
+        "start_station": start_station,
+        "end_station": end_station,
+        "date": "2026-10-20",
+        "remaining_tickets": {"一等座": "5", "二等座": second_class, "硬座": "无", "站票": ""},
+        "prices": {"一等座": "933", "二等座": "553"}
+    }
+
+
+def make_plan(*train_numbers):
+    """
+    生成中转方案
+    
+    Args:
+        train_numbers: 各段车次
+    
+    Returns:
+        dict: 中转方案
+    """
+    return {"date": "2026-10-20", "total_duration": "09:00", "transfer_station": "南京南", "transfer_time": "30分钟",
+            "transfers": [make_ticket(train_number) for train_number in train_numbers]}
+
+
+def column(model, column_number=0):
+    """表格某一列的显示文本"""
+    return [model.data(model.index(row, column_number)) for row in range(model.rowCount())]
+
+
+def record_changes(model):
+    """
+    记录模型发出的插入、删除和数据变化信号
+    
+    Args:
+        model: ResultTableModel
+    
+    Returns:
+        list: [("insert"/"remove", 首行, 末行) 或 ("changed", 行, 列), ...]
+    """
+    changes = []
+    model.rowsInserted.connect(lambda parent, first, last: changes.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: changes.append(("remove", first, last)))
+    model.modelReset.connect(lambda: changes.append(("reset",)))
+    model.dataChanged.connect(lambda top_left, bottom_right, roles=(): changes.extend(
+        ("changed", row, column_number)
+        for row in range(top_left.row(), bottom_right.row() + 1)
+        for column_number in range(top_left.column(), bottom_right.column() + 1)))
+    return changes
+
+
+def test_seat_lines():
+    """余票信息带价格，按余票状态区分颜色，空的余票不显示"""
+    assert seat_lines(make_ticket("G1")) == [("一等座: 5 (¥933)", SEAT_COUNT), ("二等座: 有 (¥553)", SEAT_PLENTY),
+                                             ("硬座: 无", SEAT_NONE)]
+
+
+def test_set_tickets_and_plans():
+    """直达车次为一个标题行加车次行，中转方案每个方案一个标题行加各段车次行"""
+    model = ResultTableModel()
+    model.set_tickets([make_ticket("G1"), make_ticket("G3")])
+    assert column(model) == ["直达车次", "G1", "G3"]
+    assert column(model, 3)[0] == "共 2 个车次"
+    assert [model.row_kind(row) for row in range(3)] == [ROW_TITLE, ROW_TRAIN, ROW_TRAIN]
+    assert model.data(model.index(1, SEAT_COLUMN), SEAT_ROLE)[1] == ("二等座: 有 (¥553)", SEAT_PLENTY)
+    assert model.data(model.index(0, SEAT_COLUMN), SEAT_ROLE) is None
+    
+    model.set_plans([make_plan("G1", "D5"), make_plan("G3", "D7")])
+    assert column(model) == ["中转方案 1", "G1", "D5", "中转方案 2", "G3", "D7"]
+    model.clear()
+    assert model.rowCount() == 0
+
+
+def test_refresh_updates_only_changed_cells():
+    """刷新时车次不变的行保留，只有余票变化的单元格发出 dataChanged 并高亮"""
+    model = ResultTableModel()
+    model.set_tickets([make_ticket("G1"), make_ticket("G3")])
+    changes = record_changes(model)
+    
+    model.set_tickets([make_ticket("G1"), make_ticket("G3")])
+    assert changes == []
+    
+    model.set_tickets([make_ticket("G1"), make_ticket("G3", second_class="3")])
+    assert changes == [("changed", 2, SEAT_COLUMN)]
+    assert model.data(model.index(2, SEAT_COLUMN), Qt.BackgroundRole) is not None
+    assert model.data(model.index(1, SEAT_COLUMN), Qt.BackgroundRole) is None
+
+
+def test_refresh_inserts_and_removes_rows():
+    """新增、消失的车次只插入、删除对应的行，标题行的车次数随之更新"""
+    model = ResultTableModel()
+    model.set_tickets([make_ticket("G1"), make_ticket("G3"), make_ticket("G5")])
+    changes = record_changes(model)
+    
+    model.set_tickets([make_ticket("G1"), make_ticket("G2"), make_ticket("G5")])
+    assert column(model) == ["直达车次", "G1", "G2", "G5"]
+    assert sorted(changes) == [("insert", 2, 2), ("remove", 2, 2)]
+    
+    changes.clear()
+    model.set_tickets([make_ticket("G1"), make_ticket("G2"), make_ticket("G4"), make_ticket("G5")])
+    assert column(model) == ["直达车次", "G1", "G2", "G4", "G5"]
+    assert changes == [("insert", 3, 3), ("changed", 0, 3)]
+    
+    # 出发站不同的同一车次是不同的行
+    changes.clear()
+    model.set_tickets([make_ticket("G1", start_station="北京")])
+    assert column(model, 4) == ["", "北京"]
+    assert ("reset",) not in changes
+
+
+def test_refresh_plans_keeps_matching_plans():
+    """中转方案按日期和车次对应，方案序号变化时只更新标题和背景色"""
+    model = ResultTableModel()
+    model.set_plans([make_plan("G1", "D5"), make_plan("G3", "D7")])
+    changes = record_changes(model)
+    
+    model.set_plans([make_plan("G3", "D7")])
+    assert column(model) == ["中转方案 1", "G3", "D7"]
+    # 从后向前处理，保留的方案在删除前于第3行更新标题
+    assert changes.index(("changed", 3, 0)) < changes.index(("remove", 0, 2))
+    assert all(change[0] != "insert" for change in changes)
+
+
+def test_chunked_appender_shows_every_plan():
+    """分片追加的方案全部按顺序显示，每个分片后报告进度"""
+    model = ResultTableModel()
+    appender = ChunkedPlanAppender(model, batch_size=4)
+    progress = []
+    appender.progressed.connect(lambda shown, total: progress.append((shown, total)))
+    appender.append([make_plan(f"G{i}", f"D{i}") for i in range(10)])
+    appender.append([make_plan("G99", "D99")])
+    assert appender.is_running()
+    
+    deadline = time.monotonic() + 2
+    while appender.is_running() and time.monotonic() < deadline:
+        app.processEvents()
+    assert not appender.is_running()
+    assert progress[0] == (4, 11) and progress[-1] == (11, 11)
+    assert column(model)[0::3] == [f"中转方案 {i + 1}" for i in range(11)]
+    assert column(model)[-2:] == ["G99", "D99"]
+
+
+def test_chunked_appender_cancel():
+    """取消后丢弃尚未显示的方案"""
+    model = ResultTableModel()
+    appender = ChunkedPlanAppender(model)
+    appender.append([make_plan("G1", "D1")])
+    appender.cancel()
+    app.processEvents()
+    assert not appender.is_running()
+    assert (appender.shown, appender.total) == (0, 0)
+    assert model.rowCount() == 0
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试会话状态的保存和加载
+"""
+
+import sys
+import os
+import json
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from requests.cookies import RequestsCookieJar
+from network.session_store import SessionStore
+
+
+def make_jar(expires=None):
+    """
+    创建包含两个Cookie的容器
+    
+    Args:
+        expires: 第二个Cookie的过期时间
+    
+    Returns:
+        RequestsCookieJar: Cookie 容器
+    """
+    jar = RequestsCookieJar()
+    jar.set("JSESSIONID", "abc", domain="kyfw.12306.cn", path="/otn")
+    jar.set("route", "xyz", domain="kyfw.12306.cn", path="/", expires=expires)
+    return jar
+
+
+def test_save_and_load(tmp_path):
+    """保存的Cookie在有效期内可以加载，保留域名和路径"""
+    store = SessionStore(session_file=str(tmp_path / "data" / "session.json"))
+    warmed_at = time.time()
+    store.save(make_jar(), warmed_at)
+    
+    jar = RequestsCookieJar()
+    assert store.load(jar) == warmed_at
+    assert jar.get("JSESSIONID", domain="kyfw.12306.cn", path="/otn") == "abc"
+    assert jar.get("route") == "xyz"
+    assert not [name for name in os.listdir(tmp_path / "data") if name.endswith(".tmp")]
+
+
+def test_expired_session_is_not_loaded(tmp_path):
+    """超过有效期的会话不加载"""
+    store = SessionStore(session_file=str(tmp_path / "session.json"), ttl=60)
+    store.save(make_jar(), time.time() - 61)
+    jar = RequestsCookieJar()
+    assert store.load(jar) is None
+    assert len(jar) == 0
+
+
+def test_expired_cookies_are_dropped(tmp_path):
+    """已过期的Cookie不加载，全部过期时视为没有会话"""
+    store = SessionStore(session_file=str(tmp_path / "session.json"))
+    store.save(make_jar(expires=int(time.time()) - 10), time.time())
+    jar = RequestsCookieJar()
+    assert store.load(jar) is not None
+    assert [cookie.name for cookie in jar] == ["JSESSIONID"]
+    
+    jar = RequestsCookieJar()
+    jar.set("route", "xyz", expires=int(time.time()) - 10)
+    store.save(jar, time.time())
+    assert store.load(RequestsCookieJar()) is None
+
+
+def test_missing_or_corrupt_file(tmp_path):
+    """文件不存在或损坏时返回None，清除后不再加载"""
+    path = tmp_path / "session.json"
+    store = SessionStore(session_file=str(path))
+    assert store.load(RequestsCookieJar()) is None
+    
+    path.write_text("{not json", encoding="utf-8")
+    assert store.load(RequestsCookieJar()) is None
+    
+    path.write_text(json.dumps({"warmed_at": time.time(), "cookies": []}), encoding="utf-8")
+    assert store.load(RequestsCookieJar()) is None
+    
+    store.save(make_jar(), time.time())
+    store.clear()
+    assert not path.exists()
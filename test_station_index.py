@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试站点二进制索引
+"""
+
+import sys
+import os
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.station_index import StationIndex, Station, HEADER, ORIGIN_BUNDLED, ORIGIN_NETWORK
+
+STATIONS = [
+    Station("GLZ", "桂林", "guilin", "gl", "桂林", 3),
+    Station("NNZ", "南宁", "nanning", "nn", "南宁", 2),
+    Station("BJP", "北京", "beijing", "bj", "北京", 0),
+    Station("BXP", "北京西", "beijingxi", "bjx", "北京", 1),
+]
+
+
+def test_build_and_open(tmp_path):
+    """生成的索引写入文件后映射读取，编码、名称和城市都能查到"""
+    path = tmp_path / "stations.idx"
+    path.write_bytes(StationIndex.build(STATIONS, origin=ORIGIN_NETWORK, built_at=1000.0))
+    index = StationIndex.open(str(path))
+    try:
+        assert len(index) == 4
+        assert (index.origin, index.built_at, index.checked_at) == (ORIGIN_NETWORK, 1000.0, 1000.0)
+        assert index.code_of("北京西") == "BXP"
+        assert index.name_of("GLZ") == "桂林"
+        assert index.city_of("BXP") == "北京"
+        assert index.code_of("杭州") is None
+        assert index.name_of("HZH") is None and index.city_of("HZH") is None
+        assert index.names() == sorted(station.name for station in STATIONS)
+        assert [station.code for station in index] == ["BJP", "BXP", "GLZ", "NNZ"]
+        assert index.station(2) == STATIONS[0]
+    finally:
+        index._buffer.close()
+
+
+def test_duplicate_codes_keep_last():
+    """编码重复时保留最后一个站点"""
+    index = StationIndex(StationIndex.build(STATIONS + [Station("GLZ", "桂林站", "guilinzhan", "glz", "桂林")]))
+    assert len(index) == 4
+    assert index.name_of("GLZ") == "桂林站"
+    assert index.code_of("桂林") is None
+
+
+def test_checked_at():
+    """随程序发布的数据默认未从官网更新过，保存时可以替换更新时间"""
+    index = StationIndex(StationIndex.build(STATIONS, origin=ORIGIN_BUNDLED, built_at=1000.0))
+    assert index.checked_at == 0
+    updated = StationIndex(index.data(checked_at=2000.0))
+    assert (updated.built_at, updated.checked_at) == (1000.0, 2000.0)
+    assert updated.names() == index.names()
+    assert index.data() == StationIndex.build(STATIONS, origin=ORIGIN_BUNDLED, built_at=1000.0)
+
+
+def test_invalid_data(tmp_path):
+    """空文件、不完整或格式不符的数据抛出 ValueError"""
+    data = StationIndex.build(STATIONS)
+    with pytest.raises(ValueError):
+        StationIndex(data[:10])
+    with pytest.raises(ValueError):
+        StationIndex(data[:HEADER.size + 10])
+    with pytest.raises(ValueError):
+        StationIndex(b"XXXX" + data[4:])
+    path = tmp_path / "stations.idx"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        StationIndex.open(str(path))
+
+
+def test_city_groups():
+    """按城市名称分组，与城市同名的主站在最前，其余按排序号排列"""
+    stations = STATIONS + [Station("VAP", "北京北", "beijingbei", "bjb", "北京", 0),
+                           Station("VNP", "北京南", "beijingnan", "bjn", "北京", 3),
+                           Station("GBZ", "桂林北", "guilinbei", "glb", "桂林", 1)]
+    groups = StationIndex(StationIndex.build(stations)).city_groups()
+    assert list(groups) == sorted(groups, key=lambda city: city.encode("utf-8"))
+    assert [station.name for station in groups["北京"]] == ["北京", "北京北", "北京西", "北京南"]
+    assert [station.name for station in groups["桂林"]] == ["桂林", "桂林北"]
+    assert [station.code for station in groups["南宁"]] == ["NNZ"]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试站点信息的加载、更新和保存
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import utils.station_parser as station_module
+from utils.station_parser import StationParser, StationPrefixIndex
+from utils.station_index import Station, ORIGIN_BUNDLED, ORIGIN_NETWORK
+from fakes import FakeResponse
+
+# 测试用的站点数据，格式与 station_name.js 相同
+BUNDLED_CONTENT = ("var station_names ='"
+                   "@bjb|北京北|VAP|beijingbei|bjb|0|0357|北京|||"
+                   "@bjp|北京|BJP|beijing|bj|2|0357|北京|||"
+                   "@shh|上海|SHH|shanghai|sh|17|0712|上海|||';")
+NETWORK_CONTENT = BUNDLED_CONTENT.replace("';", "@bjn|北京南|VNP|beijingnan|bjn|3|0357|北京|||';")
+
+
+def new_parser(tmp_path, monkeypatch):
+    """
+    创建解析器，缓存文件和随程序发布的数据都在临时目录中，不启动后台更新
+    
+    Args:
+        tmp_path: 临时目录
+        monkeypatch: pytest 的 monkeypatch
+    
+    Returns:
+        StationParser: 站点解析器
+    """
+    (tmp_path / "station_name.txt").write_text(BUNDLED_CONTENT, encoding="utf-8")
+    monkeypatch.setattr(station_module, "_BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(StationParser, "refresh_in_background", lambda self: None)
+    return StationParser(station_file=str(tmp_path / "data" / "stations.idx"))
+
+
+def test_load_bundled_and_reload_cache(tmp_path, monkeypatch):
+    """没有缓存时加载随程序发布的数据并保存，再次启动时从缓存加载"""
+    parser = new_parser(tmp_path, monkeypatch)
+    assert parser.source == "bundled"
+    assert parser.index.origin == ORIGIN_BUNDLED
+    assert parser.get_station_code("北京") == "BJP"
+    
+    reloaded = new_parser(tmp_path, monkeypatch)
+    assert reloaded.source == "cache"
+    assert reloaded.get_station_name("SHH") == "上海"
+    # 与城市同名的主站排在最前面
+    assert reloaded.get_stations_by_city("北京") == ["北京", "北京北"]
+
+
+def test_refresh_save_reload(tmp_path, monkeypatch):
+    """从官网更新后保存，再次启动时加载更新后的数据"""
+    parser = new_parser(tmp_path, monkeypatch)
+    # 第二次启动时缓存文件被映射
+    parser = new_parser(tmp_path, monkeypatch)
+    assert parser.source == "cache"
+    
+    monkeypatch.setattr(station_module.requests, "get", lambda url, timeout: FakeResponse(NETWORK_CONTENT))
+    assert parser.fetch_stations()
+    assert parser.get_station_code("北京南") == "VNP"
+    
+    reloaded = new_parser(tmp_path, monkeypatch)
+    assert reloaded.source == "cache"
+    assert reloaded.index.origin == ORIGIN_NETWORK
+    assert reloaded.get_station_code("北京南") == "VNP"
+    assert not os.path.exists(reloaded.pending_file)
+
+
+def test_save_while_cache_file_is_mapped(tmp_path, monkeypatch):
+    """缓存文件不能替换时（Windows 上正在映射的文件），更新后的数据在下次启动时生效"""
+    parser = new_parser(tmp_path, monkeypatch)
+    parser = new_parser(tmp_path, monkeypatch)
+    
+    replace = os.replace
+    
+    def locked_replace(src, dst):
+        if dst == parser.station_file:
+            raise PermissionError("文件正在使用")
+        replace(src, dst)
+    
+    monkeypatch.setattr(station_module.requests, "get", lambda url, timeout: FakeResponse(NETWORK_CONTENT))
+    monkeypatch.setattr(station_module.os, "replace", locked_replace)
+    assert parser.fetch_stations()
+    assert os.path.exists(parser.pending_file)
+    # 当前进程使用更新后的数据
+    assert parser.get_station_code("北京南") == "VNP"
+    
+    monkeypatch.setattr(station_module.os, "replace", replace)
+    reloaded = new_parser(tmp_path, monkeypatch)
+    assert reloaded.index.origin == ORIGIN_NETWORK
+    assert reloaded.get_station_code("北京南") == "VNP"
+    assert not os.path.exists(reloaded.pending_file)
+
+
+def test_failed_refresh_waits_for_interval(tmp_path, monkeypatch):
+    """随程序发布的数据在第一次启动时更新，更新失败后 refresh_interval 之内不再重试"""
+    parser = new_parser(tmp_path, monkeypatch)
+    assert parser._needs_refresh()
+    
+    def offline(url, timeout):
+        raise station_module.requests.ConnectionError("网络不可用")
+    
+    monkeypatch.setattr(station_module.requests, "get", offline)
+    assert not parser.fetch_stations()
+    
+    reloaded = new_parser(tmp_path, monkeypatch)
+    assert reloaded.index.origin == ORIGIN_BUNDLED
+    assert not reloaded._needs_refresh()
+    reloaded.refresh_interval = -1
+    assert reloaded._needs_refresh()
+
+
+def test_lazy_load_has_no_side_effects(tmp_path, monkeypatch):
+    """不自动加载时，第一次用到站点信息只读取本地数据，不写入缓存也不访问网络；显式加载时才保存并更新"""
+    (tmp_path / "station_name.txt").write_text(BUNDLED_CONTENT, encoding="utf-8")
+    monkeypatch.setattr(station_module, "_BASE_DIR", str(tmp_path))
+    refreshes = []
+    monkeypatch.setattr(StationParser, "refresh_in_background", lambda self: refreshes.append(self))
+    
+    parser = StationParser(station_file=str(tmp_path / "data" / "stations.idx"), autoload=False)
+    assert parser._index is None
+    assert parser.get_station_code("上海") == "SHH"
+    assert parser.source == "bundled"
+    assert not (tmp_path / "data").exists()
+    assert refreshes == []
+    
+    parser.load_stations()
+    assert (tmp_path / "data" / "stations.idx").exists()
+    assert refreshes == [parser]
+
+
+def test_prefix_search():
+    """按中文名称、全拼或简拼前缀查找，不区分大小写，完全匹配的在前，其余按排序号排列，每个站点只出现一次"""
+    index = StationPrefixIndex([Station("VAP", "北京北", "beijingbei", "bjb", "北京", 0),
+                                Station("BJP", "北京", "beijing", "bj", "北京", 2),
+                                Station("VNP", "北京南", "beijingnan", "bjn", "北京", 3),
+                                Station("BBH", "蚌埠", "bengbu", "bb", "蚌埠", 1)])
+    assert len(index) == 12
+    assert [station.code for station in index.search("bj")] == ["BJP", "VAP", "VNP"]
+    assert [station.code for station in index.search(" BeiJing ")] == ["BJP", "VAP", "VNP"]
+    assert [station.code for station in index.search("北京南")] == ["VNP"]
+    assert [station.code for station in index.search("b")] == ["VAP", "BBH", "BJP", "VNP"]
+    assert [station.code for station in index.search("b", limit=2)] == ["VAP", "BBH"]
+    assert index.search("") == [] and index.search("x") == []
+
+
+def test_search_stations_after_refresh(tmp_path, monkeypatch):
+    """从官网更新后，自动补全使用新的站点数据"""
+    parser = new_parser(tmp_path, monkeypatch)
+    assert parser.search_stations("bjn") == []
+    
+    monkeypatch.setattr(station_module.requests, "get", lambda url, timeout: FakeResponse(NETWORK_CONTENT))
+    assert parser.fetch_stations()
+    assert [station.name for station in parser.search_stations("bjn")] == ["北京南"]
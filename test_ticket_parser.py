@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试余票查询结果的解析
+"""
+
+import sys
+import os
+import random
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parser.ticket_parser import (decode_ticket_row, parse_clock, format_clock, seat_text, _seat_code, _parse_price,
+                                  SEAT_FIELDS, PRICE_FIELDS, SEAT_PLENTY, SEAT_NONE, SEAT_WAITLIST, INVALID_MINUTES)
+from fakes import make_row
+
+
+def test_decode_row():
+    """解析车次、时间、余票和价格"""
+    record = decode_ticket_row(make_row(seats={30: "有", 31: "5", 32: "候补"}, prices={39: "553", 40: "0", 46: "933"}))
+    assert record.train_number == "G1"
+    assert (record.from_station_code, record.to_station_code) == ("BJP", "SHH")
+    assert (record.start_minutes, record.end_minutes, record.duration_minutes) == (480, 750, 270)
+    assert record.remaining_tickets()["二等座"] == "有"
+    assert record.seat_status("一等座") == "5"
+    assert record.seat_status("商务座") == "候补"
+    assert record.seat_status("硬座") == "无"
+    assert record.price_texts()["二等座"] == "553"
+    assert record.price_texts()["一等座"] == "933"
+    assert record.price_texts()["硬座"] == "-"
+    assert record.lowest_price() == 553
+    assert record.bookable()
+
+
+def test_short_row():
+    """字段不足的车次返回None，缺少价格字段时价格未知"""
+    assert decode_ticket_row("|".join([""] * 29)) is None
+    record = decode_ticket_row(make_row(seats={30: "3"}, field_count=33))
+    assert record.seat_status("二等座") == "3"
+    assert record.lowest_price() == 0
+
+
+def test_fast_path_matches_field_by_field_decoding():
+    """字段齐全时的查表解析与逐个字段解析的结果相同"""
+    rng = random.Random(12306)
+    seat_values = ["有", "无", "", "*", "候补", "0", "01", "1200", "40000"] + [str(n) for n in range(1, 30)]
+    price_values = ["", "0", "00", "5", "10", "10000", "10001", "¥553", "abc"] + [str(rng.randint(10, 3000)) for _ in range(20)]
+    for _ in range(500):
+        row = make_row(seats={pos: rng.choice(seat_values) for pos in SEAT_FIELDS},
+                       prices={pos: rng.choice(price_values) for positions in PRICE_FIELDS for pos in positions})
+        fields = row.split("|")
+        record = decode_ticket_row(row)
+        assert list(record.seats) == [_seat_code(fields[pos]) for pos in SEAT_FIELDS]
+        assert list(record.prices) == [_parse_price(fields, positions) for positions in PRICE_FIELDS]
+
+
+def test_seat_codes():
+    """余票文本与编码互相转换"""
+    assert _seat_code("有") == SEAT_PLENTY
+    assert _seat_code("") == SEAT_NONE
+    assert _seat_code("候补") == SEAT_WAITLIST
+    assert _seat_code("12") == 12
+    assert seat_text(12) == "12"
+    assert seat_text(SEAT_NONE) == "无"
+    # 新的非数字状态分配新的编码
+    code = _seat_code("停运")
+    assert code < 0 and seat_text(code) == "停运"
+    assert _seat_code("停运") == code
+
+
+def test_clock():
+    """时间、历时与分钟数互相转换"""
+    assert parse_clock("00:00") == 0
+    assert parse_clock("23:59") == 23 * 60 + 59
+    assert parse_clock("25:10") == 25 * 60 + 10
+    assert parse_clock("1天02:00") == 26 * 60
+    assert parse_clock("--:--") == INVALID_MINUTES
+    assert parse_clock("08:60") == INVALID_MINUTES
+    assert format_clock(495) == "08:15"
+    assert format_clock(INVALID_MINUTES) == "--:--"
+    assert format_clock(200 * 60) == "200:00"
+
+
+def test_arrival_day():
+    """跨天到达的车次，到达时间按出发日期累加"""
+    record = decode_ticket_row(make_row(start="22:30", end="06:10", duration="07:40"))
+    assert record.arrival_day == 1
+    assert record.arrive_minutes == 24 * 60 + 6 * 60 + 10
+    record = decode_ticket_row(make_row(start="--:--", end="06:10", duration="07:40"))
+    assert record.arrival_day == 0
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试自动盯票的车次选择模型
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# 没有显示器时使用离屏渲染
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from gui.train_picker import TrainListModel, TrainFilterProxyModel, ALL_TYPES
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def make_train(train_number, train_type):
+    """
+    生成车次信息
+    
+    Args:
+        train_number: 车次
+        train_type: 车次类型
+    
+    Returns:
+        dict: 车次信息
+    """
+    return {"train_number": train_number, "train_type": train_type, "start_station": "南宁东",
+            "end_station": "桂林北", "start_time": "08:00", "end_time": "10:30", "duration": "02:30"}
+
+
+TRAINS = [make_train("G1502", "G字头"), make_train("D8201", "D字头"), make_train("G2910", "G字头"),
+          make_train("K142", "K字头")]
+
+
+def visible(proxy):
+    """代理模型中显示的车次"""
+    return [proxy.data(proxy.index(row, 1)) for row in range(proxy.rowCount())]
+
+
+def test_checked_trains_survive_filter_and_reload():
+    """选中状态按车次保存，被筛选隐藏或重新加载后仍然保留"""
+    model = TrainListModel(checked=("K142",))
+    model.set_trains(TRAINS)
+    proxy = TrainFilterProxyModel()
+    proxy.setSourceModel(model)
+    
+    assert model.data(model.index(3, 0), Qt.CheckStateRole) == Qt.Checked
+    assert model.setData(model.index(0, 0), Qt.Checked, Qt.CheckStateRole)
+    assert not model.setData(model.index(0, 1), Qt.Checked, Qt.CheckStateRole)
+    
+    proxy.set_filter("g", "G字头")
+    assert visible(proxy) == ["G1502", "G2910"]
+    assert model.checked_trains() == ["G1502", "K142"]
+    
+    model.set_trains(list(reversed(TRAINS)))
+    assert model.checked_trains() == ["K142", "G1502"]
+    
+    assert visible(proxy) == ["G2910", "G1502"]
+    assert proxy.setData(proxy.index(1, 0), Qt.Unchecked, Qt.CheckStateRole)
+    assert model.checked_trains() == ["K142"]
+
+
+def test_filter_by_text_and_type():
+    """按车次编号关键词（不区分大小写）和车次类型筛选"""
+    model = TrainListModel()
+    model.set_trains(TRAINS)
+    proxy = TrainFilterProxyModel()
+    proxy.setSourceModel(model)
+    
+    assert visible(proxy) == ["G1502", "D8201", "G2910", "K142"]
+    proxy.set_filter(" 2 ", ALL_TYPES)
+    assert visible(proxy) == ["G1502", "D8201", "G2910", "K142"]
+    proxy.set_filter("29", ALL_TYPES)
+    assert visible(proxy) == ["G2910"]
+    proxy.set_filter("", "D字头")
+    assert visible(proxy) == ["D8201"]
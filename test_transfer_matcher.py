@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试中转车次匹配
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parser.ticket_parser import parse_clock
+from transfer.matcher import DepartureIndex, TransferIndex, match_transfers
+from fakes import make_record
+
+
+def test_connections_within_window():
+    """只返回换乘时间在 [最短, 最长] 范围内的车次，按出发时间排序"""
+    index = DepartureIndex([make_record(name, "A", "B", start, 60)
+                            for name, start in (("late", "20:00"), ("early", "10:10"),
+                                                ("ok", "10:20"), ("ok2", "11:00"))])
+    found = [(record.train_number, wait) for record, wait in index.connections(parse_clock("10:00"), 20, 120)]
+    assert found == [("ok", 20), ("ok2", 60)]
+
+
+def test_connections_wrap_past_midnight():
+    """换乘窗口跨过午夜时，早于到达时间的车次按次日出发计算等待时间"""
+    index = DepartureIndex([make_record(name, "A", "B", start, 60)
+                            for name, start in (("too-soon", "23:10"), ("same-day", "23:30"),
+                                                ("next-day", "00:30"), ("morning", "10:59"),
+                                                ("too-late", "11:01"))])
+    found = [(record.train_number, wait) for record, wait in index.connections(parse_clock("23:00"), 20, 12 * 60)]
+    assert found == [("same-day", 30), ("next-day", 90), ("morning", 719)]
+
+
+def test_invalid_departure_is_ignored():
+    """出发时间无法解析的车次不参与匹配"""
+    index = DepartureIndex([make_record("bad", "A", "B", "--:--", 60),
+                            make_record("good", "A", "B", "12:00", 60)])
+    assert len(index) == 1
+    assert [record.train_number for record, _ in index.connections(parse_clock("11:00"))] == ["good"]
+
+
+def test_match_transfers():
+    """匹配两段车次，跳过到达时间无法解析的第一段"""
+    first = [make_record("G1", "NNZ", "GLZ", "08:00", 120),
+             make_record("bad", "NNZ", "GLZ", "--:--", 120)]
+    second = [make_record("G2", "GLZ", "BJP", "10:30", 600),
+              make_record("G3", "GLZ", "BJP", "10:10", 600)]
+    matches = [(a.train_number, b.train_number, wait) for a, b, wait in match_transfers(first, second)]
+    assert matches == [("G1", "G2", 30)]
+    assert list(match_transfers(first, [])) == []
+
+
+def test_cross_station_needs_extra_time():
+    """同城换站需要额外的换站时间，同站换乘不需要"""
+    index = TransferIndex([make_record("same", "BXP", "SHH", "10:30", 300),
+                           make_record("other-soon", "VNP", "SHH", "10:30", 300),
+                           make_record("other", "VNP", "SHH", "11:30", 300)],
+                          cross_station_buffer=60)
+    found = sorted(record.train_number for record, _ in index.connections("BXP", parse_clock("10:00"), 20, 12 * 60))
+    assert found == ["other", "same"]
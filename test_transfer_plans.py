@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试逐批查询中转方案，余票查询使用预设的车次，不访问网络
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.station_parser import station_parser
+from fakes import FakeSession, make_client, make_row
+
+QUERY_DATE = "2026-10-20"
+
+# 按城市预设的车次，接口返回两端城市所有车站之间的车次
+ROWS = {
+    ("北京", "南京"): [make_row("G1", "BJP", "NJH", "08:00", "11:00", "03:00"),
+                      make_row("G7", "BJP", "NKH", "08:30", "11:30", "03:00")],
+    ("南京", "上海"): [make_row("G2", "NJH", "SHH", "12:00", "13:30", "01:30"),
+                      make_row("G8", "NKH", "SHH", "12:30", "14:00", "01:30")],
+    ("北京", "济南"): [make_row("G3", "BJP", "JNK", "08:00", "09:30", "01:30")],
+    ("济南", "上海"): [make_row("G4", "JNK", "SHH", "10:00", "13:30", "03:30")],
+    ("北京", "武汉"): [make_row("G5", "BJP", "WHN", "08:00", "12:00", "04:00")],
+    ("武汉", "上海"): [make_row("G6", "WHN", "SHH", "13:00", "17:00", "04:00")],
+    ("南京", "杭州"): [make_row("G9", "NJH", "HZH", "12:00", "13:30", "01:30")],
+}
+
+
+class FakeTickets:
+    """
+    按城市返回预设的车次并记录发出的余票查询，每次查询耗时 delay 秒，
+    前 limit 次之后的查询阻塞到 gate 被设置
+    """
+    
+    def __init__(self, limit=None, delay=0):
+        self.requested = []
+        self.limit = limit
+        self.delay = delay
+        self.gate = threading.Event()
+        self._lock = threading.Lock()
+    
+    def __call__(self, train_date, from_station, to_station, **kwargs):
+        with self._lock:
+            self.requested.append((from_station, to_station))
+            blocked = self.limit is not None and len(self.requested) > self.limit
+        if blocked:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        city_pair = (station_parser.get_station_city(from_station), station_parser.get_station_city(to_station))
+        return {"status": True, "data": {"result": ROWS.get(city_pair, [])}}
+
+
+def make_transfer_client(tickets):
+    """
+    创建统计过预设车次的客户端，余票查询由 tickets 代替
+    
+    Args:
+        tickets: FakeTickets
+    
+    Returns:
+        NetworkClient: 网络客户端
+    """
+    client = make_client(FakeSession([]))
+    client.hub_index.observe([row for rows in ROWS.values() for row in rows])
+    client.query_left_ticket = tickets
+    return client
+
+
+def train_numbers(plan):
+    """中转方案各段的车次"""
+    return tuple(leg["train_number"] for leg in plan["transfers"])
+
+
+def hub_city(plan):
+    """中转方案的换乘城市"""
+    return station_parser.get_station_city(station_parser.get_station_code(plan["transfers"][0]["end_station"]))
+
+
+def test_plans_yielded_per_hub():
+    """每个中转站匹配完成后单独返回一批方案，同城的中转站只查询一次，每段线路只请求一次"""
+    tickets = FakeTickets()
+    client = make_transfer_client(tickets)
+    batches = list(client.iter_transfer_plans("北京", "上海", QUERY_DATE))
+    
+    assert len(batches) == 3
+    # 每批方案都经过同一个中转城市
+    batch_cities = [{hub_city(plan) for plan in batch} for batch in batches]
+    assert sorted(city for cities in batch_cities for city in cities) == ["南京", "武汉", "济南"]
+    assert all(len(cities) == 1 for cities in batch_cities)
+    
+    plans = [train_numbers(plan) for batch in batches for plan in batch]
+    assert len(plans) == len(set(plans))
+    assert {("G3", "G4"), ("G5", "G6"), ("G1", "G2")} <= set(plans)
+    
+    # 南京和南京南只查询其中一个
+    assert len(tickets.requested) == len(set(tickets.requested)) == 6
+    assert len({station_parser.get_station_city(to_station) for from_station, to_station in tickets.requested
+                if from_station == "BJP"}) == 3
+
+
+def test_leg_cache_reused():
+    """已查询过的线路（包括同城的其他车站）直接使用缓存，不再请求"""
+    tickets = FakeTickets()
+    client = make_transfer_client(tickets)
+    list(client.iter_transfer_plans("北京", "上海", QUERY_DATE))
+    requested = len(tickets.requested)
+    
+    # 北京到南京的车次已缓存，只需要查询南京到杭州
+    batches = list(client.iter_transfer_plans("北京", "杭州", QUERY_DATE))
+    assert [sorted(train_numbers(plan) for plan in batch) for batch in batches] == [[("G1", "G9"), ("G7", "G9")]]
+    assert tickets.requested[requested:] == [("NJH", "HZH")]
+    
+    # 同城的其他车站复用按城市缓存的结果
+    records = client._fetch_leg_records(QUERY_DATE, "VNP", "NKH")
+    assert [record.train_number for record in records] == ["G1", "G7"]
+    assert len(tickets.requested) == requested + 1
+
+
+def test_close_cancels_pending_legs():
+    """调用方提前停止迭代时，尚未开始的线路查询被取消"""
+    # 只有一个工作线程时，三个中转站的第一段依次查询，之后是各中转站的第二段；
+    # 第一批方案返回时，第5个请求阻塞在 gate 上，第6个请求还在排队
+    tickets = FakeTickets(limit=4, delay=0.02)
+    client = make_transfer_client(tickets)
+    client.transfer_workers = 1
+    hubs = client.hub_index.candidates("BJP", "SHH", limit=4)
+    assert len(hubs) == 3
+    
+    plan_batches = client.iter_transfer_plans("北京", "上海", QUERY_DATE)
+    first_batch = next(plan_batches)
+    assert {hub_city(plan) for plan in first_batch} == {station_parser.get_station_city(hubs[0])}
+    plan_batches.close()
+    tickets.gate.set()
+    time.sleep(0.1)
+    
+    # 已经开始的第5个请求完成，排队的请求被取消
+    assert len(tickets.requested) == 5
+    assert len([hub for hub in hubs if (hub, "SHH") in tickets.requested]) == 2
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试中转方案排序
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from transfer.ranker import TransferRanker, plan_metrics, dominates
+
+
+class FakeRecord:
+    """只提供排序所需方法的车次记录"""
+    
+    def __init__(self, price, bookable=True):
+        self.price = price
+        self.is_bookable = bookable
+    
+    def bookable(self):
+        return self.is_bookable
+    
+    def lowest_price(self):
+        return self.price
+
+
+def test_plan_metrics():
+    """统计无票段数、总历时、等待总时间和票价，票价未知时为无穷大"""
+    assert plan_metrics([FakeRecord(100), FakeRecord(50, bookable=False)], 300, (40,)) == (1, 300, 40, 150)
+    assert plan_metrics([FakeRecord(100), FakeRecord(0)], 300, (40,))[3] == float("inf")
+
+
+def test_dominates():
+    """各项不差且至少一项更好才算支配，相同指标互不支配"""
+    assert dominates((0, 100, 10, 50), (0, 120, 10, 50))
+    assert not dominates((0, 100, 10, 50), (0, 100, 10, 50))
+    assert not dominates((0, 100, 10, 80), (0, 120, 10, 50))
+
+
+def test_top_k_keeps_best_plans():
+    """只保留排名最靠前的 top_k 个方案，按指标排序"""
+    ranker = TransferRanker(top_k=3, front_limit=0)
+    for total in (500, 300, 400, 100, 200):
+        metrics = (0, total, 0, 100)
+        if ranker.admits(metrics):
+            ranker.add(metrics, f"plan-{total}")
+    assert ranker.ranked() == ["plan-100", "plan-200", "plan-300"]
+    assert ranker.offered == 5
+    assert not ranker.admits((0, 300, 0, 100))
+
+
+def test_pareto_front_keeps_cheap_slow_plan():
+    """排名之外、但票价更低的方案保留在 Pareto 前沿，被支配的方案从前沿移除"""
+    ranker = TransferRanker(top_k=1, front_limit=10)
+    ranker.add((0, 200, 0, 500), "fast")
+    ranker.add((0, 300, 0, 600), "dominated")
+    ranker.add((0, 400, 0, 100), "cheap")
+    assert ranker.ranked() == ["fast", "cheap"]
+    assert not ranker.admits((0, 500, 0, 200))
+    assert ranker.admits((0, 500, 0, 50))
+
+
+def test_front_limit_drops_worst():
+    """Pareto 前沿超过上限时淘汰排名最差的方案"""
+    ranker = TransferRanker(top_k=1, front_limit=2)
+    for total, price in ((100, 400), (200, 300), (300, 200)):
+        ranker.add((0, total, 0, price), f"plan-{total}")
+    assert ranker.ranked() == ["plan-100", "plan-200"]
+
+
+def test_equal_metrics_keep_insertion_order():
+    """指标相同的方案按加入顺序排列"""
+    ranker = TransferRanker(top_k=3, front_limit=0)
+    for name in ("a", "b", "c", "d"):
+        ranker.add((0, 100, 0, 100), name)
+    assert ranker.ranked() == ["a", "b", "c"]
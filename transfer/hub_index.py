@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中转站候选索引，根据查询到的余票结果统计站点之间的连通情况，为中转查询挑选中转站
+"""
+
+import os
+import json
+import tempfile
+import threading
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+# 没有统计到中转站时使用的常用中转站
+DEFAULT_HUBS = [
+    "NNZ",  # 南宁
+    "GLZ",  # 桂林
+    "GBZ",  # 桂林北
+    "LZQ",  # 柳州
+    "HZH",  # 杭州
+    "SHH",  # 上海
+    "BJP"   # 北京
+]
+
+# 车次字符串中的字段位置
+_TRAIN_NUMBER = 3
+_ORIGIN = 4       # 始发站
+_TERMINUS = 5     # 终到站
+_FROM = 6         # 查询出发站
+_TO = 7           # 查询到达站
+
+
+class HubIndex:
+    """
+    中转站候选索引
+    
+    每个车次按 始发站 -> 出发站 -> 到达站 -> 终到站 的顺序记录站点之间的可达关系，
+    中转站候选为出发站可以到达、且可以到达目的站的站点，按连通的车次数排序。
+    查询一个站点会返回同城所有车站的车次，因此每个城市只保留排名最高的一个站点。
+    """
+    
+    def __init__(self, index_file=None, max_trains_per_edge=32, city_of=None):
+        """
+        初始化索引
+        
+        Args:
+            index_file: 索引文件路径，默认保存到 data/hub_index.json
+            max_trains_per_edge: 每对站点最多记录的车次数，超过后不再增加连通度
+            city_of: 根据站点编码获取所属城市的函数，为None或返回None时每个站点单独作为一个城市
+        """
+        self.index_file = index_file or os.path.join(os.path.dirname(__file__), "../data/hub_index.json")
+        self.max_trains_per_edge = max_trains_per_edge
+        self.city_of = city_of
+        self._lock = threading.Lock()
+        # {出发站: {到达站: 车次集合}}
+        self._reach = {}
+        # {到达站: {出发站: 车次集合}}，与 _reach 共享车次集合
+        self._reached_by = {}
+        self._dirty = False
+    
+    def _add_edge(self, from_code, to_code, train_number):
+        """记录一个车次连通两个站点（需持有锁）"""
+        trains = self._reach.setdefault(from_code, {}).get(to_code)
+        if trains is None:
+            trains = set()
+            self._reach[from_code][to_code] = trains
+            self._reached_by.setdefault(to_code, {})[from_code] = trains
+        if len(trains) < self.max_trains_per_edge and train_number not in trains:
+            trains.add(train_number)
+            self._dirty = True
+    
+    def observe(self, result_list):
+        """
+        从余票查询结果中记录站点连通关系
+        
+        Args:
+            result_list: 接口返回的车次字符串列表
+        """
+        with self._lock:
+            for row in result_list:
+                fields = row.split("|", _TO + 1)
+                if len(fields) <= _TO:
+                    continue
+                train_number = fields[_TRAIN_NUMBER]
+                if not train_number:
+                    continue
+                
+                # 按行驶顺序排列的站点，去掉空值和相邻的重复站点
+                route = []
+                for code in (fields[_ORIGIN], fields[_FROM], fields[_TO], fields[_TERMINUS]):
+                    if code and (not route or route[-1] != code):
+                        route.append(code)
+                
+                for i in range(len(route) - 1):
+                    for j in range(i + 1, len(route)):
+                        if route[i] != route[j]:
+                            self._add_edge(route[i], route[j], train_number)
+    
+    def _city(self, station_code):
+        """获取站点所属城市，未知时返回站点编码本身"""
+        city = self.city_of(station_code) if self.city_of else None
+        return city or station_code
+    
+    def _reaching_scores(self, to_station, hops):
+        """
+        计算在 hops 段车次内可以到达目的站的站点及其连通度（需持有锁）
+        
+        Args:
+            to_station: 目的站编码
+            hops: 最多乘坐的车次段数
+        
+        Returns:
+            dict: {站点编码: 连通度}，连通度为沿途各段车次数的最小值
+        """
+        scores = {}
+        frontier = {to_station: float("inf")}
+        for _ in range(hops):
+            next_frontier = {}
+            for target, target_score in frontier.items():
+                for source, trains in self._reached_by.get(target, {}).items():
+                    score = min(len(trains), target_score)
+                    if score > scores.get(source, 0):
+                        scores[source] = score
+                        next_frontier[source] = score
+            frontier = next_frontier
+        return scores
+    
+    def candidates(self, from_station, to_station, limit=None, exclude=(), hops=1, fallback=True):
+        """
+        获取中转站候选
+        
+        Args:
+            from_station: 出发站编码
+            to_station: 到达站编码
+            limit: 最多返回的中转站数量，为None时不限制
+            exclude: 需要排除的站点编码
+            hops: 从中转站到目的站最多乘坐的车次段数，多次中转时大于1
+            fallback: 没有统计到中转站时是否使用常用中转站
+        
+        Returns:
+            list: 中转站编码列表，按连通度从高到低排列，没有统计到中转站时为常用中转站（fallback 为False时为空）；
+                与出发站、目的站或排除站点同城的站点不会作为中转站，每个城市最多一个
+        """
+        excluded = {self._city(code) for code in (from_station, to_station, *exclude)}
+        
+        with self._lock:
+            outgoing = self._reach.get(from_station, {})
+            reaching = self._reaching_scores(to_station, hops)
+            scored = []
+            for hub, first_trains in outgoing.items():
+                onward_score = reaching.get(hub)
+                if not onward_score:
+                    continue
+                # 各段中最少的车次数决定可行的中转组合数
+                scored.append((min(len(first_trains), onward_score),
+                               len(first_trains) + onward_score, hub))
+        
+        scored.sort(reverse=True)
+        if scored:
+            logger.info(f"根据统计数据找到 {len(scored)} 个中转站候选: "
+                        + ", ".join(f"{hub}({score})" for score, _, hub in scored[:10]))
+            ranked = [hub for _, _, hub in scored]
+        else:
+            # 统计到中转站后不再补充常用中转站，避免为不相关的线路发送请求
+            ranked = DEFAULT_HUBS if fallback else []
+        
+        hubs = []
+        cities = set(excluded)
+        for hub in ranked:
+            if limit is not None and len(hubs) >= limit:
+                break
+            city = self._city(hub)
+            if city not in cities:
+                cities.add(city)
+                hubs.append(hub)
+        
+        return hubs
+    
+    def stats(self):
+        """
+        获取索引统计信息
+        
+        Returns:
+            dict: 站点数和站点对数
+        """
+        with self._lock:
+            return {
+                "stations": len(set(self._reach) | set(self._reached_by)),
+                "edges": sum(len(targets) for targets in self._reach.values())
+            }
+    
+    def save(self):
+        """保存索引，先写入临时文件再替换，避免写入中断导致文件损坏"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                from_code: {to_code: sorted(trains) for to_code, trains in targets.items()}
+                for from_code, targets in self._reach.items()
+            }
+            self._dirty = False
+        
+        try:
+            data_dir = os.path.dirname(os.path.abspath(self.index_file))
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
+            
+            fd, temp_path = tempfile.mkstemp(dir=data_dir, prefix=".hub_index-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.index_file)
+            except Exception:
+                os.remove(temp_path)
+                raise
+            logger.info(f"中转站索引已保存到 {self.index_file}")
+        except Exception as e:
+            logger.error(f"保存中转站索引失败: {e}")
+    
+    def load(self):
+        """从文件加载索引，与当前已记录的数据合并"""
+        if not os.path.exists(self.index_file):
+            return
+        
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            with self._lock:
+                dirty = self._dirty
+                for from_code, targets in data.items():
+                    for to_code, trains in targets.items():
+                        for train_number in trains:
+                            self._add_edge(from_code, to_code, train_number)
+                self._dirty = dirty
+            logger.info(f"从本地文件加载中转站索引，共 {len(data)} 个站点")
+        except Exception as e:
+            logger.error(f"加载中转站索引失败: {e}")
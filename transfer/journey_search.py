@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多次中转行程搜索模块，按轮次（每轮增加一段车次）扩展行程，参考 RAPTOR 算法
+"""
+
+from transfer.matcher import (TransferIndex, MIN_TRANSFER_MINUTES, MAX_TRANSFER_MINUTES, CROSS_STATION_MINUTES,
+                              DAY_MINUTES)
+from logger.logger import setup_logger
+
+# 设置日志
+logger = setup_logger()
+
+
+class Journey:
+    """
+    由若干段车次组成的行程
+    
+    时间为相对查询日期 00:00 的分钟数，跨天后继续累加。
+    """
+    
+    __slots__ = ("legs", "stations", "waits", "depart", "arrive")
+    
+    def __init__(self, legs, stations, waits, depart, arrive):
+        """
+        初始化行程
+        
+        Args:
+            legs: 各段车次记录（TicketRecord）
+            stations: 依次经过的查询站点编码，包括出发站和最后到达的站点
+            waits: 各次换乘的等待时间（分钟）
+            depart: 出发时间（分钟）
+            arrive: 到达时间（分钟）
+        """
+        self.legs = legs
+        self.stations = stations
+        self.waits = waits
+        self.depart = depart
+        self.arrive = arrive
+    
+    @classmethod
+    def start(cls, record, from_station, to_station):
+        """
+        由第一段车次创建行程
+        
+        Args:
+            record: 第一段车次记录
+            from_station: 出发站编码
+            to_station: 到达站编码
+        
+        Returns:
+            Journey: 行程
+        """
+        return cls((record,), (from_station, to_station), (),
+                   record.start_minutes, record.arrive_minutes)
+    
+    def extend(self, record, station, wait):
+        """
+        换乘一段车次，返回新的行程
+        
+        Args:
+            record: 换乘的车次记录
+            station: 换乘后到达的站点编码
+            wait: 换乘等待时间（分钟）
+        
+        Returns:
+            Journey: 新的行程
+        """
+        depart = self.arrive + wait
+        return Journey(self.legs + (record,), self.stations + (station,), self.waits + (wait,),
+                       self.depart, depart + record.duration_minutes)
+    
+    @property
+    def transfers(self):
+        return len(self.legs) - 1
+    
+    @property
+    def total_minutes(self):
+        return self.arrive - self.depart
+
+
+class JourneySearch:
+    """
+    多次中转行程搜索
+    
+    第 k 轮查询上一轮到达的各站点到目的站、以及到各自中转站候选的车次。
+    到达中转站的行程只有早于更少换乘次数时的最早到达时间才会保留，
+    每个站点每轮最多保留若干个最早到达的行程，查询的线路数和结果数都有上限。
+    """
+    
+    def __init__(self, fetch_legs, hub_candidates, max_transfers=2, max_total_minutes=48 * 60,
+                 min_wait=MIN_TRANSFER_MINUTES, max_wait=MAX_TRANSFER_MINUTES,
+                 cross_station_buffer=CROSS_STATION_MINUTES, hubs_per_station=3, labels_per_station=8, leg_budget=24, result_budget=200):
+        """
+        初始化搜索
+        
+        Args:
+            fetch_legs: 批量获取线路车次的函数，参数为 [(出发站, 到达站), ...]，返回 {(出发站, 到达站): [TicketRecord, ...]}
+            hub_candidates: 获取中转站候选的函数，参数为 (出发站, 目的站, 数量上限, 排除站点, 中转站到目的站最多乘坐的车次段数)，
+                返回站点编码列表
+            max_transfers: 最大中转次数
+            max_total_minutes: 行程最长总历时（分钟）
+            min_wait: 最短换乘时间（分钟）
+            max_wait: 最长换乘时间（分钟）
+            cross_station_buffer: 同城换站额外需要的时间（分钟）
+            hubs_per_station: 每个站点每轮最多尝试的中转站数量
+            labels_per_station: 每个中转站每轮最多保留的行程数
+            leg_budget: 最多查询的线路数
+            result_budget: 最多返回的行程数
+        """
+        self.fetch_legs = fetch_legs
+        self.hub_candidates = hub_candidates
+        self.max_transfers = max_transfers
+        self.max_total_minutes = max_total_minutes
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.cross_station_buffer = cross_station_buffer
+        self.hubs_per_station = hubs_per_station
+        self.labels_per_station = labels_per_station
+        self.leg_budget = leg_budget
+        self.result_budget = result_budget
+    
+    def _plan_round(self, labels, origin, destination, round_number, fetched):
+        """
+        确定本轮需要查询的线路
+        
+        Args:
+            labels: {站点: [行程, ...]}，上一轮到达各站点的行程
+            origin: 出发站编码
+            destination: 目的站编码
+            round_number: 轮次，第一轮不查询直达线路，最后一轮只查询到目的站的线路
+            fetched: 已查询过的线路集合
+        
+        Returns:
+            list: [(出发站, 到达站), ...]
+        """
+        pairs = []
+        # 先查询到达较早的站点
+        stations = sorted(labels, key=lambda station: min(journey.arrive if journey else 0 for journey in labels[station]))
+        for station in stations:
+            targets = [destination] if round_number > 1 else []
+            if round_number <= self.max_transfers:
+                remaining_legs = self.max_transfers + 1 - round_number
+                targets += self.hub_candidates(station, destination, self.hubs_per_station, (origin,), remaining_legs)
+            for target in targets:
+                pair = (station, target)
+                if target == station or pair in pairs:
+                    continue
+                if pair not in fetched and len(fetched) + len(pairs) >= self.leg_budget:
+                    continue
+                pairs.append(pair)
+        return pairs
+    
+    def search(self, origin, destination):
+        """
+        搜索行程
+        
+        Args:
+            origin: 出发站编码
+            destination: 目的站编码
+        
+        Returns:
+            list: 至少换乘一次的行程列表，按总历时排序
+        """
+        results = []
+        for journeys in self.iter_search(origin, destination):
+            results.extend(journeys)
+        results.sort(key=lambda journey: (journey.total_minutes, journey.transfers))
+        return results
+    
+    def iter_search(self, origin, destination):
+        """
+        逐轮搜索行程
+        
+        Args:
+            origin: 出发站编码
+            destination: 目的站编码
+        
+        Yields:
+            list: 每一轮新找到的行程，按总历时排序
+        """
+        # 上一轮到达各站点的行程，None 表示尚未出发
+        labels = {origin: [None]}
+        # 各站点在之前各轮中的最早到达时间
+        best_arrival = {origin: 0}
+        fetched = set()
+        found = 0
+        
+        for round_number in range(1, self.max_transfers + 2):
+            pairs = self._plan_round(labels, origin, destination, round_number, fetched)
+            if not pairs:
+                break
+            
+            legs = self.fetch_legs(pairs)
+            fetched.update(pairs)
+            logger.info(f"第 {round_number} 轮查询 {len(pairs)} 条线路，累计 {len(fetched)} 条")
+            
+            new_labels = {}
+            results = []
+            for station, target in pairs:
+                index = TransferIndex((record for record in legs.get((station, target), [])
+                                        if record.duration_minutes >= 0), self.cross_station_buffer)
+                if not index:
+                    continue
+                
+                for journey in labels[station]:
+                    if journey is None:
+                        candidates = (Journey.start(record, station, target) for record in index.records)
+                    elif target in journey.stations:
+                        continue
+                    else:
+                        candidates = (journey.extend(record, target, wait)
+                                      for record, wait in index.connections(journey.legs[-1].to_station_code,
+                                                                            journey.arrive % DAY_MINUTES,
+                                                                            self.min_wait, self.max_wait))
+                    
+                    for candidate in candidates:
+                        if candidate.total_minutes > self.max_total_minutes:
+                            continue
+                        if target == destination:
+                            results.append(candidate)
+                        elif candidate.arrive < best_arrival.get(target, float("inf")):
+                            new_labels.setdefault(target, []).append(candidate)
+            
+            # 每个站点只保留最早到达的若干个行程，并更新最早到达时间
+            for station, journeys in new_labels.items():
+                journeys.sort(key=lambda journey: journey.arrive)
+                del journeys[self.labels_per_station:]
+                best_arrival[station] = min(best_arrival.get(station, float("inf")), journeys[0].arrive)
+            
+            if results:
+                results.sort(key=lambda journey: (journey.total_minutes, journey.transfers))
+                results = results[:self.result_budget - found]
+                found += len(results)
+                yield results
+            
+            labels = new_labels
+            if not labels or found >= self.result_budget:
+                break
+        
+        logger.info(f"行程搜索完成，查询 {len(fetched)} 条线路，找到 {found} 个行程")
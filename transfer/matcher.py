@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中转车次匹配模块，按出发时间建立索引，用二分查找确定可换乘的车次范围
+
+查询中转站时接口会返回同一城市所有车站的车次（如查询北京会返回北京西、北京南的车次），
+到达站与出发站不同时需要同城换站，换乘时间要额外加上换站时间。
+"""
+
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+# 一天的分钟数
+DAY_MINUTES = 24 * 60
+
+# 换乘等待时间范围（分钟）
+MIN_TRANSFER_MINUTES = 20
+MAX_TRANSFER_MINUTES = 12 * 60
+
+# 同城换站需要额外预留的时间（分钟）
+CROSS_STATION_MINUTES = 60
+
+
+class DepartureIndex:
+    """按出发时间排序的车次索引"""
+    
+    def __init__(self, records):
+        """
+        初始化索引
+        
+        Args:
+            records: TicketRecord 列表，出发时间无效的车次会被忽略
+        """
+        self.records = sorted((record for record in records if record.start_minutes >= 0),
+                              key=attrgetter("start_minutes"))
+        self.departures = [record.start_minutes for record in self.records]
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def _between(self, earliest, latest, base):
+        """
+        返回出发时间在 [earliest, latest] 内的车次
+        
+        Args:
+            earliest: 最早出发时间（分钟）
+            latest: 最晚出发时间（分钟）
+            base: 计算等待时间的基准时间（分钟）
+        
+        Yields:
+            tuple: (车次记录, 等待时间)
+        """
+        start = bisect_left(self.departures, earliest)
+        end = bisect_right(self.departures, latest, start)
+        for i in range(start, end):
+            yield self.records[i], self.departures[i] - base
+    
+    def connections(self, arrival_minutes, min_wait=MIN_TRANSFER_MINUTES, max_wait=MAX_TRANSFER_MINUTES):
+        """
+        查找到达后可以换乘的车次，出发时间早于到达时间的车次视为次日出发
+        
+        Args:
+            arrival_minutes: 到达中转站的时间（分钟）
+            min_wait: 最短换乘时间（分钟）
+            max_wait: 最长换乘时间（分钟）
+        
+        Yields:
+            tuple: (车次记录, 等待时间)，按出发时间排序
+        """
+        earliest = arrival_minutes + min_wait
+        latest = arrival_minutes + max_wait
+        
+        # 当天出发的车次
+        yield from self._between(earliest, latest, arrival_minutes)
+        
+        # 换乘窗口跨过午夜时，查找次日出发的车次
+        if latest >= DAY_MINUTES:
+            yield from self._between(max(0, earliest - DAY_MINUTES),
+                                     min(latest - DAY_MINUTES, earliest - 1),
+                                     arrival_minutes - DAY_MINUTES)
+
+
+class TransferIndex:
+    """按出发站分组的车次索引，同站换乘和同城换站使用不同的最短换乘时间"""
+    
+    def __init__(self, records, cross_station_buffer=CROSS_STATION_MINUTES):
+        """
+        初始化索引
+        
+        Args:
+            records: TicketRecord 列表，出发时间无效的车次会被忽略
+            cross_station_buffer: 同城换站额外需要的时间（分钟）
+        """
+        self.cross_station_buffer = cross_station_buffer
+        by_station = {}
+        for record in records:
+            by_station.setdefault(record.from_station_code, []).append(record)
+        self.indexes = {station: DepartureIndex(station_records)
+                        for station, station_records in by_station.items()}
+        self.records = [record for index in self.indexes.values() for record in index.records]
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def connections(self, arrival_station, arrival_minutes, min_wait=MIN_TRANSFER_MINUTES,
+                    max_wait=MAX_TRANSFER_MINUTES):
+        """
+        查找到达后可以换乘的车次
+        
+        Args:
+            arrival_station: 到达的车站编码
+            arrival_minutes: 到达时间（分钟）
+            min_wait: 同站换乘的最短换乘时间（分钟）
+            max_wait: 最长换乘时间（分钟）
+        
+        Yields:
+            tuple: (车次记录, 等待时间)，每个出发站内按出发时间排序
+        """
+        for station, index in self.indexes.items():
+            station_wait = min_wait if station == arrival_station else min_wait + self.cross_station_buffer
+            if station_wait <= max_wait:
+                yield from index.connections(arrival_minutes, station_wait, max_wait)
+
+
+def match_transfers(first_records, second_records, min_wait=MIN_TRANSFER_MINUTES, max_wait=MAX_TRANSFER_MINUTES,
+                    cross_station_buffer=CROSS_STATION_MINUTES):
+    """
+    匹配两段车次，第二段车次只建立一次索引
+    
+    Args:
+        first_records: 第一段车次记录列表
+        second_records: 第二段车次记录列表
+        min_wait: 最短换乘时间（分钟）
+        max_wait: 最长换乘时间（分钟）
+        cross_station_buffer: 第一段到达站与第二段出发站不同时额外需要的时间（分钟）
+    
+    Yields:
+        tuple: (第一段车次, 第二段车次, 换乘等待时间)
+    """
+    index = TransferIndex(second_records, cross_station_buffer)
+    if not index:
+        return
+    
+    for first in first_records:
+        if first.end_minutes < 0:
+            continue
+        for second, wait in index.connections(first.to_station_code, first.end_minutes, min_wait, max_wait):
+            yield first, second, wait
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中转方案排序模块，只保留排名靠前的方案和各项指标上的 Pareto 最优方案，内存占用有上限
+"""
+
+import heapq
+import itertools
+
+
+def plan_metrics(records, total_minutes, waits):
+    """
+    计算中转方案的排序指标
+    
+    Args:
+        records: 各段车次记录（TicketRecord）
+        total_minutes: 总历时（分钟）
+        waits: 各次换乘的等待时间（分钟）
+    
+    Returns:
+        tuple: (无票车次段数, 总历时, 换乘等待总时间, 票价)，各项均为越小越好，票价未知时为无穷大
+    """
+    unavailable = 0
+    price = 0
+    for record in records:
+        if not record.bookable():
+            unavailable += 1
+        leg_price = record.lowest_price()
+        price = price + leg_price if leg_price else float("inf")
+    return (unavailable, total_minutes, sum(waits), price)
+
+
+def dominates(a, b):
+    """
+    判断指标 a 是否支配指标 b（各项都不差于 b 且至少一项更好）
+    
+    Args:
+        a: 指标元组
+        b: 指标元组
+    
+    Returns:
+        bool: 是否支配
+    """
+    return a != b and all(x <= y for x, y in zip(a, b))
+
+
+class TransferRanker:
+    """
+    中转方案排序器
+    
+    同时维护两组方案：按指标元组字典序排名的前 top_k 个方案（有界最大堆），
+    以及各项指标上互不支配的 Pareto 前沿（超过 front_limit 时淘汰排名最差的）。
+    搜索过程中内存占用为 O(top_k + front_limit)。
+    """
+    
+    def __init__(self, top_k=50, front_limit=50):
+        """
+        初始化排序器
+        
+        Args:
+            top_k: 按排名保留的方案数
+            front_limit: Pareto 前沿最多保留的方案数
+        """
+        self.top_k = top_k
+        self.front_limit = front_limit
+        # 最大堆，元素为 (取反的指标, 取反的序号, 方案)，堆顶为排名最差的方案
+        self._heap = []
+        # Pareto 前沿，元素为 (指标, 序号, 方案)
+        self._front = []
+        self._sequence = itertools.count()
+        self.offered = 0
+    
+    @staticmethod
+    def _negate(metrics):
+        return tuple(-value for value in metrics)
+    
+    def _enters_top(self, metrics):
+        return len(self._heap) < self.top_k or self._negate(metrics) > self._heap[0][0]
+    
+    def _enters_front(self, metrics):
+        # 与前沿中已有方案指标相同时也不加入
+        if self.front_limit <= 0:
+            return False
+        return not any(all(x <= y for x, y in zip(member[0], metrics)) for member in self._front)
+    
+    def admits(self, metrics):
+        """
+        判断方案是否能进入排名或 Pareto 前沿，不能进入的方案无需构造
+        
+        Args:
+            metrics: 指标元组
+        
+        Returns:
+            bool: 是否会被保留
+        """
+        self.offered += 1
+        return self._enters_top(metrics) or self._enters_front(metrics)
+    
+    def add(self, metrics, plan):
+        """
+        加入方案
+        
+        Args:
+            metrics: 指标元组
+            plan: 方案
+        """
+        sequence = next(self._sequence)
+        
+        if self._enters_top(metrics):
+            entry = (self._negate(metrics), -sequence, plan)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heapreplace(self._heap, entry)
+        
+        if self._enters_front(metrics):
+            self._front = [member for member in self._front if not dominates(metrics, member[0])]
+            self._front.append((metrics, sequence, plan))
+            if len(self._front) > self.front_limit:
+                self._front.remove(max(self._front, key=lambda member: (member[0], member[1])))
+    
+    def ranked(self):
+        """
+        获取保留的方案
+        
+        Returns:
+            list: 排名方案与 Pareto 前沿方案的并集，按指标排序
+        """
+        entries = {}
+        for negated, negated_sequence, plan in self._heap:
+            entries[-negated_sequence] = (self._negate(negated), plan)
+        for metrics, sequence, plan in self._front:
+            entries[sequence] = (metrics, plan)
+        return [plan for _, (metrics, plan) in sorted(entries.items(), key=lambda item: (item[1][0], item[0]))]
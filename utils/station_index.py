@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+二进制站点索引，通过 mmap 加载，查询时只读取需要的记录，不做整体反序列化
+
+文件格式（小端序）：
+    文件头        HEADER
+    站点记录      按站点编码排序的定长记录 RECORD，字符串字段为字符串表中的 (偏移, 长度)，
+                  排序号为站点在 station_name 数据中的序号（重要城市的站点排在前面）
+    名称顺序      按站点名称排序的记录序号（u16）
+    城市顺序      按城市排序的记录序号（u16），同一城市中与城市同名的站点在最前，其余按排序号排列
+    字符串表      所有字符串的 UTF-8 编码依次拼接
+
+UTF-8 字节序与字符序一致，查询时把查询字符串编码一次后直接与字符串表中的字节比较。
+"""
+
+import os
+import mmap
+import time
+import struct
+from collections import namedtuple
+
+# 文件标识和格式版本，格式变化时增加版本号
+MAGIC = b"TGSI"
+VERSION = 4
+
+# 数据来源
+ORIGIN_BUNDLED = 0   # 随程序发布的 station_name 文件
+ORIGIN_NETWORK = 1   # 12306官网
+
+# 文件头：标识, 版本, 来源, 站点数, 生成时间, 上次从官网更新的时间（无论成功与否）, 各部分的偏移
+HEADER = struct.Struct("<4sHHIddIIII")
+# 上次更新时间在文件头中的位置
+_CHECKED_AT = struct.Struct("<d")
+_CHECKED_AT_OFFSET = struct.calcsize("<4sHHId")
+# 站点记录：编码, 名称, 全拼, 简拼, 城市（字符串为 偏移 + 长度）, 排序号
+RECORD = struct.Struct("<4sIHIHIHIHH")
+# 城市字段在记录中的位置
+_CITY_FIELD = struct.Struct("<IH")
+_CITY_OFFSET = struct.calcsize("<4sIHIHIH")
+# 记录序号
+ORDER = struct.Struct("<H")
+
+# 查询结果缓存的条目上限，查询不存在的名称也会占用条目
+_CACHE_LIMIT = 8192
+
+Station = namedtuple("Station", ["code", "name", "pinyin", "abbreviation", "city", "rank"], defaults=(0xFFFF,))
+
+
+class StationIndex:
+    """
+    只读的站点索引
+    
+    编码、名称的查询为 O(log n) 的二分查找；数据可以来自 mmap 映射的文件，也可以来自内存中的字节串。
+    查询过的站点会记住结果，常用站点的重复查询不再做二分查找，占用的内存只与实际用到的站点数有关。
+    """
+    
+    def __init__(self, buffer):
+        """
+        初始化索引
+        
+        Args:
+            buffer: 索引数据（bytes 或 mmap）
+        
+        Raises:
+            ValueError: 数据不是当前版本的站点索引
+        """
+        if len(buffer) < HEADER.size:
+            raise ValueError("站点索引文件不完整")
+        (magic, version, self.origin, self.count, self.built_at, self.checked_at,
+         self._records, self._names, self._cities, self._strings) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不支持的站点索引格式: {magic!r} v{version}")
+        if self._strings > len(buffer) or self._records + self.count * RECORD.size > len(buffer):
+            raise ValueError("站点索引文件不完整")
+        self._buffer = buffer
+        self._code_cache = {}
+        self._name_cache = {}
+    
+    @classmethod
+    def open(cls, path):
+        """
+        以只读方式映射索引文件
+        
+        Args:
+            path: 索引文件路径
+        
+        Returns:
+            StationIndex: 站点索引
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("站点索引文件为空")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(buffer)
+        except Exception:
+            buffer.close()
+            raise
+    
+    @staticmethod
+    def build(stations, origin=ORIGIN_BUNDLED, built_at=None, checked_at=None):
+        """
+        生成索引数据
+        
+        Args:
+            stations: Station 列表，编码重复时保留最后一个
+            origin: 数据来源
+            built_at: 生成时间（时间戳），默认为当前时间
+            checked_at: 上次从官网更新的时间（时间戳），默认为：来自官网的数据为生成时间，否则为0
+        
+        Returns:
+            bytes: 索引数据
+        """
+        by_code = {}
+        for station in stations:
+            by_code[station.code] = station
+        records = sorted(by_code.values(), key=lambda station: station.code.encode("ascii"))
+        if len(records) > 0xFFFF:
+            raise ValueError("站点数量超过索引格式上限")
+        
+        strings = bytearray()
+        string_refs = {}
+        
+        def add_string(text):
+            data = (text or "").encode("utf-8")
+            ref = string_refs.get(data)
+            if ref is None:
+                ref = string_refs[data] = (len(strings), len(data))
+                strings.extend(data)
+            return ref
+        
+        record_data = bytearray()
+        for station in records:
+            record_data += RECORD.pack(station.code.encode("ascii")[:4],
+                                       *add_string(station.name), *add_string(station.pinyin),
+                                       *add_string(station.abbreviation), *add_string(station.city),
+                                       min(station.rank, 0xFFFF))
+        
+        name_order = sorted(range(len(records)), key=lambda i: records[i].name.encode("utf-8"))
+        # 同一城市中与城市同名的主站排在最前，其余站点按 station_name 数据中的顺序排列
+        city_order = sorted(range(len(records)),
+                            key=lambda i: (records[i].city.encode("utf-8"), records[i].name != records[i].city,
+                                           records[i].rank, records[i].name.encode("utf-8")))
+        
+        records_offset = HEADER.size
+        names_offset = records_offset + len(record_data)
+        cities_offset = names_offset + len(records) * ORDER.size
+        strings_offset = cities_offset + len(records) * ORDER.size
+        if built_at is None:
+            built_at = time.time()
+        if checked_at is None:
+            checked_at = built_at if origin == ORIGIN_NETWORK else 0
+        header = HEADER.pack(MAGIC, VERSION, origin, len(records), built_at, checked_at,
+                             records_offset, names_offset, cities_offset, strings_offset)
+        return b"".join([header, bytes(record_data),
+                         b"".join(ORDER.pack(i) for i in name_order),
+                         b"".join(ORDER.pack(i) for i in city_order),
+                         bytes(strings)])
+    
+    def data(self, checked_at=None):
+        """
+        获取完整的索引数据
+        
+        Args:
+            checked_at: 替换文件头中的上次更新时间，默认不替换
+        
+        Returns:
+            bytes: 索引数据，可直接写入文件
+        """
+        if checked_at is None:
+            return bytes(self._buffer[:])
+        data = bytearray(self._buffer[:])
+        _CHECKED_AT.pack_into(data, _CHECKED_AT_OFFSET, checked_at)
+        return bytes(data)
+    
+    def __len__(self):
+        return self.count
+    
+    def _string_bytes(self, offset, length):
+        start = self._strings + offset
+        return self._buffer[start:start + length]
+    
+    def _record(self, i):
+        return RECORD.unpack_from(self._buffer, self._records + i * RECORD.size)
+    
+    def _code_bytes(self, i):
+        return self._buffer[self._records + i * RECORD.size:self._records + i * RECORD.size + 4].rstrip(b"\0")
+    
+    def _name_bytes(self, i):
+        _, name_offset, name_length = struct.unpack_from("<4sIH", self._buffer, self._records + i * RECORD.size)
+        return self._string_bytes(name_offset, name_length)
+    
+    def _city_bytes(self, i):
+        offset, length = _CITY_FIELD.unpack_from(self._buffer, self._records + i * RECORD.size + _CITY_OFFSET)
+        return self._string_bytes(offset, length)
+    
+    def _order(self, section, position):
+        return ORDER.unpack_from(self._buffer, section + position * ORDER.size)[0]
+    
+    def station(self, i):
+        """
+        获取第 i 个站点（按编码排序）
+        
+        Args:
+            i: 记录序号
+        
+        Returns:
+            Station: 站点信息
+        """
+        (code, name_offset, name_length, pinyin_offset, pinyin_length,
+         abbr_offset, abbr_length, city_offset, city_length, rank) = self._record(i)
+        return Station(code.rstrip(b"\0").decode("ascii"),
+                       self._string_bytes(name_offset, name_length).decode("utf-8"),
+                       self._string_bytes(pinyin_offset, pinyin_length).decode("utf-8"),
+                       self._string_bytes(abbr_offset, abbr_length).decode("utf-8"),
+                       self._string_bytes(city_offset, city_length).decode("utf-8"),
+                       rank)
+    
+    def _find_code(self, code):
+        """二分查找站点编码，返回记录序号，不存在时返回-1"""
+        key = code.encode("ascii", "replace")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._code_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._code_bytes(low) == key:
+            return low
+        return -1
+    
+    def _code_entry(self, code):
+        """查找站点编码对应的 (名称, 城市)，不存在时为 (None, None)"""
+        try:
+            return self._name_cache[code]
+        except KeyError:
+            pass
+        i = self._find_code(code)
+        if i >= 0:
+            entry = (self._name_bytes(i).decode("utf-8"), self._city_bytes(i).decode("utf-8"))
+        else:
+            entry = (None, None)
+        if len(self._name_cache) >= _CACHE_LIMIT:
+            self._name_cache.clear()
+        self._name_cache[code] = entry
+        return entry
+    
+    def _lower_bound(self, section, key, key_of):
+        """在排序的记录序号中二分查找第一个不小于 key 的位置"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if key_of(self._order(section, middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def code_of(self, name):
+        """
+        根据站点名称获取站点编码
+        
+        Args:
+            name: 站点名称
+        
+        Returns:
+            str: 站点编码，不存在时返回None
+        """
+        try:
+            return self._code_cache[name]
+        except KeyError:
+            pass
+        
+        code = None
+        key = name.encode("utf-8")
+        position = self._lower_bound(self._names, key, self._name_bytes)
+        if position < self.count:
+            i = self._order(self._names, position)
+            if self._name_bytes(i) == key:
+                code = self._code_bytes(i).decode("ascii")
+        if len(self._code_cache) >= _CACHE_LIMIT:
+            self._code_cache.clear()
+        self._code_cache[name] = code
+        return code
+    
+    def name_of(self, code):
+        """
+        根据站点编码获取站点名称
+        
+        Args:
+            code: 站点编码
+        
+        Returns:
+            str: 站点名称，不存在时返回None
+        """
+        return self._code_entry(code)[0]
+    
+    def city_of(self, code):
+        """
+        根据站点编码获取所属城市
+        
+        Args:
+            code: 站点编码
+        
+        Returns:
+            str: 城市名称，不存在时返回None
+        """
+        return self._code_entry(code)[1]
+    
+    def names(self):
+        """
+        获取所有站点名称
+        
+        Returns:
+            list: 按名称排序的站点名称列表
+        """
+        return [self._name_bytes(self._order(self._names, position)).decode("utf-8")
+                for position in range(self.count)]
+    
+    def city_groups(self):
+        """
+        按城市分组所有站点
+        
+        Returns:
+            dict: {城市名称: [Station, ...]}，城市按名称排序，每个城市中与城市同名的站点在最前，其余按排序号排列
+        """
+        groups = {}
+        for position in range(self.count):
+            station = self.station(self._order(self._cities, position))
+            groups.setdefault(station.city, []).append(station)
+        return groups
+    
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.station(i)
@@ -1,106 +1,341 @@
 import requests
-import json
 import re
 import os
+import sys
+import time
+import heapq
+import tempfile
+import threading
 import logging
+from bisect import bisect_left
+from utils.station_index import StationIndex, Station, ORIGIN_BUNDLED, ORIGIN_NETWORK
 
 logger = logging.getLogger('train_get')
 
+# 项目根目录，打包后为解压目录
+_BASE_DIR = getattr(sys, "_MEIPASS", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+class StationPrefixIndex:
+    """
+    站点自动补全的前缀索引
+    
+    中文名称、全拼和简拼（小写）都作为检索键，按键排序后存入数组；
+    前缀查询先二分查找定位匹配区间，再从区间内挑出排名最高的若干个站点。
+    """
+    
+    # 检索键的类型，同等条件下简拼优先
+    KEY_ABBREVIATION = 0
+    KEY_NAME = 1
+    KEY_PINYIN = 2
+    
+    def __init__(self, stations):
+        """
+        初始化索引
+        
+        Args:
+            stations: Station 列表
+        """
+        entries = []
+        for station in stations:
+            for kind, key in ((self.KEY_ABBREVIATION, station.abbreviation.lower()),
+                              (self.KEY_NAME, station.name),
+                              (self.KEY_PINYIN, station.pinyin.lower())):
+                if key:
+                    entries.append((key, kind, station))
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def search(self, text, limit=10):
+        """
+        按前缀查找站点
+        
+        Args:
+            text: 输入的中文名称、全拼或简拼前缀，不区分大小写
+            limit: 最多返回的站点数
+        
+        Returns:
+            list: Station 列表，完全匹配的排在前面，同等匹配程度按站点排序号排列
+        """
+        prefix = text.strip().lower()
+        if not prefix:
+            return []
+        
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+        # 每个站点最多有三个检索键，多取一些再去重
+        best = heapq.nsmallest(limit * 3, range(start, end), key=lambda i: (
+            self._keys[i] != prefix, self._entries[i][2].rank, self._entries[i][1]))
+        
+        stations = []
+        seen = set()
+        for i in best:
+            station = self._entries[i][2]
+            if station.code not in seen:
+                seen.add(station.code)
+                stations.append(station)
+                if len(stations) >= limit:
+                    break
+        return stations
+
+
 class StationParser:
     """
-    站点信息解析器，用于从12306官网获取和解析站点信息
+    站点信息解析器，用于加载、解析和更新站点信息
+    
+    启动时只读取本地数据（缓存文件或随程序发布的 station_name.txt），不访问网络；
+    从12306官网更新站点信息在后台线程中进行，或由调用方显式请求。
+    不自动加载时，第一次用到站点信息时只读取本地文件，不写入文件也不访问网络。
     """
     
-    def __init__(self):
+    def __init__(self, refresh_interval=7 * 24 * 3600, station_file=None, autoload=True):
+        """
+        初始化解析器并加载站点信息
+        
+        Args:
+            refresh_interval: 两次从官网更新站点信息的最短间隔（秒），更新失败时同样等待这么长时间再重试
+            station_file: 本地缓存文件路径，默认为 data/stations.idx
+            autoload: 是否立即调用 load_stations()
+        """
         self.station_url = "https://kyfw.12306.cn/otn/resources/js/framework/station_name.js"
-        self.station_file = os.path.join(os.path.dirname(__file__), "../data/stations.json")
-        self.stations = {}
-        self.code_to_station = {}
-        self.load_stations()
+        self.station_file = station_file or os.path.join(os.path.dirname(__file__), "../data/stations.idx")
+        # 新保存的站点索引，当前缓存文件正被映射而无法替换时（Windows），留到下次启动时再替换
+        self.pending_file = self.station_file + ".new"
+        # 随程序发布的站点数据，没有本地缓存时使用
+        self.bundled_files = [os.path.join(_BASE_DIR, "station_name.txt"), os.path.join(_BASE_DIR, "station_name.js")]
+        self.refresh_interval = refresh_interval
+        # 站点索引，从本地缓存加载时为 mmap 映射，更新时整体替换；为None时尚未加载
+        self._index = None
+        # 当前站点信息的来源: "cache"、"bundled" 或 "network"
+        self.source = None
+        self._load_lock = threading.RLock()
+        self._fetch_lock = threading.Lock()
+        self._refresh_thread = None
+        # 由站点索引派生的数据（前缀索引、城市分组），第一次用到时建立: (站点索引, {名称: 数据})
+        self._derived = (None, {})
+        if autoload:
+            self.load_stations()
+    
+    @property
+    def index(self):
+        """站点索引，尚未加载时只读取本地数据"""
+        if self._index is None:
+            self.load_stations(update=False)
+        return self._index
     
-    def load_stations(self):
+    @index.setter
+    def index(self, index):
+        self._index = index
+    
+    def load_stations(self, update=True):
         """
         加载站点信息
-        优先从本地文件加载，如果本地文件不存在则从官网获取
+        优先从本地缓存加载，没有可用的缓存时使用随程序发布的站点数据，不会因网络阻塞；
+        更新时将随程序发布的数据保存为本地缓存，距离上次从官网更新（无论成功与否）超过 refresh_interval 时，在后台更新
+        
+        Args:
+            update: 是否保存本地缓存并按需从官网更新，为False时只读取本地文件
         """
-        if os.path.exists(self.station_file):
+        with self._load_lock:
+            if not update and self._index is not None:
+                return
+            if not self._load_cache(update) and not self._load_bundled():
+                logger.warning("没有可用的本地站点数据")
+                if self._index is None:
+                    self._index = StationIndex(StationIndex.build([]))
+        
+        if not update:
+            return
+        if self.source == "bundled":
+            self.save_stations()
+        if self._needs_refresh():
+            self.refresh_in_background()
+    
+    def _load_cache(self, promote=True):
+        """
+        映射本地缓存的站点索引文件，上次保存时未能替换的新文件先替换缓存文件
+        
+        Args:
+            promote: 是否用上次未能替换的新文件替换缓存文件
+        
+        Returns:
+            bool: 是否加载成功
+        """
+        if promote and os.path.exists(self.pending_file):
+            try:
+                os.replace(self.pending_file, self.station_file)
+            except OSError as e:
+                logger.warning(f"替换本地站点文件失败: {e}")
+        
+        if not os.path.exists(self.station_file):
+            return False
+        
+        try:
+            self.index = StationIndex.open(self.station_file)
+            self.source = "cache"
+            logger.info(f"从本地文件加载了 {len(self.index)} 个站点信息")
+            return True
+        except Exception as e:
+            logger.error(f"加载本地站点文件失败: {e}")
+            return False
+    
+    def _load_bundled(self):
+        """
+        从随程序发布的 station_name 文件加载站点信息
+        
+        Returns:
+            bool: 是否加载成功
+        """
+        for path in self.bundled_files:
+            if not os.path.exists(path):
+                continue
             try:
-                with open(self.station_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.stations = data.get('stations', {})
-                    self.code_to_station = data.get('code_to_station', {})
-                logger.info(f"从本地文件加载了 {len(self.stations)} 个站点信息")
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                if self._parse_station_content(content, ORIGIN_BUNDLED):
+                    self.source = "bundled"
+                    logger.info(f"从 {os.path.basename(path)} 加载了 {len(self.index)} 个站点信息")
+                    return True
             except Exception as e:
-                logger.error(f"加载本地站点文件失败: {e}")
-                self.fetch_stations()
-        else:
-            self.fetch_stations()
+                logger.error(f"加载站点数据文件 {path} 失败: {e}")
+        return False
+    
+    def _needs_refresh(self):
+        """
+        判断是否需要从官网更新站点信息
+        
+        Returns:
+            bool: 距离上次更新超过 refresh_interval 时返回True，随程序发布的数据在第一次启动时返回True
+        """
+        return time.time() - self.index.checked_at > self.refresh_interval
+    
+    def refresh_in_background(self):
+        """
+        在后台线程中从官网更新站点信息，已有更新在进行时不重复启动
+        """
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self.fetch_stations, name="StationRefresh", daemon=True)
+        self._refresh_thread.start()
     
     def fetch_stations(self):
         """
-        从12306官网获取站点信息
+        从12306官网获取站点信息，成功后替换当前站点信息并保存到本地缓存
+        
+        Returns:
+            bool: 是否更新成功
         """
-        logger.info("从12306官网获取站点信息...")
-        try:
-            response = requests.get(self.station_url, timeout=30)
-            response.encoding = 'utf-8'
-            content = response.text
-            
-            # 解析站点信息
-            self._parse_station_content(content)
-            
-            # 保存到本地文件
-            self.save_stations()
-            
-            logger.info(f"成功获取并解析了 {len(self.stations)} 个站点信息")
-        except Exception as e:
-            logger.error(f"获取站点信息失败: {e}")
+        with self._fetch_lock:
+            logger.info("从12306官网获取站点信息...")
+            try:
+                response = requests.get(self.station_url, timeout=30)
+                response.encoding = 'utf-8'
+                content = response.text
+                
+                # 解析站点信息
+                if not self._parse_station_content(content, ORIGIN_NETWORK):
+                    logger.error("官网返回的站点信息格式无法解析")
+                    self._record_refresh_attempt()
+                    return False
+                self.source = "network"
+                
+                # 保存到本地文件
+                self.save_stations()
+                
+                logger.info(f"成功获取并解析了 {len(self.index)} 个站点信息")
+                return True
+            except Exception as e:
+                logger.error(f"获取站点信息失败: {e}")
+                self._record_refresh_attempt()
+                return False
     
-    def _parse_station_content(self, content):
+    def _record_refresh_attempt(self):
         """
-        解析站点信息内容
+        在本地缓存中记录这次失败的更新时间，refresh_interval 之内的启动不再重试
+        """
+        if len(self.index):
+            self.save_stations(checked_at=time.time())
+    
+    def _parse_station_content(self, content, origin=ORIGIN_NETWORK):
+        """
+        解析站点信息内容，解析完成后一次性替换当前站点索引
         
         Args:
             content: 站点信息内容
+            origin: 数据来源
+        
+        Returns:
+            bool: 是否解析到站点信息
         """
         # 提取站点信息部分
         match = re.search(r'var station_names =\'(.*?)\';', content)
-        if match:
-            station_data = match.group(1)
-            station_items = station_data.split('@')
+        if not match:
+            return False
+        
+        stations = []
+        station_data = match.group(1)
+        station_items = station_data.split('@')
+        
+        for item in station_items:
+            if not item:
+                continue
             
-            for item in station_items:
-                if not item:
-                    continue
+            fields = item.split('|')
+            if len(fields) >= 5:
+                station_code = fields[2]  # 站点编码（如VAP）
+                station_name = fields[1]  # 站点名称（如北京北）
+                pinyin = fields[3]        # 全拼（如beijingbei）
+                abbreviation = fields[4]  # 简拼（如bjb）
+                # 所属城市（如北京），缺失时使用站点名称
+                city_name = fields[7] if len(fields) >= 8 and fields[7] else station_name
+                # 数据中的序号，重要城市的站点排在前面
+                rank = int(fields[5]) if len(fields) >= 6 and fields[5].isdigit() else len(stations)
                 
-                fields = item.split('|')
-                if len(fields) >= 5:
-                    station_code = fields[2]  # 站点编码（如VAP）
-                    station_name = fields[1]  # 站点名称（如北京北）
-                    
-                    # 添加到映射中
-                    self.stations[station_name] = station_code
-                    self.code_to_station[station_code] = station_name
+                stations.append(Station(station_code, station_name, pinyin, abbreviation, city_name, rank))
+        
+        if not stations:
+            return False
+        # 后台更新时查询线程不会看到更新到一半的数据
+        self.index = StationIndex(StationIndex.build(stations, origin))
+        return True
     
-    def save_stations(self):
-        """
-        保存站点信息到本地文件
+    def save_stations(self, checked_at=None):
         """
-        # 确保data目录存在
-        data_dir = os.path.join(os.path.dirname(__file__), "../data")
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
+        保存站点索引到本地文件，先写入临时文件再替换，避免写入中断导致文件损坏
         
-        # 保存站点信息
-        data = {
-            'stations': self.stations,
-            'code_to_station': self.code_to_station
-        }
+        启动时加载的缓存文件在程序运行期间一直被映射，Windows 上不能替换正在映射的文件，
+        此时新数据保存在 pending_file 中，下次启动加载缓存前再替换
         
-        with open(self.station_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"站点信息已保存到 {self.station_file}")
+        Args:
+            checked_at: 写入文件的上次更新时间，默认为站点索引中的时间
+        """
+        try:
+            # 确保data目录存在
+            data_dir = os.path.dirname(os.path.abspath(self.station_file))
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
+            
+            fd, temp_path = tempfile.mkstemp(dir=data_dir, prefix=".stations-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self.index.data(checked_at))
+                os.replace(temp_path, self.pending_file)
+            except Exception:
+                os.remove(temp_path)
+                raise
+            
+            try:
+                os.replace(self.pending_file, self.station_file)
+            except OSError as e:
+                logger.info(f"本地站点文件正在使用（{e}），将在下次启动时更新")
+                return
+            
+            logger.info(f"站点信息已保存到 {self.station_file}")
+        except Exception as e:
+            logger.error(f"保存站点信息失败: {e}")
     
     def get_station_code(self, station_name):
         """
@@ -112,7 +347,7 @@ class StationParser:
         Returns:
             str: 站点编码，如果不存在则返回站点名称
         """
-        return self.stations.get(station_name, station_name)
+        return self.index.code_of(station_name) or station_name
     
     def get_station_name(self, station_code):
         """
@@ -124,7 +359,73 @@ class StationParser:
         Returns:
             str: 站点名称，如果不存在则返回站点编码
         """
-        return self.code_to_station.get(station_code, station_code)
+        return self.index.name_of(station_code) or station_code
+    
+    def get_station_city(self, station_code):
+        """
+        根据站点编码获取所属城市
+        
+        Args:
+            station_code: 站点编码
+        
+        Returns:
+            str: 城市名称，如果不存在则返回None
+        """
+        return self.index.city_of(station_code)
+    
+    def get_city_station_codes(self, city_name):
+        """
+        获取同一城市的所有站点编码
+        
+        Args:
+            city_name: 城市名称（station_name 数据中的城市字段）
+        
+        Returns:
+            list: 站点编码列表
+        """
+        return [station.code for station in self._city_groups().get(city_name, ())]
+    
+    def _derived_data(self, name, build):
+        """
+        获取由当前站点索引派生的数据，站点索引更新后重新建立
+        
+        Args:
+            name: 数据名称
+            build: 建立数据的函数，参数为站点索引
+        
+        Returns:
+            object: 派生的数据
+        """
+        index = self.index
+        derived = self._derived
+        if derived[0] is not index:
+            derived = self._derived = (index, {})
+        data = derived[1].get(name)
+        if data is None:
+            data = derived[1][name] = build(index)
+        return data
+    
+    def _city_groups(self):
+        """
+        获取按城市分组的站点
+        
+        Returns:
+            dict: {城市名称: [Station, ...]}，城市按名称排序，与城市同名的站点排在该城市的最前面
+        """
+        return self._derived_data("city_groups", lambda index: index.city_groups())
+    
+    def search_stations(self, text, limit=10):
+        """
+        按中文名称、全拼或简拼前缀查找站点，用于输入时的自动补全
+        
+        Args:
+            text: 输入的文本，如 "bjn"、"beijing"、"北京"
+            limit: 最多返回的站点数
+        
+        Returns:
+            list: Station 列表，按匹配程度排序
+        """
+        return self._derived_data("prefix_index", StationPrefixIndex).search(text, limit)
     
     def get_all_stations(self):
         """
@@ -133,21 +434,16 @@ class StationParser:
         Returns:
             list: 站点名称列表
         """
-        return list(self.stations.keys())
+        return self.index.names()
     
     def get_cities(self):
         """
         获取所有城市名称
         
         Returns:
-            list: 城市名称列表
+            list: 城市名称列表（station_name 数据中的城市字段），按名称排序
         """
-        cities = set()
-        for station_name in self.stations.keys():
-            # 提取城市名称（取站点名称的前两个字，通常是城市名称）
-            city_name = station_name[:2]
-            cities.add(city_name)
-        return sorted(list(cities))
+        return list(self._city_groups())
     
     def get_stations_by_city(self, city_name):
         """
@@ -157,19 +453,18 @@ class StationParser:
             city_name: 城市名称
         
         Returns:
-            list: 站点名称列表
+            list: 站点名称列表，与城市同名的主站在最前，其余按站点排序号排列；城市不存在时为空列表
         """
-        stations = []
-        for station_name in self.stations.keys():
-            if station_name.startswith(city_name):
-                stations.append(station_name)
-        return sorted(stations)
+        return [station.name for station in self._city_groups().get(city_name, ())]
     
     def update_stations(self):
         """
-        更新站点信息
+        从官网更新站点信息（同步执行）
+        
+        Returns:
+            bool: 是否更新成功
         """
-        self.fetch_stations()
+        return self.fetch_stations()
 
-# 创建全局实例
-station_parser = StationParser()
+# 创建全局实例，导入时不读取文件也不访问网络；程序启动时调用 load_stations()
+station_parser = StationParser(autoload=False)